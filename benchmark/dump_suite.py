@@ -0,0 +1,265 @@
+#! /usr/bin/env python3
+
+# Time and peak memory of the `Dump` loading and exporting steps
+# on `tests/test_data/9th_ccpc_guilin` and on copies of it with
+# the submissions and judgements scaled up.
+#
+# python3 dump_suite.py --scales 1,10,100,1000
+# python3 dump_suite.py --compare results/dump-suite-20231029-120000.json
+#
+# Results are stored as JSON under `results/`, so runs can be compared.
+# The 1000x copy holds about 3.5 million submissions and needs several GiB of memory.
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), os.pardir))
+
+from domjudge_utility import Dump, DumpConfig  # noqa: E402
+
+kBenchmarkDir = os.path.dirname(os.path.abspath(__file__))
+kFixtureDir = os.path.join(kBenchmarkDir, os.pardir,
+                           "tests", "test_data", "9th_ccpc_guilin")
+kResultsDir = os.path.join(kBenchmarkDir, "results")
+
+kSteps = [
+    "load_domjudge_api",
+    "process_domjudge_raw_data",
+    "get_ghost_dat_data",
+    "get_resolver_data",
+    "get_excel_data",
+]
+
+
+def write_scaled_records(path: str, records, scale: int, fix_record):
+    # Written record by record, the 1000x copies do not fit in memory twice
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+
+        first = True
+        for i in range(scale):
+            for record in records:
+                if not first:
+                    f.write(',')
+                first = False
+
+                f.write(json.dumps(fix_record(dict(record), i),
+                        ensure_ascii=False, separators=(',', ':')))
+
+        f.write(']')
+
+
+def make_scaled_fixture(dist: str, scale: int):
+    src_api_dir = os.path.join(kFixtureDir, "domjudge", "api")
+    api_dir = os.path.join(dist, "domjudge", "api")
+
+    if scale == 1:
+        shutil.copytree(kFixtureDir, dist)
+        return
+
+    shutil.copytree(src_api_dir, api_dir)
+
+    with open(os.path.join(src_api_dir, "submissions.json"), 'r', encoding='utf-8') as f:
+        submissions = json.load(f)
+
+    with open(os.path.join(src_api_dir, "judgements.json"), 'r', encoding='utf-8') as f:
+        judgements = json.load(f)
+
+    # Copies get ids of their own, past the largest id of the fixture
+    submission_stride = max(int(s['id']) for s in submissions) + 1
+    judgement_stride = max(int(j['id']) for j in judgements) + 1
+
+    def fix_submission(submission, i):
+        submission['id'] = str(int(submission['id']) + i * submission_stride)
+        return submission
+
+    def fix_judgement(judgement, i):
+        judgement['id'] = str(int(judgement['id']) + i * judgement_stride)
+        judgement['submission_id'] = str(
+            int(judgement['submission_id']) + i * submission_stride)
+        return judgement
+
+    write_scaled_records(os.path.join(api_dir, "submissions.json"),
+                         submissions, scale, fix_submission)
+    write_scaled_records(os.path.join(api_dir, "judgements.json"),
+                         judgements, scale, fix_judgement)
+
+
+def run_steps(fixture_dir: str, saved_dir: str, measure):
+    if os.path.exists(saved_dir):
+        shutil.rmtree(saved_dir)
+    os.makedirs(saved_dir)
+
+    # What `Dump.load_domjudge_api` sets up, its `process_domjudge_raw_data`
+    # is left to the next step so that it is not counted twice
+    c = DumpConfig({"saved_dir": saved_dir, "exported_data": {
+        "domjudge_api": False, "domjudge_api_clarifications": False}})
+    c.base_file_path = fixture_dir
+
+    d = Dump(c)
+    d.init_logging()
+    d.logger.setLevel("WARNING")
+
+    # The same calls as `Dump.dump_3rd_data`, one at a time
+    measure("load_domjudge_api", d.dump_domjudge_api)
+    measure("process_domjudge_raw_data", d.process_domjudge_raw_data)
+    measure("get_ghost_dat_data",
+            lambda: d.write_ghost_dat_data(d.contest_model))
+    measure("get_resolver_data",
+            lambda: d.write_resolver_data(d.contest_model))
+    measure("get_excel_data",
+            lambda: d.write_excel_data(d.contest_model, d.scoreboard))
+
+    return len(d.submissions)
+
+
+def bench_scale(fixture_dir: str, saved_dir: str, repeat: int, trace_memory: bool):
+    seconds = {step: [] for step in kSteps}
+    peak = {}
+
+    def measure_time(step, fn):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        seconds[step].append(time.perf_counter() - start)
+
+    for _ in range(repeat):
+        submission_nums = run_steps(fixture_dir, saved_dir, measure_time)
+
+    # Time and memory are measured in separate runs,
+    # since tracing slows down every allocation
+    def measure_memory(step, fn):
+        gc.collect()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, step_peak = tracemalloc.get_traced_memory()
+        peak[step] = step_peak - base
+
+    if trace_memory:
+        tracemalloc.start()
+        run_steps(fixture_dir, saved_dir, measure_memory)
+        tracemalloc.stop()
+
+    results = []
+    for step in kSteps:
+        results.append({
+            "step": step,
+            "seconds": min(seconds[step]),
+            "peak_mib": peak[step] / 1024 / 1024 if step in peak else None,
+        })
+
+    return submission_nums, results
+
+
+def get_git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=kBenchmarkDir,
+                                       stderr=subprocess.DEVNULL).decode('utf-8').strip()
+    except Exception:
+        return None
+
+
+def format_row(scale, submission_nums, result, old_result=None):
+    row = "{:>6}x {:>9} {:<28} {:>10.3f}s".format(
+        scale, submission_nums, result["step"], result["seconds"])
+
+    if result["peak_mib"] is not None:
+        row += " {:>10.2f} MiB".format(result["peak_mib"])
+    else:
+        row += " {:>14}".format("-")
+
+    if old_result is not None:
+        row += "   time {:+7.1f}%".format(
+            (result["seconds"] / old_result["seconds"] - 1) * 100)
+
+        if result["peak_mib"] is not None and old_result["peak_mib"]:
+            row += " memory {:+7.1f}%".format(
+                (result["peak_mib"] / old_result["peak_mib"] - 1) * 100)
+
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default="1,10,100,1000",
+                        help="comma separated multipliers of the submissions and judgements")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="the fastest of the repeated runs is reported")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the tracemalloc run")
+    parser.add_argument("--output", default=None,
+                        help="defaults to `results/dump-suite-<time>.json`")
+    parser.add_argument("--compare", default=None,
+                        help="a previous result file to compare against")
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(",")]
+
+    old_results = {}
+    if args.compare is not None:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            for r in json.load(f)["results"]:
+                old_results[(r["scale"], r["step"])] = r
+
+    now = datetime.datetime.now()
+    output = args.output
+    if output is None:
+        output = os.path.join(
+            kResultsDir, "dump-suite-{}.json".format(now.strftime("%Y%m%d-%H%M%S")))
+
+    report = {
+        "meta": {
+            "time": now.isoformat(timespec="seconds"),
+            "git_commit": get_git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": [],
+    }
+
+    tmp_dir = tempfile.mkdtemp()
+
+    try:
+        for scale in scales:
+            fixture_dir = os.path.join(tmp_dir, "fixture-{}x".format(scale))
+            make_scaled_fixture(fixture_dir, scale)
+
+            submission_nums, results = bench_scale(
+                fixture_dir, os.path.join(tmp_dir, "saved"), args.repeat, not args.no_memory)
+
+            shutil.rmtree(fixture_dir)
+
+            for result in results:
+                print(format_row(scale, submission_nums, result,
+                                 old_results.get((scale, result["step"]))))
+
+                report["results"].append({
+                    "scale": scale,
+                    "submissions": submission_nums,
+                    **result,
+                })
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print("results saved to {}".format(output))
+
+
+if __name__ == '__main__':
+    main()
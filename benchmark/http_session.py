@@ -0,0 +1,90 @@
+#! /usr/bin/env python3
+
+# Compare the requests per second of the pooled keep-alive session used by `Dump`
+# against the previous behavior (a new `requests.get` with `Connection: close` per call).
+#
+# python3 http_session.py --base-url https://example.com/domjudge/ --userpwd admin:password --cid 1
+#
+# Without `--base-url`, the mock server serving
+# `tests/test_data/9th_ccpc_guilin` is started and used instead.
+
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), os.pardir))
+
+from domjudge_utility import Dump, DumpConfig  # noqa: E402
+from domjudge_utility.mock_server import MockServer, MockServerConfig  # noqa: E402
+
+kFixtureDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                           "tests", "test_data", "9th_ccpc_guilin")
+
+
+def bench(name, fn, url, count):
+    start = time.perf_counter()
+    size = 0
+
+    for _ in range(count):
+        size += len(fn(url).content)
+
+    cost = time.perf_counter() - start
+
+    print("{:<10} {:>8} requests {:>8.2f}s {:>10.2f} req/s {:>10.2f} MiB".format(
+        name, count, cost, count / cost, size / 1024 / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="")
+    parser.add_argument("--userpwd", default="")
+    parser.add_argument("--cid", default="5")
+    parser.add_argument("--endpoint", default="problems")
+    parser.add_argument("--count", type=int, default=200)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+
+    if base_url == "":
+        server = MockServer(MockServerConfig({
+            "fixture_dir": kFixtureDir,
+            "port": 0,
+        })).start_in_thread()
+        base_url = server.get_base_url()
+
+    d = Dump(DumpConfig({
+        "base_url": base_url,
+        "userpwd": args.userpwd,
+        "cid": args.cid,
+    }))
+    d.init_logging()
+
+    url = d.get_api_url(args.endpoint)
+
+    legacy_headers = dict(d.headers)
+    legacy_headers["Connection"] = "close"
+    legacy_headers.pop("Accept-Encoding")
+
+    def legacy(url):
+        # requests sends `Accept-Encoding` by default,
+        # so disable it explicitly to match an uncompressed body
+        headers = dict(legacy_headers)
+        headers["Accept-Encoding"] = "identity"
+        return requests.get(url=url, headers=headers)
+
+    bench("legacy", legacy, url, args.count)
+    bench("pooled", d.send_request, url, args.count)
+
+    d.close()
+
+    if server is not None:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
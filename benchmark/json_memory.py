@@ -0,0 +1,107 @@
+#! /usr/bin/env python3
+
+# Compare the peak memory of loading a large `submissions.json`
+# through the buffered path of `Dump.request_json_and_save`
+# against the streaming path (`json_streaming: true`).
+#
+# python3 json_memory.py --records 100000
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), os.pardir))
+
+from domjudge_utility import Dump, DumpConfig  # noqa: E402
+from domjudge_utility.mock_server import MockServer, MockServerConfig  # noqa: E402
+
+
+def make_api_dir(path: str, records: int):
+    os.makedirs(path)
+
+    with open(os.path.join(path, "contest.json"), 'w') as f:
+        json.dump({"id": "5", "name": "json memory"}, f)
+
+    with open(os.path.join(path, "submissions.json"), 'w') as f:
+        json.dump([{
+            "language_id": "cpp",
+            "time": "2023-10-29T09:56:43.394+08:00",
+            "contest_time": "0:56:43.394",
+            "team_id": str(i % 300 + 1),
+            "problem_id": str(i % 13 + 4),
+            "id": str(i + 1),
+            "external_id": None,
+            "entry_point": None,
+            "files": [{"href": "contests/5/submissions/{}/files".format(i + 1), "mime": "application/zip"}],
+        } for i in range(records)], f, separators=(',', ':'))
+
+    return os.path.getsize(os.path.join(path, "submissions.json"))
+
+
+def bench(name, base_url, saved_dir, json_streaming):
+    d = Dump(DumpConfig({
+        "base_url": base_url,
+        "cid": 5,
+        "saved_dir": saved_dir,
+        "json_streaming": json_streaming,
+    }))
+    d.init_logging()
+    d.logger.setLevel("WARNING")
+
+    # Time and memory are measured in separate runs,
+    # since tracing slows down every allocation
+    gc.collect()
+    start = time.perf_counter()
+    records = d.request_json_and_save('submissions', 'submissions.json')
+    cost = time.perf_counter() - start
+
+    del records
+    gc.collect()
+
+    tracemalloc.start()
+    records = d.request_json_and_save('submissions', 'submissions.json')
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("{:<10} {:>8} records {:>8.2f}s peak {:>8.2f} MiB retained {:>8.2f} MiB".format(
+        name, len(records), cost, peak / 1024 / 1024, current / 1024 / 1024))
+
+    d.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+
+    try:
+        fixture_dir = os.path.join(tmp_dir, "fixture")
+        size = make_api_dir(os.path.join(
+            fixture_dir, "domjudge", "api"), args.records)
+        print("submissions.json {:.2f} MiB".format(size / 1024 / 1024))
+
+        server = MockServer(MockServerConfig({
+            "fixture_dir": fixture_dir,
+            "port": 0,
+        })).start_in_thread()
+        base_url = server.get_base_url()
+
+        bench("buffered", base_url, os.path.join(tmp_dir, "buffered"), False)
+        bench("streaming", base_url, os.path.join(tmp_dir, "streaming"), True)
+
+        server.stop()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
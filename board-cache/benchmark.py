@@ -0,0 +1,230 @@
+#! /usr/bin/env python3
+
+# Compares the rewrite engines on a captured scoreboard page,
+# or on a generated one shaped like the DOMjudge public scoreboard
+#
+#   python3 benchmark.py --page ./captured.html
+#   python3 benchmark.py --teams 600 --problems 13
+
+import argparse
+import random
+import time
+from html.parser import HTMLParser
+
+import config
+import rewriter
+
+
+def generate_scoreboard_page(url_prefix: str, team_nums: int, problem_nums: int) -> str:
+    rnd = random.Random(0)
+
+    html = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
+    <title>Scoreboard</title>
+    <link rel="icon" href="{prefix}favicon.ico">
+    <link rel="stylesheet" href="{prefix}style_domjudge.css">
+    <script src="{prefix}js/jquery.min.js"></script>
+    <script src="{prefix}js/domjudge.js"></script>
+</head>
+<body>
+<nav class="navbar navbar-expand-md navbar-dark bg-dark fixed-top">
+    <a class="navbar-brand hidden-sm-down" href="{prefix}public">DOMjudge</a>
+    <button class="navbar-toggler" type="button" data-toggle="collapse" data-target="#menuDefault">
+        <span class="navbar-toggler-icon"></span>
+    </button>
+    <div class="collapse navbar-collapse" id="menuDefault">
+        <ul class="navbar-nav mr-auto">
+            <li class="nav-item active">
+                <a class="nav-link" href="{prefix}public"><i class="fas fa-list-ol"></i> Scoreboard</a>
+            </li>
+            <li class="nav-item">
+                <a class="nav-link" href="{prefix}public/problems"><i class="fas fa-book-open"></i> Problemset</a>
+            </li>
+        </ul>
+        <div class="dropdown">
+            <a class="btn btn-outline-secondary btn-sm dropdown-toggle" data-toggle="dropdown" href="#">
+                <i class="fas fa-trophy"></i> contest
+            </a>
+            <div class="dropdown-menu">
+                <a class="dropdown-item" href="{prefix}public/change-contest/1">contest</a>
+            </div>
+        </div>
+        <a class="btn btn-info btn-sm justify-content-center" href="{prefix}login">
+            <i class="fas fa-sign-in-alt"></i> Login
+        </a>
+    </div>
+</nav>
+<div class="container-fluid">
+    <div data-ajax-refresh-target>
+        <!-- scoreboard -->
+        <table class="scoreboard center">
+            <thead>
+            <tr class="scoreheader">
+                <th title="rank" scope="col">rank</th>
+                <th title="team name" scope="col" colspan="2">team</th>
+                <th title="# solved / penalty time" colspan="2" scope="col">score</th>
+'''.format(prefix=url_prefix)
+
+    for p in range(problem_nums):
+        html += '''                <th title="problem {label}" scope="col">
+                    <a href="{prefix}public/problems/{p}/text">
+                        <span class="badge problem-badge" style="background-color: #ffffff;">{label}</span>
+                    </a>
+                </th>
+'''.format(prefix=url_prefix, p=p, label=chr(ord('A') + p))
+
+    html += '''            </tr>
+            </thead>
+            <tbody>
+'''
+
+    for t in range(team_nums):
+        html += '''            <tr class="" id="team:{t}">
+                <td class="scorepl rank">{rank}</td>
+                <td class="scoreaf">
+                    <img loading="lazy" src="{prefix}images/affiliations/{a}.png" alt="org{a}" title="University {a}" class="affiliation-logo">
+                </td>
+                <td class="scoretn cl_FFFFFF" title="team{t}">
+                    <a href="{prefix}public/teams/{t}">
+                        <span class="forceWidth">Team {t}</span>
+                        <span class="univ forceWidth">University {a}</span>
+                    </a>
+                </td>
+                <td class="scorenc">{solved}</td>
+                <td class="scorett">{penalty}</td>
+'''.format(prefix=url_prefix, t=t, rank=t + 1, a=t % 100,
+           solved=rnd.randint(0, problem_nums), penalty=rnd.randint(0, 3000))
+
+        for p in range(problem_nums):
+            tries = rnd.randint(0, 4)
+
+            if tries == 0:
+                cell = '<div class="score_cell"></div>'
+            elif rnd.random() < 0.6:
+                cell = '<div class="score_correct">{}<span>{} {}</span></div>'.format(
+                    rnd.randint(1, 300), tries, "try" if tries == 1 else "tries")
+            else:
+                cell = '<div class="score_incorrect">&nbsp;<span>{} tries</span></div>'.format(
+                    tries)
+
+            html += '''                <td class="score_cell">
+                    <a href="{prefix}public/teams/{t}">{cell}</a>
+                </td>
+'''.format(prefix=url_prefix, t=t, cell=cell)
+
+        html += '''            </tr>
+'''
+
+    html += '''            </tbody>
+        </table>
+    </div>
+</div>
+<script>
+    $(function () {{
+        initializeAjaxRefresh('{prefix}public', 30);
+        window.location.hash && $('html, body').scrollTop(0);
+    }});
+</script>
+</body>
+</html>
+'''.format(prefix=url_prefix)
+
+    return html
+
+
+class Signature(HTMLParser):
+    # Tags, attributes and text, ignoring quoting and whitespace
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.items = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = [(k, " ".join((v or '').split())) for k, v in attrs]
+        self.items.append(("<", tag, tuple(sorted(attrs))))
+
+    def handle_endtag(self, tag):
+        self.items.append((">", tag))
+
+    def handle_data(self, data):
+        data = " ".join(data.split())
+        if len(data) > 0:
+            self.items.append(("#", data))
+
+
+def get_signature(html: str):
+    parser = Signature()
+    parser.feed(html)
+    parser.close()
+    return parser.items
+
+
+def run(name: str, html_rewriter, html: str, fetch_item: config.FetchItem, rounds: int):
+    elapsed = []
+    output = None
+
+    for _ in range(rounds):
+        start = time.perf_counter()
+        output = html_rewriter.rewrite(html, fetch_item)
+        elapsed.append(time.perf_counter() - start)
+
+    print("{:<8} min={:8.2f}ms avg={:8.2f}ms size={}".format(
+        name, min(elapsed) * 1000, sum(elapsed) / len(elapsed) * 1000, len(output.encode("utf-8"))))
+
+    return output, min(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page", default=None,
+                        help="a captured DOMjudge public scoreboard page")
+    parser.add_argument("--url-prefix", default="/domjudge/")
+    parser.add_argument("--assets-url", default="https://assets.example.com/domjudge/")
+    parser.add_argument("--teams", type=int, default=600)
+    parser.add_argument("--problems", type=int, default=13)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.page is not None:
+        with open(args.page, "r", encoding="utf-8") as f:
+            html = f.read()
+    else:
+        html = generate_scoreboard_page(
+            args.url_prefix, args.teams, args.problems)
+
+    c = config.Config(
+        url="http://127.0.0.1/domjudge/public",
+        url_prefix=args.url_prefix,
+        saved_dir="./data",
+        assets_url=args.assets_url,
+        refresh_time=1,
+        fetch_list=[
+            {"url_suffix": "?clear=clear", "dir_name": "all",
+                "show_name": "All", "show_url": "/scoreboard"},
+            {"url_suffix": "?categories[]=10&filter=filter", "dir_name": "benchmark",
+                "show_name": "Benchmark", "show_url": args.url_prefix + "scoreboard/benchmark"},
+        ],
+    )
+
+    fetch_item = c.fetch_list[0]
+
+    print("page size={}".format(len(html.encode("utf-8"))))
+
+    bs4_output, bs4_elapsed = run(
+        "bs4", rewriter.BS4Rewriter(c), html, fetch_item, args.rounds)
+    stream_output, stream_elapsed = run(
+        "stream", rewriter.StreamRewriter(c), html, fetch_item, args.rounds)
+
+    print("speedup={:.1f}x".format(bs4_elapsed / stream_elapsed))
+
+    if get_signature(bs4_output) == get_signature(stream_output):
+        print("outputs are equivalent")
+    else:
+        print("outputs differ")
+
+
+if __name__ == "__main__":
+    main()
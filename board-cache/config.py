@@ -11,7 +11,9 @@ class FetchItem:
 
 
 class Config:
-    def __init__(self, url, url_prefix, saved_dir, assets_url, refresh_time, fetch_list):
+    def __init__(self, url, url_prefix, saved_dir, assets_url, refresh_time, fetch_list,
+                 fetch_parallels_nums=16, parse_parallels_nums=None, precompress_brotli=False,
+                 rewrite_engine="stream", serve=False, serve_host="0.0.0.0", serve_port=8000):
         self.url = url
         self.url_prefix = url_prefix
         self.saved_dir = saved_dir
@@ -19,6 +21,22 @@ class Config:
         self.refresh_time = refresh_time
         self.fetch_list = [FetchItem(**item) for item in fetch_list]
 
+        self.fetch_parallels_nums = fetch_parallels_nums
+
+        # `None` means the number of CPUs
+        self.parse_parallels_nums = parse_parallels_nums
+
+        # `index.html.gz` is always written, `index.html.br` needs `brotli`
+        self.precompress_brotli = precompress_brotli
+
+        # `stream` rewrites the page in one pass, `bs4` is the BeautifulSoup and htmlmin pipeline
+        self.rewrite_engine = rewrite_engine
+
+        # Also serve the latest pages from memory, at the `show_url` of every fetch item
+        self.serve = serve
+        self.serve_host = serve_host
+        self.serve_port = serve_port
+
 
 def load_config() -> Config:
     config_path = os.getenv("CONFIG_FILE_PATH", "./config.yaml")
@@ -1,113 +1,212 @@
+import asyncio
+import gzip
+import hashlib
 import os
-import requests
-import htmlmin
 import time
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 import config
+import rewriter
+import server
 from logger import init_logger
 
 global_config = config.load_config()
 logger = init_logger()
 
+# Built at import, so every worker process has its own precompiled menus
+html_rewriter = rewriter.create_rewriter(global_config)
+
+kFetchTimeout = 5
+
+# dir_name -> sha256 of the saved `index.html`
+saved_sha256 = {}
+
+kHeaders = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36",
+}
 
-def replace_html(html: str, current_fetch_item: config.FetchItem) -> str:
-    from bs4 import BeautifulSoup
 
-    soup = BeautifulSoup(html, 'html.parser')
+def process_html(html: str, fetch_item: config.FetchItem, last_sha256):
+    # Runs in the worker processes, parsing and compressing are CPU bound
+    html = html_rewriter.rewrite(html, fetch_item)
 
-    element = soup.find('a', {'href': global_config.url_prefix + "public"})
-    if element is not None:
-        element.extract()
+    data = html.encode("utf-8")
+    sha256 = hashlib.sha256(data).hexdigest()
 
-    element = soup.find('div', {'id': 'menuDefault'}).find('ul')
-    if element is not None:
-        element.extract()
+    if sha256 == last_sha256:
+        return sha256, None, None, None
 
-    element = soup.find('a', {'href': global_config.url_prefix + "login"})
-    if element is not None:
-        element.extract()
+    # `mtime=0` keeps the output stable for the same content
+    gz_data = gzip.compress(data, 9, mtime=0)
 
-    element = soup.find('div', {'class': 'dropdown'})
-    if element is not None:
-        element.insert_after(soup.new_tag('br'))
-        element.extract()
+    br_data = None
+    if global_config.precompress_brotli:
+        br_data = brotli.compress(data, mode=brotli.MODE_TEXT)
 
-    html = str(soup)
+    return sha256, data, gz_data, br_data
 
-    flag_div = '<div class="collapse navbar-collapse" id="menuDefault">'
 
-    board_menu = '''
-<ul class="navbar-nav mr-auto">
-    '''
+def write_file(path: str, data: bytes):
+    # The web server never sees a half-written file
+    tmp_path = path + ".tmp"
 
-    for item in global_config.fetch_list:
-        board_menu += '''
-    <li class="nav-item {active}">
-        <a class="nav-link" href="{show_url}">{show_name}</a>
-    </li>
-        '''.format(
-            active="active" if item.dir_name == current_fetch_item.dir_name else "",
-            show_url=item.show_url,
-            show_name=item.show_name,
-        )
+    with open(tmp_path, "wb") as f:
+        f.write(data)
 
-    board_menu += "</ul>"
+    os.replace(tmp_path, path)
 
-    html = html.replace(flag_div, flag_div + board_menu)
 
-    html = html.replace("'" + global_config.url_prefix +
-                        "public'", "'" + current_fetch_item.show_url + "'")
+def get_saved_sha256(fetch_item: config.FetchItem):
+    if fetch_item.dir_name not in saved_sha256:
+        saved_file = os.path.join(
+            global_config.saved_dir, fetch_item.dir_name, "index.html")
 
-    return html
+        # Left by the previous run
+        if os.path.exists(saved_file):
+            with open(saved_file, "rb") as f:
+                saved_sha256[fetch_item.dir_name] = hashlib.sha256(
+                    f.read()).hexdigest()
+        else:
+            saved_sha256[fetch_item.dir_name] = None
 
+    return saved_sha256[fetch_item.dir_name]
 
-def replace_assets_url(html: str) -> str:
-    if global_config.assets_url is None:
-        return html
 
-    html = html.replace(global_config.url_prefix, global_config.assets_url)
-    return html
+def save_html(fetch_item: config.FetchItem, sha256, data: bytes, gz_data: bytes, br_data):
+    saved_dir = os.path.join(global_config.saved_dir, fetch_item.dir_name)
+    if not os.path.exists(saved_dir):
+        os.makedirs(saved_dir)
+
+    saved_file = os.path.join(saved_dir, "index.html")
 
+    # The compressed files go first,
+    # so they are never older than the `index.html` next to them
+    if br_data is not None:
+        write_file(saved_file + ".br", br_data)
+    elif os.path.exists(saved_file + ".br"):
+        os.remove(saved_file + ".br")
 
-def minify_html(html: str) -> str:
-    html = htmlmin.minify(html)
-    return html
+    write_file(saved_file + ".gz", gz_data)
+    write_file(saved_file, data)
 
+    saved_sha256[fetch_item.dir_name] = sha256
 
-def fetch_html(fetch_item: config.FetchItem):
+
+async def fetch_html(session: aiohttp.ClientSession, executor: ProcessPoolExecutor,
+                     page_server, fetch_item: config.FetchItem):
     url = global_config.url + fetch_item.url_suffix
     logger.info("fetch html. [url={}]".format(url))
 
-    headers = {
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36",
-    }
+    start = time.monotonic()
 
-    resp = requests.get(url, timeout=5, headers=headers)
+    async with session.get(url, headers=kHeaders) as resp:
+        if resp.status != 200:
+            raise RuntimeError(
+                "fetch failed. [url={}] [status_code={}]".format(url, resp.status))
 
-    saved_dir = os.path.join(global_config.saved_dir, fetch_item.dir_name)
-    if not os.path.exists(saved_dir):
-        os.makedirs(saved_dir)
+        html = await resp.text()
 
-    html = resp.text
-    html = replace_html(html, fetch_item)
-    html = replace_assets_url(html)
-    html = minify_html(html)
+    fetched = time.monotonic()
 
-    saved_file = os.path.join(saved_dir, "index.html")
-    with open(saved_file, "w") as f:
-        f.write(html)
+    loop = asyncio.get_running_loop()
+
+    # Disk IO goes to the default thread pool, the loop keeps serving pages meanwhile
+    last_sha256 = await loop.run_in_executor(None, get_saved_sha256, fetch_item)
+
+    # The page left on disk by the previous run is not in memory yet
+    if page_server is not None and not page_server.has_page(fetch_item):
+        last_sha256 = None
+
+    sha256, data, gz_data, br_data = await loop.run_in_executor(
+        executor, process_html, html, fetch_item, last_sha256)
+
+    processed = time.monotonic()
+
+    saved = data is not None
+    if saved:
+        if page_server is not None:
+            page_server.update(fetch_item, sha256, data, gz_data, br_data)
+
+        await loop.run_in_executor(None, save_html, fetch_item, sha256, data, gz_data, br_data)
+
+    return (fetched - start, processed - fetched, time.monotonic() - start, saved)
+
+
+async def refresh(session: aiohttp.ClientSession, executor: ProcessPoolExecutor, page_server):
+    start = time.monotonic()
+
+    # Every item succeeds or fails on its own
+    results = await asyncio.gather(*[fetch_html(session, executor, page_server, fetch_item)
+                                     for fetch_item in global_config.fetch_list],
+                                   return_exceptions=True)
+
+    report = []
+    failed_nums = 0
+
+    for fetch_item, result in zip(global_config.fetch_list, results):
+        if isinstance(result, BaseException):
+            failed_nums += 1
+            logger.error("refresh failed. [dir_name={}] [err={}]".format(
+                fetch_item.dir_name, repr(result)))
+            report.append("{}=failed".format(fetch_item.dir_name))
+        else:
+            fetch_time, process_time, total_time, saved = result
+            report.append("{}={:.0f}ms(fetch={:.0f}ms,process={:.0f}ms,{})".format(
+                fetch_item.dir_name, total_time * 1000, fetch_time * 1000, process_time * 1000,
+                "saved" if saved else "unchanged"))
+
+    elapsed = time.monotonic() - start
+
+    logger.info("refresh cycle done. [elapsed={:.0f}ms] [succeeded={}] [failed={}] {}".format(
+        elapsed * 1000, len(results) - failed_nums, failed_nums,
+        " ".join("[{}]".format(r) for r in report)))
+
+    if elapsed > global_config.refresh_time:
+        logger.warning("refresh cycle is longer than refresh_time. [elapsed={:.0f}ms] [refresh_time={}s]".format(
+            elapsed * 1000, global_config.refresh_time))
+
+    return elapsed
+
+
+async def async_main():
+    if global_config.precompress_brotli and brotli is None:
+        raise RuntimeError(
+            "precompress_brotli is enabled, but brotli is not installed")
+
+    connector = aiohttp.TCPConnector(limit=global_config.fetch_parallels_nums)
+    timeout = aiohttp.ClientTimeout(total=kFetchTimeout)
+
+    page_server = None
+    if global_config.serve:
+        page_server = server.PageServer(global_config)
+        await page_server.start()
+
+        logger.info("serving pages. [host={}] [port={}]".format(
+            global_config.serve_host, global_config.serve_port))
+
+    try:
+        with ProcessPoolExecutor(max_workers=global_config.parse_parallels_nums) as executor:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                while True:
+                    elapsed = await refresh(session, executor, page_server)
+
+                    # Keep the cadence at `refresh_time` regardless of how long the cycle took
+                    await asyncio.sleep(max(0, global_config.refresh_time - elapsed))
+    finally:
+        if page_server is not None:
+            await page_server.close()
 
 
 def main():
-    while True:
-        try:
-            for fetch_item in global_config.fetch_list:
-                fetch_html(fetch_item)
-        except Exception as e:
-            logger.error(e)
-
-        time.sleep(global_config.refresh_time)
+    asyncio.run(async_main())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,315 @@
+import re
+
+import config
+
+# comment | doctype | start or end tag | text
+kToken = re.compile(
+    r'<!--.*?-->|<![^>]*>|<(/?)([a-zA-Z][a-zA-Z0-9:-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>|[^<]+|<', re.S)
+
+kAttr = re.compile(
+    r'([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+)))?')
+
+kWhitespace = re.compile(r'[ \t\n\r\f]+')
+
+# elements whose content is kept verbatim, `</script>` may be in any case
+kRawTextEnd = {
+    'script': re.compile(r'</script\s*>', re.I),
+    'style': re.compile(r'</style\s*>', re.I),
+}
+kPreformattedTags = {'pre', 'textarea'}
+
+
+class BS4Rewriter:
+    # The original pipeline, kept as a fallback and as the baseline of `benchmark.py`
+
+    def __init__(self, c: config.Config):
+        self.c = c
+
+    def replace_html(self, html: str, current_fetch_item: config.FetchItem) -> str:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser')
+
+        element = soup.find('a', {'href': self.c.url_prefix + "public"})
+        if element is not None:
+            element.extract()
+
+        element = soup.find('div', {'id': 'menuDefault'}).find('ul')
+        if element is not None:
+            element.extract()
+
+        element = soup.find('a', {'href': self.c.url_prefix + "login"})
+        if element is not None:
+            element.extract()
+
+        element = soup.find('div', {'class': 'dropdown'})
+        if element is not None:
+            element.insert_after(soup.new_tag('br'))
+            element.extract()
+
+        html = str(soup)
+
+        flag_div = '<div class="collapse navbar-collapse" id="menuDefault">'
+
+        board_menu = '''
+<ul class="navbar-nav mr-auto">
+    '''
+
+        for item in self.c.fetch_list:
+            board_menu += '''
+    <li class="nav-item {active}">
+        <a class="nav-link" href="{show_url}">{show_name}</a>
+    </li>
+        '''.format(
+                active="active" if item.dir_name == current_fetch_item.dir_name else "",
+                show_url=item.show_url,
+                show_name=item.show_name,
+            )
+
+        board_menu += "</ul>"
+
+        html = html.replace(flag_div, flag_div + board_menu)
+
+        html = html.replace("'" + self.c.url_prefix +
+                            "public'", "'" + current_fetch_item.show_url + "'")
+
+        return html
+
+    def replace_assets_url(self, html: str) -> str:
+        if self.c.assets_url is None:
+            return html
+
+        html = html.replace(self.c.url_prefix, self.c.assets_url)
+        return html
+
+    def minify_html(self, html: str) -> str:
+        import htmlmin
+
+        html = htmlmin.minify(html)
+        return html
+
+    def rewrite(self, html: str, fetch_item: config.FetchItem) -> str:
+        html = self.replace_html(html, fetch_item)
+        html = self.replace_assets_url(html)
+        html = self.minify_html(html)
+        return html
+
+
+class StreamRewriter:
+    # Does the element removals, the menu injection, the url rewrite
+    # and the whitespace collapsing in one pass over the tokens
+
+    def __init__(self, c: config.Config):
+        self.c = c
+
+        self.public_href = c.url_prefix + "public"
+        self.login_href = c.url_prefix + "login"
+        self.quoted_public_url = "'" + self.public_href + "'"
+
+        # The menu only depends on the fetch item, build it once
+        self.board_menus = {}
+        for current_fetch_item in c.fetch_list:
+            board_menu = '<ul class="navbar-nav mr-auto">'
+
+            for item in c.fetch_list:
+                board_menu += '<li class="nav-item{active}"><a class="nav-link" href="{show_url}">{show_name}</a></li>'.format(
+                    active=" active" if item.dir_name == current_fetch_item.dir_name else "",
+                    show_url=item.show_url,
+                    show_name=item.show_name,
+                )
+
+            board_menu += "</ul>"
+
+            # The menu gets the same url rewrite as the rest of the page
+            if c.assets_url is not None:
+                board_menu = board_menu.replace(c.url_prefix, c.assets_url)
+
+            self.board_menus[current_fetch_item.dir_name] = board_menu
+
+    def get_attrs(self, attrs: str):
+        res = {}
+        for m in kAttr.finditer(attrs):
+            value = m.group(2)
+            if value is None:
+                value = m.group(3)
+            if value is None:
+                value = m.group(4) or ''
+            res.setdefault(m.group(1).lower(), value)
+
+        return res
+
+    def replace_url(self, s: str, quoted_show_url: str) -> str:
+        if self.c.url_prefix not in s:
+            return s
+
+        s = s.replace(self.quoted_public_url, quoted_show_url)
+
+        if self.c.assets_url is not None:
+            s = s.replace(self.c.url_prefix, self.c.assets_url)
+
+        return s
+
+    def rewrite(self, html: str, fetch_item: config.FetchItem) -> str:
+        board_menu = self.board_menus[fetch_item.dir_name]
+        quoted_show_url = "'" + fetch_item.show_url + "'"
+        url_prefix = self.c.url_prefix
+
+        # Only the first match of every target is touched
+        public_removed = False
+        login_removed = False
+        menu_found = False
+        menu_ul_removed = False
+        dropdown_removed = False
+
+        # Inside the `div#menuDefault`
+        menu_depth = 0
+
+        # The element being dropped, counts nested elements of the same name
+        skip_tag = None
+        skip_depth = 0
+        skip_replacement = None
+
+        preformatted_depth = 0
+        last_space = False
+
+        out = []
+        append = out.append
+
+        match = kToken.match
+        pos = 0
+        end = len(html)
+
+        while pos < end:
+            m = match(html, pos)
+            token, slash, name, attrs = m.group(0, 1, 2, 3)
+            pos = m.end()
+
+            if name is None:
+                if skip_tag is not None:
+                    continue
+
+                if token[0] == '<' and len(token) > 1:
+                    # Comments and doctype
+                    append(token)
+                    last_space = False
+                    continue
+
+                if preformatted_depth > 0:
+                    append(self.replace_url(token, quoted_show_url))
+                    continue
+
+                text = kWhitespace.sub(' ', token)
+                if last_space and text[0] == ' ':
+                    text = text[1:]
+                    if len(text) == 0:
+                        continue
+
+                if url_prefix in text:
+                    text = self.replace_url(text, quoted_show_url)
+
+                append(text)
+                last_space = text[-1] == ' '
+                continue
+
+            name = name.lower()
+            is_end = slash == '/'
+
+            if skip_tag is not None:
+                if name == skip_tag:
+                    skip_depth += -1 if is_end else 1
+
+                    if skip_depth == 0:
+                        skip_tag = None
+
+                        if skip_replacement is not None:
+                            append(skip_replacement)
+                            last_space = False
+                elif name in kRawTextEnd and not is_end:
+                    pos = self.find_raw_text_end(html, name, pos)
+
+                continue
+
+            if is_end:
+                if menu_depth > 0 and name == 'div':
+                    menu_depth -= 1
+                elif name in kPreformattedTags and preformatted_depth > 0:
+                    preformatted_depth -= 1
+
+                append(token)
+                last_space = False
+                continue
+
+            if name == 'a' and not (public_removed and login_removed) and 'href' in token:
+                href = self.get_attrs(attrs).get('href')
+
+                if not public_removed and href == self.public_href:
+                    public_removed = True
+                    skip_tag, skip_depth, skip_replacement = 'a', 1, None
+                    continue
+
+                if not login_removed and href == self.login_href:
+                    login_removed = True
+                    skip_tag, skip_depth, skip_replacement = 'a', 1, None
+                    continue
+
+            elif name == 'ul' and menu_depth > 0 and not menu_ul_removed:
+                menu_ul_removed = True
+                skip_tag, skip_depth, skip_replacement = 'ul', 1, None
+                continue
+
+            elif name == 'div':
+                if menu_depth > 0:
+                    menu_depth += 1
+
+                if not dropdown_removed and 'dropdown' in token:
+                    classes = self.get_attrs(attrs).get('class', '').split()
+
+                    if 'dropdown' in classes:
+                        dropdown_removed = True
+
+                        if menu_depth > 0:
+                            menu_depth -= 1
+
+                        skip_tag, skip_depth, skip_replacement = 'div', 1, '<br>'
+                        continue
+
+                if not menu_found and 'menuDefault' in token and \
+                        self.get_attrs(attrs).get('id') == 'menuDefault':
+                    menu_found = True
+                    menu_depth = 1
+
+                    append(self.replace_url(token, quoted_show_url))
+                    append(board_menu)
+                    last_space = False
+                    continue
+
+            append(self.replace_url(token, quoted_show_url)
+                   if url_prefix in token else token)
+            last_space = False
+
+            if name in kRawTextEnd:
+                raw_end = self.find_raw_text_end(html, name, pos)
+                append(self.replace_url(html[pos:raw_end], quoted_show_url))
+                pos = raw_end
+            elif name in kPreformattedTags:
+                preformatted_depth += 1
+
+        return ''.join(out)
+
+    def find_raw_text_end(self, html: str, name: str, pos: int) -> int:
+        m = kRawTextEnd[name].search(html, pos)
+        if m is None:
+            return len(html)
+
+        return m.start()
+
+
+def create_rewriter(c: config.Config):
+    if c.rewrite_engine == "bs4":
+        return BS4Rewriter(c)
+
+    if c.rewrite_engine == "stream":
+        return StreamRewriter(c)
+
+    raise RuntimeError(
+        "unknown rewrite_engine. [rewrite_engine={}]".format(c.rewrite_engine))
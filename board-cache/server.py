@@ -0,0 +1,132 @@
+import time
+from email.utils import formatdate
+
+from aiohttp import web
+
+import config
+
+
+class Page:
+    # Never mutated, the refresher swaps in a new one
+    __slots__ = ('sha256', 'data', 'gz_data', 'br_data', 'last_modified')
+
+    def __init__(self, sha256, data: bytes, gz_data: bytes, br_data):
+        self.sha256 = sha256
+        self.data = data
+        self.gz_data = gz_data
+        self.br_data = br_data
+        self.last_modified = formatdate(time.time(), usegmt=True)
+
+
+def get_accepted_encodings(accept_encoding: str):
+    encodings = set()
+
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip()
+
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+
+        encodings.add(coding.strip().lower())
+
+    return encodings
+
+
+def is_not_modified(if_none_match: str, etag: str):
+    if if_none_match.strip() == "*":
+        return True
+
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+
+        # `If-None-Match` uses the weak comparison
+        if tag.startswith("W/"):
+            tag = tag[2:]
+
+        if tag == etag:
+            return True
+
+    return False
+
+
+class PageServer:
+    def __init__(self, c: config.Config):
+        self.c = c
+
+        # dir_name -> Page
+        self.pages = {}
+
+        # path -> dir_name
+        self.routes = {}
+        for item in c.fetch_list:
+            self.routes[self.normalize_path(item.show_url)] = item.dir_name
+
+        self.cache_control = "public, max-age={}".format(
+            max(1, int(c.refresh_time)))
+
+        self.runner = None
+
+    def normalize_path(self, path: str):
+        return "/" + path.strip("/")
+
+    def has_page(self, fetch_item: config.FetchItem):
+        return fetch_item.dir_name in self.pages
+
+    def update(self, fetch_item: config.FetchItem, sha256, data: bytes, gz_data: bytes, br_data):
+        # A single assignment on the event loop, requests see either the old or the new page
+        self.pages[fetch_item.dir_name] = Page(sha256, data, gz_data, br_data)
+
+    async def handle(self, request: web.Request):
+        dir_name = self.routes.get(self.normalize_path(request.path))
+        page = self.pages.get(dir_name)
+
+        if page is None:
+            raise web.HTTPNotFound()
+
+        encodings = get_accepted_encodings(
+            request.headers.get("Accept-Encoding", ""))
+
+        headers = {
+            "Cache-Control": self.cache_control,
+            "Last-Modified": page.last_modified,
+            "Vary": "Accept-Encoding",
+        }
+
+        # Every representation has its own strong etag
+        if page.br_data is not None and "br" in encodings:
+            body, content_encoding = page.br_data, "br"
+            headers["ETag"] = '"{}-br"'.format(page.sha256)
+        elif "gzip" in encodings:
+            body, content_encoding = page.gz_data, "gzip"
+            headers["ETag"] = '"{}-gz"'.format(page.sha256)
+        else:
+            body, content_encoding = page.data, None
+            headers["ETag"] = '"{}"'.format(page.sha256)
+
+        if is_not_modified(request.headers.get("If-None-Match", ""), headers["ETag"]):
+            return web.Response(status=304, headers=headers)
+
+        if content_encoding is not None:
+            headers["Content-Encoding"] = content_encoding
+
+        return web.Response(body=body, headers=headers, content_type="text/html", charset="utf-8")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self.handle)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+
+        site = web.TCPSite(self.runner, self.c.serve_host, self.c.serve_port)
+        await site.start()
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
@@ -3,6 +3,9 @@
 import yaml
 import time
 import json
+import gzip
+import hashlib
+import threading
 
 
 from domjudge_utility import Dump, DumpConfig
@@ -10,12 +13,131 @@ from domjudge_utility import Dump, DumpConfig
 import requests
 
 
+kUploadUrl = "https://board-admin.xcpcio.com/upload-board-data"
+
+# (endpoint, filename, refresh interval in seconds)
+# `0` means fetching once, and afterwards only when its events arrive
+# `None` means following the events, with `max_interval` as a safety net
+kEndpoints = [
+    ('', 'contest.json', 60),
+    ('awards', 'awards.json', None),
+    ('scoreboard', 'scoreboard.json', None),
+    ('groups', 'groups.json', 300),
+    ('judgements', 'judgements.json', None),
+    ('judgement-types', 'judgement-types.json', 0),
+    ('languages', 'languages.json', 0),
+    ('organizations', 'organizations.json', 0),
+    ('problems', 'problems.json', 0),
+    ('teams', 'teams.json', 300),
+    ('submissions', 'submissions.json', None),
+]
+
+# event type -> the files it invalidates
+kEventTypes = {
+    'contests': ['contest.json', 'scoreboard.json'],
+    'state': ['contest.json', 'scoreboard.json', 'awards.json'],
+    'awards': ['awards.json'],
+    'groups': ['groups.json', 'scoreboard.json'],
+    'judgements': ['judgements.json', 'scoreboard.json', 'awards.json'],
+    'judgement-types': ['judgement-types.json'],
+    'languages': ['languages.json'],
+    'organizations': ['organizations.json'],
+    'problems': ['problems.json', 'scoreboard.json'],
+    'teams': ['teams.json', 'scoreboard.json'],
+    'submissions': ['submissions.json', 'scoreboard.json'],
+}
+
+
 class Config:
-    def __init__(self, base_url: str, userpwd: str, cid: str, xcpcio_token: str):
+    # the remaining keys of `config.yaml` belong to `DumpConfig`
+    def __init__(self, base_url: str, userpwd: str, cid: str, xcpcio_token: str,
+                 upload_url: str = kUploadUrl, upload_gzip: bool = False, upload_delta: bool = False,
+                 event_feed: bool = True, debounce_interval: float = 1, min_interval: float = 2,
+                 max_interval: float = 60, poll_interval: float = 5,
+                 refresh_intervals: dict = None, **kwargs):
         self.base_url = base_url
         self.userpwd = userpwd
         self.cid = cid
         self.xcpcio_token = xcpcio_token
+        self.upload_url = upload_url
+        self.upload_gzip = upload_gzip
+        self.upload_delta = upload_delta
+        self.event_feed = event_feed
+        self.debounce_interval = debounce_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.poll_interval = poll_interval
+        self.refresh_intervals = refresh_intervals or {}
+
+
+class Uploader:
+    kTimeout = 30
+
+    def __init__(self, c: Config, d: Dump):
+        self.c = c
+        self.d = d
+        self.session = requests.Session()
+
+        # filename -> sha256 of the content of the last successful upload
+        self.uploaded_hashes = {}
+
+    def get_changed_files(self, extra_files):
+        # The changed files, and the hashes of all files
+        changed_files = {}
+        hashes = {}
+
+        for filename, content in extra_files.items():
+            h = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            hashes[filename] = h
+
+            if self.uploaded_hashes.get(filename) != h:
+                changed_files[filename] = content
+
+        return changed_files, hashes
+
+    def upload(self, extra_files):
+        changed_files, hashes = self.get_changed_files(extra_files)
+
+        if len(changed_files) == 0:
+            self.d.logger.info("nothing changed, skip uploading.")
+            return
+
+        # Unless the receiver keeps the files missing from an upload,
+        # every upload carries all of them
+        if not self.c.upload_delta:
+            changed_files = extra_files
+
+        payload = {
+            "token": self.c.xcpcio_token,
+            "extra_files": changed_files,
+        }
+
+        headers = {
+            "content-type": "application/json",
+        }
+
+        body = json.dumps(payload).encode('utf-8')
+        raw_size = len(body)
+
+        if self.c.upload_gzip:
+            body = gzip.compress(body, 6)
+            headers["content-encoding"] = "gzip"
+
+        resp = self.session.post(
+            self.c.upload_url, data=body, headers=headers, timeout=self.kTimeout)
+
+        files = ",".join(changed_files.keys())
+
+        if resp.status_code == 200:
+            # Only a successful upload moves the baseline,
+            # failed files are sent again in the next round
+            self.uploaded_hashes.update(hashes)
+
+            self.d.logger.info("upload successful. [resp={}] [files={}] [size={}] [raw_size={}]".format(
+                resp.content, files, len(body), raw_size))
+        else:
+            self.d.logger.error("upload failed. [status_code={}] [resp={}] [files={}] [size={}] [raw_size={}]".format(
+                resp.status_code, resp.text, files, len(body), raw_size))
 
 
 def load_config():
@@ -25,57 +147,218 @@ def load_config():
         return config
 
 
-def dump(d: Dump, endpoint, filename, extra_files):
-    content = d.request_json(endpoint)
-    extra_files[filename] = content
+class EventFeedFollower(threading.Thread):
+    def __init__(self, d: Dump, scheduler):
+        super().__init__(daemon=True)
+
+        self.d = d
+        self.scheduler = scheduler
+
+        # `requests.Session` is not shared with the fetching thread
+        self.session = requests.Session()
+
+        self.last_token = None
+        self.last_id = None
+
+    def iter_lines(self, resp):
+        # `resp.iter_lines` waits for 512 bytes,
+        # which holds back events on a quiet feed,
+        # while `chunk_size=None` yields every chunk as soon as it arrives
+        buffer = b''
+
+        for chunk in resp.iter_content(chunk_size=None):
+            *lines, buffer = (buffer + chunk).split(b'\n')
+            yield from lines
+
+        if len(buffer) > 0:
+            yield buffer
+
+    def follow(self):
+        params = {'stream': 'true'}
+
+        # Resume after a reconnection instead of replaying the whole feed
+        if self.last_token is not None:
+            params['since_token'] = self.last_token
+        elif self.last_id is not None:
+            params['since_id'] = self.last_id
+
+        url = self.d.get_api_url('event-feed')
+        self.d.logger.info('follow {} [params={}]'.format(url, params))
+
+        with self.session.get(url, headers=self.d.headers, params=params, stream=True,
+                              timeout=(self.d.kTimeout, self.d.config.http_timeout)) as resp:
+            self.d.check_status_code(url, resp.status_code)
+            self.scheduler.set_event_feed_connected(True)
+
+            for line in self.iter_lines(resp):
+                # Keep-alive newlines
+                if len(line.strip()) == 0:
+                    continue
 
-    return content
+                event = json.loads(line)
 
+                if event.get('token') is not None:
+                    self.last_token = event['token']
+                elif event.get('id') is not None:
+                    self.last_id = event['id']
 
-def upload_all(c: Config, d: Dump):
-    extra_files = {}
+                filenames = kEventTypes.get(event.get('type'))
+                if filenames is not None:
+                    self.scheduler.mark_dirty(filenames)
 
-    contest = dump(d, '', 'contest.json', extra_files)
+    def run(self):
+        retry = 0
 
-    try:
-        awards = dump(d, 'awards', 'awards.json', extra_files)
-    except Exception as e:
-        d.logger.error(e)
-        extra_files["awards.json"] = "[]"
+        while True:
+            try:
+                self.follow()
+                retry = 0
+            except Exception as e:
+                self.d.logger.error(
+                    "follow event-feed failed. [err={}]".format(e))
+                retry += 1
 
-    scoreboard = dump(d, 'scoreboard', 'scoreboard.json', extra_files)
+            self.scheduler.set_event_feed_connected(False)
+            time.sleep(min(2 ** retry, 30))
 
-    groups = dump(d, 'groups', 'groups.json', extra_files)
-    judgements = dump(d, 'judgements', 'judgements.json', extra_files)
-    judgement_types = dump(d, 'judgement-types',
-                           'judgement-types.json', extra_files)
-    languages = dump(d, 'languages', 'languages.json', extra_files)
-    organizations = dump(d, 'organizations', 'organizations.json', extra_files)
-    problems = dump(d, 'problems', 'problems.json', extra_files)
-    teams = dump(d, 'teams', 'teams.json', extra_files)
-    submissions = dump(d, 'submissions', 'submissions.json', extra_files)
 
-    url = "https://board-admin.xcpcio.com/upload-board-data"
+class Scheduler:
+    def __init__(self, c: Config, d: Dump, uploader: Uploader):
+        self.c = c
+        self.d = d
+        self.uploader = uploader
 
-    payload = {
-        "token": c.xcpcio_token,
-        "extra_files": extra_files,
-    }
+        self.cond = threading.Condition()
 
-    headers = {
-        "content-type": "application/json",
-    }
+        # Filenames invalidated by events since the last fetch
+        self.dirty = set()
+        self.event_feed_connected = False
 
-    resp = requests.post(url, json=payload, headers=headers)
+        # filename -> monotonic time of the last successful fetch
+        self.last_fetched = {}
+        self.last_round = None
 
-    total_size = len(json.dumps(payload))
+        self.extra_files = {}
 
-    if resp.status_code == 200:
-        d.logger.info("upload successful. [resp={}] [size={}]".format(
-            resp.content, total_size))
-    else:
-        d.logger.error("upload failed. [status_code={}] [resp={}] [size={}]".format(
-            resp.status_code, resp.text, total_size))
+    def mark_dirty(self, filenames):
+        with self.cond:
+            self.dirty.update(filenames)
+            self.cond.notify()
+
+    def set_event_feed_connected(self, connected):
+        with self.cond:
+            self.event_feed_connected = connected
+            self.cond.notify()
+
+    def get_refresh_interval(self, filename, interval):
+        interval = self.c.refresh_intervals.get(filename, interval)
+
+        if interval is None:
+            # Without the event feed, fall back to polling
+            if self.event_feed_connected:
+                return self.c.max_interval
+            return self.c.poll_interval
+
+        return interval
+
+    def get_deadlines(self):
+        deadlines = {}
+
+        for _, filename, interval in kEndpoints:
+            if filename not in self.last_fetched:
+                deadlines[filename] = 0
+                continue
+
+            interval = self.get_refresh_interval(filename, interval)
+            if interval > 0:
+                deadlines[filename] = self.last_fetched[filename] + interval
+
+        return deadlines
+
+    def wait_for_due(self):
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                deadlines = self.get_deadlines()
+
+                if len(self.dirty) > 0 or any(t <= now for t in deadlines.values()):
+                    break
+
+                timeout = min(deadlines.values(), default=now +
+                              self.c.max_interval) - now
+                self.cond.wait(timeout)
+
+            has_events = len(self.dirty) > 0
+
+        # Events come in bursts, let them settle into a single round
+        if has_events:
+            time.sleep(self.c.debounce_interval)
+
+        if self.last_round is not None:
+            wait = self.last_round + self.c.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+        with self.cond:
+            now = time.monotonic()
+            due = set(self.dirty)
+            # Take files that are about to expire along,
+            # so that they do not trigger a round of their own right after
+            due.update(filename for filename, t in self.get_deadlines().items()
+                       if t <= now + self.c.min_interval)
+            self.dirty.clear()
+
+        return due
+
+    def fetch(self, endpoint, filename):
+        try:
+            content = self.d.request_json(endpoint)
+        except Exception as e:
+            if filename != 'awards.json':
+                raise
+
+            self.d.logger.error(e)
+            content = "[]"
+
+        self.extra_files[filename] = content
+        self.last_fetched[filename] = time.monotonic()
+
+    def run_round(self, due):
+        failed = []
+
+        for endpoint, filename, _ in kEndpoints:
+            if filename not in due:
+                continue
+
+            try:
+                self.fetch(endpoint, filename)
+            except Exception as e:
+                self.d.logger.error(
+                    "fetch failed. [filename={}] [err={}]".format(filename, e))
+                failed.append(filename)
+
+        if len(failed) > 0:
+            self.mark_dirty(failed)
+
+        # Upload only once every file has been fetched at least once
+        if len(self.extra_files) == len(kEndpoints):
+            self.uploader.upload(self.extra_files)
+
+    def run(self):
+        if self.c.event_feed:
+            EventFeedFollower(self.d, self).start()
+
+        while True:
+            due = self.wait_for_due()
+            self.last_round = time.monotonic()
+
+            self.d.logger.info(
+                "upload starter. [files={}]".format(",".join(sorted(due))))
+
+            try:
+                self.run_round(due)
+            except Exception as e:
+                self.d.logger.error("upload failed. [err={}]".format(e))
 
 
 def main():
@@ -83,19 +366,12 @@ def main():
     c = Config(**config_obj)
 
     d_config = DumpConfig(config_obj)
-    d = Dump(d_config)
-    d.init_logging()
-
-    while True:
-        d.logger.info("upload starter")
+    with Dump(d_config) as d:
+        d.init_logging()
 
-        try:
-            upload_all(c, d)
-        except Exception as e:
-            d.logger.error("upload failed. [err={}]".format(e))
+        uploader = Uploader(c, d)
 
-        d.logger.info("sleeping...")
-        time.sleep(5)
+        Scheduler(c, d, uploader).run()
 
 
 if __name__ == '__main__':
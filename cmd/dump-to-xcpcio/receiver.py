@@ -0,0 +1,91 @@
+#! /usr/bin/env python3
+
+# A local stand-in for the board-admin upload endpoint,
+# point `upload_url` in `config.yaml` to it when testing
+
+import argparse
+import gzip
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(saved_dir: str, token: str):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send_json(self, status_code, obj):
+            body = json.dumps(obj).encode('utf-8')
+
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path.split('?')[0] != "/upload-board-data":
+                self.send_json(404, {"message": "not found"})
+                return
+
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            size = len(body)
+
+            if self.headers.get("Content-Encoding", "") == "gzip":
+                body = gzip.decompress(body)
+
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self.send_json(400, {"message": "invalid json"})
+                return
+
+            if len(token) > 0 and payload.get("token") != token:
+                self.send_json(403, {"message": "invalid token"})
+                return
+
+            extra_files = payload.get("extra_files", {})
+
+            # Files missing from a delta upload keep their previous content
+            for filename, content in extra_files.items():
+                dist = os.path.join(saved_dir, os.path.basename(filename))
+
+                with open(dist + ".tmp", 'w', encoding='utf-8') as f:
+                    f.write(content)
+
+                os.replace(dist + ".tmp", dist)
+
+            print("received. [files={}] [size={}] [raw_size={}]".format(
+                ",".join(extra_files.keys()), size, len(body)))
+
+            self.send_json(200, {"message": "ok"})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--saved-dir", default="./received")
+    parser.add_argument("--token", default="")
+    args = parser.parse_args()
+
+    os.makedirs(args.saved_dir, exist_ok=True)
+
+    server = ThreadingHTTPServer(
+        (args.host, args.port), make_handler(args.saved_dir, args.token))
+
+    print("listening on http://{}:{}/upload-board-data".format(args.host, args.port))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -15,9 +15,9 @@ def load_config():
 def main():
     config = load_config()
 
-    d = Dump(config)
-    d.init_logging()
-    d.dump()
+    with Dump(config) as d:
+        d.init_logging()
+        d.dump()
 
 
 if __name__ == '__main__':
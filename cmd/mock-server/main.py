@@ -0,0 +1,26 @@
+#! /usr/bin/env python3
+
+import yaml
+
+from domjudge_utility.mock_server import MockServer, MockServerConfig, serve_mock_server
+
+
+def load_config():
+    config_path = './config.yaml'
+    with open(config_path, 'r') as f:
+        config = MockServerConfig(yaml.load(f, Loader=yaml.FullLoader))
+        return config
+
+
+def main():
+    config = load_config()
+
+    server = MockServer(config)
+    print("serving {} [cid={}] at http://{}:{}{}/".format(
+        config.fixture_dir, server.cid, config.host, config.port, server.prefix))
+
+    serve_mock_server(config, server)
+
+
+if __name__ == '__main__':
+    main()
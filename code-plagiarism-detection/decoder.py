@@ -0,0 +1,125 @@
+import base64
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Since the file encoding of the code depends on the file encoding when uploading.
+# So we need to try a variety of encoding decoding.
+# https://github.com/DOMjudge/domjudge/issues/1394#issuecomment-998738419
+kEncodings = ['gb2312', 'utf-8']
+
+
+def decodeBytes(data: bytes):
+    # Returns (text, encoding), `encoding` is `None` if none of them fits,
+    # most sources are plain ASCII and need no guessing at all
+    if data.isascii():
+        return data.decode('ascii'), 'ascii'
+
+    for encoding_format in kEncodings:
+        try:
+            return data.decode(encoding_format), encoding_format
+        except UnicodeDecodeError:
+            pass
+
+    return "", None
+
+
+def readSourceCode(base_api_file_path, submission_id):
+    with open(os.path.join(base_api_file_path, 'submissions', str(submission_id), 'source-code.json'), 'rb') as f:
+        source_code_obj = json.loads(f.read())[0]
+
+    # Decoded once, whichever encoding it turns out to be
+    return source_code_obj['filename'], base64.b64decode(source_code_obj['source'])
+
+
+def decodeBatch(args):
+    # Runs in the worker processes,
+    # `batch` lists (submission_id, output filename) and every output is written here
+    base_api_file_path, saved_dir, batch = args
+
+    sources = []
+    failures = []
+    encodings = {}
+    size = 0
+
+    for submission_id, output_filename in batch:
+        try:
+            filename, data = readSourceCode(base_api_file_path, submission_id)
+        except Exception as e:
+            failures.append((submission_id, None, "base64 decode failed", repr(e)))
+            sources.append("")
+            continue
+
+        source, encoding_format = decodeBytes(data)
+        if encoding_format is None:
+            failures.append((submission_id, filename, "no matching encoding", None))
+
+        encodings[encoding_format] = encodings.get(encoding_format, 0) + 1
+        size += len(data)
+        sources.append(source)
+
+    # One pass of writes per batch, after the reads
+    for (_, output_filename), source in zip(batch, sources):
+        with open(os.path.join(saved_dir, output_filename), 'w', encoding='utf-8') as f:
+            f.write(source)
+
+    return sources, failures, encodings, size
+
+
+def getBatches(items, batch_size):
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+
+def decodeAll(base_api_file_path, saved_dir, items, parallels_nums, batch_size, logger):
+    # `items` lists (submission_id, output filename),
+    # returns the decoded sources in the same order
+    tasks = ((base_api_file_path, saved_dir, batch)
+             for batch in getBatches(items, batch_size))
+
+    sources = []
+    encodings = {}
+    failure_nums = 0
+    size = 0
+
+    start = time.monotonic()
+
+    def collect(results):
+        nonlocal failure_nums, size
+
+        for batch_sources, failures, batch_encodings, batch_bytes in results:
+            sources.extend(batch_sources)
+            size += batch_bytes
+
+            for k, v in batch_encodings.items():
+                encodings[k] = encodings.get(k, 0) + v
+
+            for submission_id, filename, reason, err in failures:
+                message = "{}. [submission_id={}, filename={}]".format(
+                    reason, submission_id, filename)
+
+                if err is not None:
+                    message += " [err={}]".format(err)
+
+                logger.error(message)
+
+            failure_nums += len(failures)
+
+            logger.info("sources decoded. [decoded={}/{}] [elapsed={:.1f}s]".format(
+                len(sources), len(items), time.monotonic() - start))
+
+    if parallels_nums <= 1:
+        collect(map(decodeBatch, tasks))
+    else:
+        # Batches are consumed in order as soon as they are done
+        with ProcessPoolExecutor(max_workers=parallels_nums) as executor:
+            collect(executor.map(decodeBatch, tasks))
+
+    elapsed = max(time.monotonic() - start, 1e-9)
+
+    logger.info("decoding done. [submissions={}] [failed={}] [size={}] [elapsed={:.1f}s] [throughput={:.1f}/s, {:.2f}MB/s] [encodings={}]".format(
+        len(items), failure_nums, size, elapsed, len(items) / elapsed, size / elapsed / 1024 / 1024,
+        {str(k): v for k, v in encodings.items()}))
+
+    return sources
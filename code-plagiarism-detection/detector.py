@@ -0,0 +1,236 @@
+import collections
+import itertools
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+# Comments, preprocessor lines and imports are dropped, string literals become `S`,
+# the rest is split into words and punctuation, and identifiers become `I`,
+# so renaming variables or rewording comments does not hide a copy
+kCLikeStripPattern = re.compile(r'''
+    //[^\n]*|/\*.*?\*/|^[ \t]*\#[^\n]*|^[ \t]*(?:import|package)\b[^\n]*
+  | "(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'
+''', re.S | re.M | re.X)
+
+kPythonStripPattern = re.compile(r'''
+    \#[^\n]*|^[ \t]*(?:import|from)\b[^\n]*
+  | [rbuRBU]{0,2}(?:"""(?:\\.|[^\\])*?"""|\'\'\'(?:\\.|[^\\])*?\'\'\'|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+''', re.S | re.M | re.X)
+
+kWordPattern = re.compile(r'\w+|[^\w\s]')
+
+kCLikeKeywords = frozenset('''
+    auto bool break case catch char class const continue default delete do double else enum
+    extends final finally float for goto if implements int long new private protected public
+    return short signed sizeof static struct switch template this throw try typedef typename
+    union unsigned using void volatile while S
+'''.split())
+
+kPythonKeywords = frozenset('''
+    and as assert break class continue def del elif else except finally for global if in is
+    lambda nonlocal not or pass raise return try while with yield S
+'''.split())
+
+# word -> packed token hash, per language
+kTokenCache = {}
+
+# k -> slices of the packed tokens of every k-gram
+kKGramSlices = {}
+
+
+def isPython(language_id):
+    return language_id.startswith('py')
+
+
+def stripLiteral(match):
+    text = match.group().lstrip()
+
+    if text[:1] in ('#', '/') or text.startswith(('import', 'package', 'from')):
+        return ' '
+
+    return ' S '
+
+
+def getTokenBytes(word, keywords):
+    if word in keywords:
+        token = word
+    elif word[0].isdigit():
+        token = 'N'
+    elif word[0].isalpha() or word[0] == '_':
+        token = 'I'
+    else:
+        token = word
+
+    # Stable across processes, unlike `hash()`
+    return zlib.crc32(token.encode('utf-8')).to_bytes(4, 'little')
+
+
+def tokenize(source, language_id):
+    # The packed 4-byte hashes of the tokens, most of the work runs inside `re`
+    if isPython(language_id):
+        pattern, keywords = kPythonStripPattern, kPythonKeywords
+    else:
+        pattern, keywords = kCLikeStripPattern, kCLikeKeywords
+
+    cache = kTokenCache.setdefault(keywords, {})
+
+    words = kWordPattern.findall(pattern.sub(stripLiteral, source))
+
+    for word in set(words).difference(cache):
+        cache[word] = getTokenBytes(word, keywords)
+
+    return b''.join([cache[word] for word in words])
+
+
+def getKGramSlices(k, nums):
+    # Reused by every source, so slicing and hashing both stay in C
+    slices = kKGramSlices.setdefault(k, [])
+
+    while len(slices) < nums:
+        i = len(slices)
+        slices.append(slice(i * 4, (i + k) * 4))
+
+    return slices[:nums]
+
+
+def getKGramHashes(tokens: bytes, k):
+    n = len(tokens) // 4
+
+    if n == 0:
+        return []
+
+    k = min(k, n)
+
+    return list(map(zlib.crc32, map(tokens.__getitem__, getKGramSlices(k, n - k + 1))))
+
+
+def winnow(hashes, w):
+    # The minimum of every window of `w` k-grams,
+    # any common run of at least `w + k - 1` tokens shares one of them
+    if len(hashes) <= w:
+        return {min(hashes)} if len(hashes) > 0 else set()
+
+    return set(map(min, zip(*[hashes[j:] for j in range(w)])))
+
+
+def getFingerprints(source, language_id, k, w):
+    return winnow(getKGramHashes(tokenize(source, language_id), k), w)
+
+
+def getFingerprintsTask(args):
+    # Runs in the worker processes
+    return getFingerprints(*args)
+
+
+class DetectionConfig:
+    def __init__(self, kgram_size, window_size, boilerplate_ratio, boilerplate_min_nums,
+                 max_posting_nums, min_shared_nums, min_similarity, parallels_nums):
+        self.kgram_size = kgram_size
+        self.window_size = window_size
+        self.boilerplate_ratio = boilerplate_ratio
+        self.boilerplate_min_nums = boilerplate_min_nums
+        self.max_posting_nums = max_posting_nums
+        self.min_shared_nums = min_shared_nums
+        self.min_similarity = min_similarity
+        self.parallels_nums = parallels_nums
+
+
+def computeFingerprints(c: DetectionConfig, sources):
+    # sources: list of (source, language_id)
+    args = [(source, language_id, c.kgram_size, c.window_size)
+            for source, language_id in sources]
+
+    if c.parallels_nums <= 1:
+        return [getFingerprintsTask(a) for a in args]
+
+    with ProcessPoolExecutor(max_workers=c.parallels_nums) as executor:
+        return list(executor.map(getFingerprintsTask, args, chunksize=64))
+
+
+def getCandidatePairs(c: DetectionConfig, fingerprints, teams):
+    # `fingerprints` and `teams` of the submissions of one problem,
+    # only submissions sharing a fingerprint are ever compared
+    index = collections.defaultdict(list)
+    for i, fp in enumerate(fingerprints):
+        for h in fp:
+            index[h].append(i)
+
+    # Fingerprints in too many submissions are template code, not copying
+    limit = min(c.max_posting_nums, max(c.boilerplate_min_nums,
+                int(c.boilerplate_ratio * len(fingerprints))))
+
+    boilerplate = set()
+    for h, posting in index.items():
+        if len(posting) > limit:
+            boilerplate.add(h)
+
+    for h in boilerplate:
+        del index[h]
+
+    sizes = [len(fp - boilerplate) if len(boilerplate) > 0 else len(fp)
+             for fp in fingerprints]
+
+    pairs = []
+    for a, fp in enumerate(fingerprints):
+        # How many fingerprints `a` shares with every other submission,
+        # counted inside `Counter` rather than pair by pair
+        shared = collections.Counter(itertools.chain.from_iterable(
+            [index[h] for h in fp if h in index]))
+
+        for b, nums in [item for item in shared.items() if item[1] >= c.min_shared_nums]:
+            if b <= a or teams[a] == teams[b]:
+                continue
+
+            similarity = nums / max(1, min(sizes[a], sizes[b]))
+            if similarity < c.min_similarity:
+                continue
+
+            jaccard = nums / max(1, sizes[a] + sizes[b] - nums)
+            pairs.append((similarity, jaccard, nums, a, b))
+
+    return pairs, len(boilerplate)
+
+
+def detect(c: DetectionConfig, submissions, sources, logger):
+    # `submissions[i]` was written in `sources[i]`,
+    # returns the most similar pair of submissions of every pair of teams on every problem
+    fingerprints = computeFingerprints(
+        c, [(source, s['language_id']) for s, source in zip(submissions, sources)])
+
+    by_problem = collections.defaultdict(list)
+    for i, s in enumerate(submissions):
+        by_problem[s['problem_id']].append(i)
+
+    reports = []
+
+    for problem_id, indexes in sorted(by_problem.items()):
+        pairs, boilerplate_nums = getCandidatePairs(c, [fingerprints[i] for i in indexes],
+                                                    [submissions[i]['team_id'] for i in indexes])
+
+        best = {}
+        for similarity, jaccard, nums, a, b in pairs:
+            sa, sb = submissions[indexes[a]], submissions[indexes[b]]
+            key = tuple(sorted([sa['team_id'], sb['team_id']]))
+
+            if key not in best or best[key]['similarity'] < similarity:
+                best[key] = {
+                    "problem_id": problem_id,
+                    "similarity": round(similarity, 4),
+                    "jaccard": round(jaccard, 4),
+                    "shared_fingerprints": nums,
+                    "submission_a": sa['id'],
+                    "team_a": sa['team_id'],
+                    "language_a": sa['language_id'],
+                    "submission_b": sb['id'],
+                    "team_b": sb['team_id'],
+                    "language_b": sb['language_id'],
+                }
+
+        logger.info("problem checked. [problem_id={}] [submissions={}] [candidate_pairs={}] [reported_team_pairs={}] [boilerplate_fingerprints={}]".format(
+            problem_id, len(indexes), len(pairs), len(best), boilerplate_nums))
+
+        reports.extend(best.values())
+
+    reports.sort(key=lambda r: (-r['similarity'], -r['shared_fingerprints']))
+
+    return reports
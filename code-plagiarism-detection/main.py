@@ -3,9 +3,13 @@
 import os
 import yaml
 import logging
-import base64
+import csv
 import json
 import shutil
+import time
+
+import decoder
+import detector
 
 
 class Config:
@@ -23,6 +27,50 @@ class Config:
         self.saved_dir = self.getConfigWithDefaultCalue(
             config_dict, 'saved_dir', './data')
 
+        self.detection = self.getConfigWithDefaultCalue(
+            config_dict, 'detection', True)
+
+        # Only compare submissions judged as correct, needs `judgements.json`
+        self.only_accepted = self.getConfigWithDefaultCalue(
+            config_dict, 'only_accepted', False)
+
+        # Tokens in a k-gram, and k-grams in a winnowing window,
+        # a common run of `kgram_size + window_size - 1` tokens is always found
+        self.kgram_size = self.getConfigWithDefaultCalue(
+            config_dict, 'kgram_size', 12)
+
+        self.window_size = self.getConfigWithDefaultCalue(
+            config_dict, 'window_size', 8)
+
+        # A fingerprint found in more than `boilerplate_ratio` of the submissions of a problem
+        # (but at least `boilerplate_min_nums`, and at most `max_posting_nums`) is template code
+        self.boilerplate_ratio = self.getConfigWithDefaultCalue(
+            config_dict, 'boilerplate_ratio', 0.1)
+
+        self.boilerplate_min_nums = self.getConfigWithDefaultCalue(
+            config_dict, 'boilerplate_min_nums', 10)
+
+        self.max_posting_nums = self.getConfigWithDefaultCalue(
+            config_dict, 'max_posting_nums', 100)
+
+        # A pair is reported with at least this many shared fingerprints,
+        # and this share of the fingerprints of the smaller submission
+        self.min_shared_nums = self.getConfigWithDefaultCalue(
+            config_dict, 'min_shared_nums', 10)
+
+        self.min_similarity = self.getConfigWithDefaultCalue(
+            config_dict, 'min_similarity', 0.5)
+
+        self.parallels_nums = self.getConfigWithDefaultCalue(
+            config_dict, 'parallels_nums', os.cpu_count() or 1)
+
+        self.report_dir = self.getConfigWithDefaultCalue(
+            config_dict, 'report_dir', './report')
+
+        # Submissions decoded and written by one process at a time
+        self.decode_batch_size = self.getConfigWithDefaultCalue(
+            config_dict, 'decode_batch_size', 256)
+
 
 def loadConfig():
     global default_config
@@ -70,27 +118,6 @@ def getAPI(endpoint):
     return json_input(os.path.join(default_config.base_api_file_path, endpoint) + ".json")
 
 
-def getSourceCode(submission_id):
-    source_code_obj = json_input(os.path.join(default_config.base_api_file_path,
-                                              'submissions', str(submission_id), 'source-code.json'))[0]
-
-    source = source_code_obj['source']
-
-    # Since the file encoding of the code depends on the file encoding when uploading.
-    # So we need to try a variety of encoding decoding.
-    # https://github.com/DOMjudge/domjudge/issues/1394#issuecomment-998738419
-    for encoding_format in ['gb2312', 'utf-8']:
-        try:
-            return base64.b64decode(source).decode(encoding_format)
-        except Exception as e:
-            pass
-
-    logger.error(
-        "base64 decode failed. [submission_id={}, filename={}]".format(submission_id, source_code_obj['filename']))
-
-    return ""
-
-
 def getSuffixByLanguage(language_id):
     if language_id in ['c']:
         return '.cpp'
@@ -104,14 +131,81 @@ def getSuffixByLanguage(language_id):
     if language_id in ['py', 'py3']:
         return '.py'
 
+    return '.txt'
+
 
 def convertSourceCode():
-    for submission in submissions:
-        submission_id = submission['id']
-        language_id = submission['language_id']
+    items = [(submission['id'], str(submission['id']) + getSuffixByLanguage(submission['language_id']))
+             for submission in submissions]
+
+    return decoder.decodeAll(default_config.base_api_file_path, default_config.saved_dir, items,
+                             default_config.parallels_nums, default_config.decode_batch_size, logger)
+
 
-        outputToFile(str(submission_id) + getSuffixByLanguage(language_id),
-                     getSourceCode(submission_id))
+def getAcceptedSubmissionIds():
+    accepted = set()
+
+    for judgement in getAPI('judgements'):
+        if judgement.get('valid', True) and judgement['judgement_type_id'] == 'AC':
+            accepted.add(judgement['submission_id'])
+
+    return accepted
+
+
+def getTeamNames():
+    if not os.path.exists(os.path.join(default_config.base_api_file_path, 'teams.json')):
+        return {}
+
+    return {t['id']: t.get('display_name') or t['name'] for t in getAPI('teams')}
+
+
+def outputReports(reports):
+    ensureDir(default_config.report_dir)
+
+    team_names = getTeamNames()
+    for r in reports:
+        r['team_name_a'] = team_names.get(r['team_a'], '')
+        r['team_name_b'] = team_names.get(r['team_b'], '')
+
+    with open(os.path.join(default_config.report_dir, 'report.json'), 'w', encoding='utf-8') as f:
+        json.dump(reports, f, ensure_ascii=False, indent=2)
+
+    fields = ['problem_id', 'similarity', 'jaccard', 'shared_fingerprints',
+              'submission_a', 'team_a', 'team_name_a', 'language_a',
+              'submission_b', 'team_b', 'team_name_b', 'language_b']
+
+    with open(os.path.join(default_config.report_dir, 'report.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(reports)
+
+    for r in reports[:20]:
+        logger.info("similar. [problem_id={}] [similarity={}] [submission_a={}] [team_a={}] [submission_b={}] [team_b={}]".format(
+            r['problem_id'], r['similarity'], r['submission_a'], r['team_name_a'] or r['team_a'],
+            r['submission_b'], r['team_name_b'] or r['team_b']))
+
+
+def detectPlagiarism(sources):
+    c = detector.DetectionConfig(
+        default_config.kgram_size, default_config.window_size, default_config.boilerplate_ratio,
+        default_config.boilerplate_min_nums, default_config.max_posting_nums,
+        default_config.min_shared_nums, default_config.min_similarity, default_config.parallels_nums)
+
+    checked = list(zip(submissions, sources))
+
+    if default_config.only_accepted:
+        accepted = getAcceptedSubmissionIds()
+        checked = [(s, source) for s, source in checked if s['id'] in accepted]
+
+    start = time.monotonic()
+
+    reports = detector.detect(c, [s for s, _ in checked],
+                              [source for _, source in checked], logger)
+
+    logger.info("detection done. [submissions={}] [reported={}] [elapsed={:.1f}s]".format(
+        len(checked), len(reports), time.monotonic() - start))
+
+    outputReports(reports)
 
 
 def main():
@@ -127,7 +221,10 @@ def main():
 
     ensureDir(default_config.saved_dir)
 
-    convertSourceCode()
+    sources = convertSourceCode()
+
+    if default_config.detection:
+        detectPlagiarism(sources)
 
 
 if __name__ == '__main__':
@@ -1,2 +1,5 @@
+from .contest_model import *
 from .dump import *
 from .dump_config import *
+from .manifest import *
+from .scoreboard import *
@@ -0,0 +1,115 @@
+from collections import defaultdict
+
+from . import utils
+
+
+class Problem:
+    __slots__ = ('index', 'id', 'label', 'name')
+
+    def __init__(self, index, problem):
+        self.index = index
+        self.id = problem['id']
+        self.label = problem['label']
+        self.name = problem['name']
+
+
+class Team:
+    __slots__ = ('index', 'id', 'name', 'display_name',
+                 'affiliation', 'group_ids', 'is_observer')
+
+    def __init__(self, index, team, is_observer):
+        self.index = index
+        self.id = team['id']
+        self.name = team['name']
+        self.display_name = team.get('display_name')
+        self.affiliation = team.get('affiliation')
+        self.group_ids = team.get('group_ids', [])
+        self.is_observer = is_observer
+
+
+class Submission:
+    __slots__ = ('index', 'id', 'team_id', 'problem_id', 'language_id', 'language_name',
+                 'contest_time', 'timestamp', 'verdict', 'max_run_time')
+
+    def __init__(self, index, submission, language_name, judgement, score_in_seconds):
+        self.index = index
+        self.id = submission['id']
+        self.team_id = submission['team_id']
+        self.problem_id = submission['problem_id']
+        self.language_id = submission.get('language_id')
+        self.language_name = language_name
+        self.contest_time = submission['contest_time']
+        self.timestamp = utils.get_submission_timestamp(
+            self.contest_time, score_in_seconds)
+
+        # Pending
+        if judgement is None:
+            self.verdict = 'PD'
+            self.max_run_time = 0
+        else:
+            self.verdict = judgement['judgement_type_id']
+            self.max_run_time = judgement.get('max_run_time')
+
+
+class ContestModel:
+    def __init__(self, contest, problems, groups, teams, languages, submissions, judgements,
+                 score_in_seconds=False):
+        self.contest = contest
+
+        self.problems = {}
+        for problem in problems:
+            self.problems[problem['id']] = problem
+        for index, problem in enumerate(self.problems.values()):
+            self.problems[problem['id']] = Problem(index, problem)
+
+        observer_group_ids = set(
+            group['id'] for group in groups if group['name'] == 'Observers')
+
+        self.teams = {}
+        for team in teams:
+            self.teams[team['id']] = team
+        for index, team in enumerate(self.teams.values()):
+            is_observer = any(
+                group_id in observer_group_ids for group_id in team['group_ids'])
+            self.teams[team['id']] = Team(index, team, is_observer)
+
+        language_names = {}
+        for language in languages:
+            language_names.setdefault(language['id'], language['name'])
+
+        # The last judgement of a submission wins
+        submission_judgements = {}
+        for judgement in judgements:
+            submission_judgements[judgement['submission_id']] = judgement
+
+        self.submissions = []
+
+        self.submissions_by_team = defaultdict(list)
+        self.submissions_by_problem = defaultdict(list)
+        self.submissions_by_language = defaultdict(list)
+        self.submissions_by_verdict = defaultdict(list)
+
+        for index, submission in enumerate(submissions):
+            s = Submission(index, submission,
+                           language_names.get(submission.get('language_id')),
+                           submission_judgements.get(submission['id']),
+                           score_in_seconds)
+
+            self.submissions.append(s)
+
+            self.submissions_by_team[s.team_id].append(index)
+            self.submissions_by_problem[s.problem_id].append(index)
+            self.submissions_by_language[s.language_id].append(index)
+            self.submissions_by_verdict[s.verdict].append(index)
+
+    def get_team_submissions(self, team_id):
+        return [self.submissions[i] for i in self.submissions_by_team.get(team_id, [])]
+
+    def get_problem_submissions(self, problem_id):
+        return [self.submissions[i] for i in self.submissions_by_problem.get(problem_id, [])]
+
+    def get_language_submissions(self, language_id):
+        return [self.submissions[i] for i in self.submissions_by_language.get(language_id, [])]
+
+    def get_verdict_submissions(self, verdict):
+        return [self.submissions[i] for i in self.submissions_by_verdict.get(verdict, [])]
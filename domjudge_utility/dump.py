@@ -1,22 +1,41 @@
+import asyncio
 import base64
+import contextlib
 import glob
+import hashlib
 import json
 import logging
-import math
 import os
+import re
 import shutil
-import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
 
 from . import utils
+from .contest_model import ContestModel
 from .dump_config import DumpConfig
+from .json_stream import JsonStreamWriter
+from .manifest import Manifest
+from .scoreboard import Scoreboard
+
+
+class FetchError(RuntimeError):
+    def __init__(self, url, status_code):
+        super().__init__(
+            "fetch failed. [url={}] [status_code={}]".format(url, status_code))
+
+        self.url = url
+        self.status_code = status_code
 
 
 class Dump:
     kTimeout = 10
+    kRunsPageSize = 10000
 
     def __init__(self, config: Optional[DumpConfig] = None):
         if config is None:
@@ -28,10 +47,13 @@ class Dump:
             "Authorization": 'Basic ' +
             base64.encodebytes(self.config.userpwd.encode(
                 'utf-8')).decode('utf-8').strip(),
-            "Connection": "close",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive" if self.config.http_keep_alive else "close",
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36",
         }
 
+        self.session = None
+
         self.api_url = utils.url_join(
             self.config.base_url, "api", self.config.api_version, "contests")
 
@@ -65,6 +87,11 @@ class Dump:
         self.groups_dict = None
         self.teams_dict = None
 
+        self.contest_model = None
+
+        self.manifest = None
+        self.manifest_filename = ".manifest.json"
+
         self.logger = None
 
     def output_to_file(self, filepath: str, data: str, if_not_exists=False):
@@ -73,9 +100,78 @@ class Dump:
         if if_not_exists and os.path.exists(dir_name):
             return
 
+        if self.manifest is not None:
+            sha256 = hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+            if os.path.exists(dir_name) and self.manifest.get(filepath).get('sha256') == sha256:
+                return
+
+            self.manifest.update(filepath, sha256=sha256)
+
         with open(dir_name, 'w', encoding='utf-8') as f:
             f.write(data)
 
+    @contextlib.contextmanager
+    def open_output_file(self, filepath: str):
+        dist = os.path.join(self.config.saved_dir, filepath)
+        tmp_dist = dist + ".tmp"
+
+        try:
+            with open(tmp_dist, 'w', encoding='utf-8', buffering=1 << 16) as f:
+                yield f
+        except BaseException:
+            os.remove(tmp_dist)
+            raise
+
+        self.commit_output_file(filepath, tmp_dist)
+
+    def commit_output_file(self, filepath: str, tmp_dist: str, sha256: Optional[str] = None):
+        dist = os.path.join(self.config.saved_dir, filepath)
+
+        if self.manifest is not None:
+            if sha256 is None:
+                sha256 = utils.file_sha256(tmp_dist)
+
+            if os.path.exists(dist) and self.manifest.get(filepath).get('sha256') == sha256:
+                os.remove(tmp_dist)
+                return
+
+            self.manifest.update(filepath, sha256=sha256)
+
+        os.replace(tmp_dist, dist)
+
+    def read_saved_file(self, filepath: str):
+        with open(os.path.join(self.config.saved_dir, filepath), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def get_conditional_headers(self, filepath: Optional[str]):
+        if self.manifest is None or filepath is None:
+            return {}
+
+        # Without the previous body on disk, a `304` would leave us with nothing
+        if not os.path.exists(os.path.join(self.config.saved_dir, filepath)):
+            return {}
+
+        return self.get_validator_headers(self.manifest.get(filepath))
+
+    def get_validator_headers(self, entry: dict):
+        headers = {}
+
+        if entry.get('etag') is not None:
+            headers['If-None-Match'] = entry['etag']
+
+        if entry.get('last_modified') is not None:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        return headers
+
+    def update_validators(self, filepath: Optional[str], resp_headers):
+        if self.manifest is None or filepath is None:
+            return
+
+        self.manifest.update(filepath, etag=resp_headers.get(
+            'ETag'), last_modified=resp_headers.get('Last-Modified'))
+
     def init_logging(self):
         if self.logger is not None:
             return
@@ -90,37 +186,92 @@ class Dump:
 
         self.logger.addHandler(consoleHandler)
 
-    def send_request(self, url, params={}):
-        res = requests.get(url=url, headers=self.headers, params=params)
+    def get_session(self) -> requests.Session:
+        if self.session is not None:
+            return self.session
 
-        if res.status_code != 200:
-            self.logger.error('An error occurred during request GET {}, errcode:{}'.format(
-                url, res.status_code))
-            raise RuntimeError(
-                "fetch failed. [url={}] [status_code={}]".format(url, res.status_code))
+        adapter = HTTPAdapter(
+            pool_connections=self.config.http_pool_size,
+            pool_maxsize=self.config.http_pool_size)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        return self.session
+
+    def create_async_session(self, limit: Optional[int] = None) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.config.http_pool_size if limit is None else limit,
+            force_close=not self.config.http_keep_alive)
+
+        timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=self.kTimeout, sock_read=self.config.http_timeout)
+
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def send_request(self, url, params={}, headers={}, stream=False):
+        res = self.get_session().get(url=url, headers={**self.headers, **headers}, params=params,
+                                     timeout=(self.kTimeout, self.config.http_timeout), stream=stream)
+
+        self.check_status_code(url, res.status_code, len(headers) > 0)
 
         return res
 
-    def request_json(self, endpoint, params={}):
-        if self.config.base_file_path == '':
-            url = utils.url_join(self.api_url, str(self.config.cid))
+    def check_status_code(self, url, status_code, conditional=False):
+        # `304` can only be answered to a conditional request
+        if status_code == 304 and conditional:
+            return
+
+        if status_code != 200:
+            self.logger.error('An error occurred during request GET {}, errcode:{}'.format(
+                url, status_code))
+            raise FetchError(url, status_code)
+
+    def get_api_url(self, endpoint):
+        url = utils.url_join(self.api_url, str(self.config.cid))
 
-            if len(endpoint) > 0:
-                url = utils.url_join(url, endpoint)
+        if len(endpoint) > 0:
+            url = utils.url_join(url, endpoint)
+
+        return url
+
+    def get_charset(self, content_type: Optional[str]):
+        if content_type is not None and "charset" in content_type:
+            return content_type.split("charset=")[1]
+
+        return 'utf-8'
+
+    def decode_content(self, content: bytes, content_type: Optional[str]):
+        return content.decode(self.get_charset(content_type))
+
+    def request_json(self, endpoint, params={}, filepath: Optional[str] = None):
+        if self.config.base_file_path == '':
+            url = self.get_api_url(endpoint)
 
             self.logger.info('GET {}'.format(url))
 
-            resp = self.send_request(url, params)
+            resp = self.send_request(
+                url, params, self.get_conditional_headers(filepath))
 
-            content_type = resp.headers.get("Content-Type")
+            if resp.status_code == 304:
+                self.logger.info('Not modified {}'.format(url))
+                return self.read_saved_file(filepath)
 
-            if "charset" in content_type:
-                charset = content_type.split("charset=")[1]
-                content = resp.content.decode(charset)
-            else:
-                content = resp.content.decode()
+            self.update_validators(filepath, resp.headers)
 
-            return content
+            return self.decode_content(resp.content, resp.headers.get("Content-Type"))
         else:
             file_path = os.path.join(
                 self.config.base_file_path, "domjudge", "api", endpoint)
@@ -128,32 +279,271 @@ class Dump:
             with open(file_path, 'r') as f:
                 return f.read()
 
-    async def async_send_request(self, url, params={}):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=self.headers, timeout=self.kTimeout) as resp:
-                if resp.status != 200:
-                    raise Exception(
-                        f"Failed to fetch {url}, status: {resp.status}")
-                return resp
+    async def async_send_request(self, session: aiohttp.ClientSession, url, params={}, headers={}):
+        # `aiohttp` only accepts `str`, `int` and `float` query values,
+        # so stringify them the same way as `requests` does
+        params = {k: str(v) for k, v in params.items()}
 
-    def image_download(self, img_url: str, dist: str):
-        self.logger.info(
-            "download image. [img_url=%s] [dist=%s]", img_url, dist)
+        async with session.get(url, headers={**self.headers, **headers}, params=params) as resp:
+            self.check_status_code(url, resp.status, len(headers) > 0)
+
+            if resp.status == 304:
+                return resp.status, b'', resp.headers
+
+            return resp.status, await resp.read(), resp.headers
+
+    async def async_request_json(self, session: aiohttp.ClientSession, endpoint, params={},
+                                 filepath: Optional[str] = None):
+        url = self.get_api_url(endpoint)
+
+        self.logger.info('GET {}'.format(url))
+
+        status, content, headers = await self.async_send_request(
+            session, url, params, self.get_conditional_headers(filepath))
+
+        if status == 304:
+            self.logger.info('Not modified {}'.format(url))
+            return self.read_saved_file(filepath)
+
+        self.update_validators(filepath, headers)
+
+        return self.decode_content(content, headers.get("Content-Type"))
+
+    async def async_download_to_file(self, session: aiohttp.ClientSession, url, dist: str):
+        async with session.get(url, headers=self.headers) as resp:
+            if resp.status != 200:
+                raise FetchError(url, resp.status)
+
+            # Stream into a temporary file, so that an interrupted
+            # download never leaves a truncated file behind
+            tmp_dist = dist + ".tmp"
+            with open(tmp_dist, 'wb') as f:
+                async for chunk in resp.content.iter_chunked(1 << 16):
+                    f.write(chunk)
+
+            os.replace(tmp_dist, dist)
+
+    async def async_download_with_retry(self, session: aiohttp.ClientSession, url, dist: str):
+        return await self.async_with_retry(url, lambda: self.async_download_to_file(session, url, dist))
+
+    def is_retryable(self, e: Exception):
+        # Server errors, rate limiting, timeouts and dropped connections may pass,
+        # any other 4xx such as a wrong credential or a missing item will not
+        if isinstance(e, FetchError):
+            return e.status_code >= 500 or e.status_code == 429
+
+        return isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError))
+
+    async def async_with_retry(self, url, fn):
+        for retry in range(self.config.download_retry_nums + 1):
+            try:
+                return await fn()
+            except Exception as e:
+                if retry == self.config.download_retry_nums or not self.is_retryable(e):
+                    raise
+
+                backoff = min(2 ** retry, 30)
+                self.logger.warning("download failed, retrying. [url={}] [err={}] [retry={}] [backoff={}s]".format(
+                    url, e, retry + 1, backoff))
+                await asyncio.sleep(backoff)
+
+    def get_images_cache_dir(self):
+        if len(self.config.images_cache_dir) > 0:
+            return self.config.images_cache_dir
+
+        return os.path.join(self.config.saved_dir, '.cache', 'images')
+
+    def get_image_blob_path(self, sha256: str):
+        return os.path.join(self.get_images_cache_dir(), 'blobs', sha256[:2], sha256)
+
+    async def async_image_download(self, session: aiohttp.ClientSession, image_cache: Manifest,
+                                   img_url: str, dist: str):
+        entry = image_cache.get(img_url)
+
+        headers = {}
+        if entry.get('sha256') is not None and os.path.exists(self.get_image_blob_path(entry['sha256'])):
+            headers = self.get_validator_headers(entry)
+
+        async with session.get(img_url, headers={**self.headers, **headers}) as resp:
+            self.check_status_code(img_url, resp.status, len(headers) > 0)
+
+            downloaded = resp.status != 304
+
+            if downloaded:
+                blobs_dir = os.path.join(
+                    self.get_images_cache_dir(), 'blobs')
+                utils.ensure_dir(blobs_dir)
+
+                digest = hashlib.sha256()
+                fd, tmp_path = tempfile.mkstemp(dir=blobs_dir)
+                with os.fdopen(fd, 'wb') as f:
+                    async for chunk in resp.content.iter_chunked(1 << 16):
+                        f.write(chunk)
+                        digest.update(chunk)
+
+                blob_path = self.get_image_blob_path(digest.hexdigest())
+                if os.path.exists(blob_path):
+                    os.remove(tmp_path)
+                else:
+                    utils.ensure_dir(os.path.dirname(blob_path))
+                    os.replace(tmp_path, blob_path)
+
+                image_cache.update(img_url, etag=resp.headers.get('ETag'),
+                                   last_modified=resp.headers.get('Last-Modified'), sha256=digest.hexdigest())
+
+        sha256 = image_cache.get(img_url)['sha256']
+
+        if os.path.exists(dist) and utils.file_sha256(dist) == sha256:
+            return downloaded, False
 
         utils.ensure_dir(os.path.split(dist)[0])
-        res = self.send_request(img_url)
+        shutil.copyfile(self.get_image_blob_path(sha256), dist + ".tmp")
+        os.replace(dist + ".tmp", dist)
 
-        with open(dist, 'wb') as f:
-            f.write(res.content)
+        return downloaded, True
+
+    async def async_dump_images(self, hrefs):
+        image_cache = Manifest(os.path.join(
+            self.get_images_cache_dir(), 'index.json'))
+        semaphore = asyncio.Semaphore(self.config.images_parallels_nums)
+
+        async def download(session, href):
+            img_url = utils.url_join(
+                self.config.base_url, "api", self.config.api_version, href)
+            dist = os.path.join(self.images_dir, href)
+
+            async with semaphore:
+                self.logger.info(
+                    "download image. [img_url=%s] [dist=%s]", img_url, dist)
+                return await self.async_with_retry(img_url, lambda: self.async_image_download(
+                    session, image_cache, img_url, dist))
+
+        utils.ensure_dir(self.get_images_cache_dir())
+
+        try:
+            async with self.create_async_session(limit=self.config.images_parallels_nums) as session:
+                results = await asyncio.gather(*[download(session, href) for href in hrefs],
+                                               return_exceptions=True)
+        finally:
+            image_cache.save()
+
+        errors = [r for r in results if isinstance(r, BaseException)]
+        results = [r for r in results if not isinstance(r, BaseException)]
+
+        self.logger.info("images done. [total={}] [downloaded={}] [written={}] [failed={}]".format(
+            len(hrefs), sum(r[0] for r in results), sum(r[1] for r in results), len(errors)))
+
+        if len(errors) > 0:
+            raise RuntimeError(
+                "download images failed. [err={}]".format(errors[0]))
+
+    def get_api_saved_filepath(self, filename):
+        if not self.config.exported_data.domjudge_api:
+            return None
+
+        return os.path.join(self.sub_dir_path, self.api_path_name, filename)
 
     def request_json_and_save(self, endpoint, filename, params={}):
+        if self.config.json_streaming and filename.endswith(".json"):
+            return self.request_json_stream_and_save(endpoint, filename, params)
+
         content = self.request_json(
-            endpoint if self.config.base_file_path == '' else filename, params=params)
+            endpoint if self.config.base_file_path == '' else filename, params=params,
+            filepath=self.get_api_saved_filepath(filename))
+
+        return self.save_and_parse_json(filename, content)
+
+    async def async_request_json_and_save(self, session: aiohttp.ClientSession, endpoint, filename, params={}):
+        if self.config.json_streaming and filename.endswith(".json"):
+            return await self.async_request_json_stream_and_save(session, endpoint, filename, params)
+
+        content = await self.async_request_json(
+            session, endpoint, params=params, filepath=self.get_api_saved_filepath(filename))
+
+        return self.save_and_parse_json(filename, content)
+
+    def open_json_stream_writer(self, filepath: Optional[str], encoding='utf-8'):
+        if filepath is None:
+            return JsonStreamWriter(None, encoding)
 
+        utils.ensure_dir(self.api_dir)
+
+        return JsonStreamWriter(os.path.join(self.config.saved_dir, filepath), encoding)
+
+    def close_json_stream_writer(self, filepath: Optional[str], writer: JsonStreamWriter):
+        records = writer.close()
+
+        if filepath is not None:
+            self.commit_output_file(
+                filepath, writer.tmp_dist, writer.hexdigest())
+
+        return records
+
+    def load_json_stream(self, src: str, filepath: Optional[str]):
+        with self.open_json_stream_writer(filepath) as writer:
+            with open(src, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 16), b''):
+                    writer.write(chunk)
+
+            return self.close_json_stream_writer(filepath, writer)
+
+    def request_json_stream_and_save(self, endpoint, filename, params={}):
+        filepath = self.get_api_saved_filepath(filename)
+
+        if self.config.base_file_path != '':
+            src = os.path.join(self.config.base_file_path,
+                               "domjudge", "api", filename)
+            self.logger.info('GET {}'.format(src))
+
+            return self.load_json_stream(src, filepath)
+
+        url = self.get_api_url(endpoint)
+        self.logger.info('GET {}'.format(url))
+
+        with self.send_request(url, params, self.get_conditional_headers(filepath), stream=True) as resp:
+            if resp.status_code == 304:
+                self.logger.info('Not modified {}'.format(url))
+                return self.load_json_stream(os.path.join(self.config.saved_dir, filepath), None)
+
+            self.update_validators(filepath, resp.headers)
+
+            with self.open_json_stream_writer(
+                    filepath, self.get_charset(resp.headers.get("Content-Type"))) as writer:
+                for chunk in resp.iter_content(chunk_size=1 << 16):
+                    writer.write(chunk)
+
+                return self.close_json_stream_writer(filepath, writer)
+
+    async def async_request_json_stream_and_save(self, session: aiohttp.ClientSession, endpoint, filename, params={}):
+        filepath = self.get_api_saved_filepath(filename)
+        headers = self.get_conditional_headers(filepath)
+
+        url = self.get_api_url(endpoint)
+        self.logger.info('GET {}'.format(url))
+
+        params = {k: str(v) for k, v in params.items()}
+
+        async with session.get(url, headers={**self.headers, **headers}, params=params) as resp:
+            self.check_status_code(url, resp.status, len(headers) > 0)
+
+            if resp.status == 304:
+                self.logger.info('Not modified {}'.format(url))
+                return self.load_json_stream(os.path.join(self.config.saved_dir, filepath), None)
+
+            self.update_validators(filepath, resp.headers)
+
+            with self.open_json_stream_writer(
+                    filepath, self.get_charset(resp.headers.get("Content-Type"))) as writer:
+                async for chunk in resp.content.iter_chunked(1 << 16):
+                    writer.write(chunk)
+
+                return self.close_json_stream_writer(filepath, writer)
+
+    def save_and_parse_json(self, filename, content):
         if self.config.exported_data.domjudge_api:
             utils.ensure_dir(self.api_dir)
-            self.output_to_file(os.path.join(
-                self.sub_dir_path, self.api_path_name, filename), content)
+            self.output_to_file(
+                self.get_api_saved_filepath(filename), content)
 
         try:
             if filename.endswith(".json"):
@@ -165,80 +555,164 @@ class Dump:
             return content
 
     def add_more_fields_for_submission(self):
-        submissions_judgement_map = {}
-        for judgement in self.judgements:
-            id = judgement['submission_id']
-            submissions_judgement_map[id] = judgement
-
-        for submission in self.submissions:
-            id = submission['id']
-
-            submission['language_name'] = None
-            if 'language_id' in submission.keys():
-                language_id = submission['language_id']
-                for l in self.languages:  # noqa: E741
-                    if language_id == l["id"]:
-                        submission['language_name'] = l['name']
-                        break
-
-            # Pending
-            if id not in submissions_judgement_map.keys():
-                submission['verdict'] = 'PD'
-                submission['max_run_time'] = 0
-            else:
-                judgement = submissions_judgement_map[id]
-                submission['verdict'] = judgement["judgement_type_id"]
-                submission['max_run_time'] = None
-                if "max_run_time" in judgement.keys():
-                    submission['max_run_time'] = judgement['max_run_time']
+        # Kept for the callers that read these fields from the raw submission dicts
+        for submission, s in zip(self.submissions, self.contest_model.submissions):
+            submission['language_name'] = s.language_name
+            submission['verdict'] = s.verdict
+            submission['max_run_time'] = s.max_run_time
 
     def get_seconds(self, t):
-        h, m, s = t.strip().split(":")
-        return math.floor(int(h) * 3600 + int(m) * 60 + math.floor(float(s)))
+        return utils.get_seconds(t)
 
     def get_submission_timestamp(self, t):
-        h, m, s = t.strip().split(":")
-        timestamp = int(h) * 3600 + int(m) * 60
-
-        if self.config.score_in_seconds:
-            timestamp += math.floor(float(s))
-
-        return timestamp
+        return utils.get_submission_timestamp(t, self.config.score_in_seconds)
 
     def is_observers(self, team):
+        if self.contest_model is not None and team['id'] in self.contest_model.teams:
+            return self.contest_model.teams[team['id']].is_observer
+
         for group_id in team['group_ids']:
             if self.groups_dict[group_id]['name'] == 'Observers':
                 return True
 
         return False
 
-    def dump_domjudge_api(self):
-        self.contest = self.request_json_and_save('', 'contest.json')
-        self.awards = self.request_json_and_save('awards', 'awards.json')
-        self.scoreboard = self.request_json_and_save(
-            'scoreboard', 'scoreboard.json')
-
-        self.groups = self.request_json_and_save('groups', 'groups.json')
-        self.judgements = self.request_json_and_save(
-            'judgements', 'judgements.json')
-        self.judgement_types = self.request_json_and_save(
-            'judgement-types', 'judgement-types.json')
-        self.languages = self.request_json_and_save(
-            'languages', 'languages.json')
-        self.organizations = self.request_json_and_save(
-            'organizations', 'organizations.json')
-        self.problems = self.request_json_and_save('problems', 'problems.json')
-        self.teams = self.request_json_and_save('teams', 'teams.json')
-        self.submissions = self.request_json_and_save(
-            'submissions', 'submissions.json')
+    def get_local_scoreboard(self, frozen=False):
+        # Built from the already loaded data instead of the `scoreboard` endpoint
+        scoreboard = Scoreboard(self.contest, self.problems, self.groups, self.teams,
+                                self.judgement_types, frozen, self.is_observers)
+
+        for submission in self.submissions:
+            scoreboard.add_submission(submission)
+
+        for judgement in self.judgements:
+            scoreboard.add_judgement(judgement)
+
+        return scoreboard
+
+    def get_domjudge_api_endpoints(self):
+        # (attribute name, endpoint, saved filename, params)
+        endpoints = [
+            ('contest', '', 'contest.json', {}),
+            ('awards', 'awards', 'awards.json', {}),
+            ('scoreboard', 'scoreboard', 'scoreboard.json', {}),
+            ('groups', 'groups', 'groups.json', {}),
+            ('judgements', 'judgements', 'judgements.json', {}),
+            ('judgement_types', 'judgement-types', 'judgement-types.json', {}),
+            ('languages', 'languages', 'languages.json', {}),
+            ('organizations', 'organizations', 'organizations.json', {}),
+            ('problems', 'problems', 'problems.json', {}),
+            ('teams', 'teams', 'teams.json', {}),
+            ('submissions', 'submissions', 'submissions.json', {}),
+        ]
 
         if self.config.exported_data.domjudge_api_clarifications:
-            self.clarifications = self.request_json_and_save(
-                'clarifications', 'clarifications.json')
+            endpoints.append(
+                ('clarifications', 'clarifications', 'clarifications.json', {}))
+
+        if self.config.exported_data.event_feed and not self.is_event_feed_streaming():
+            endpoints.append(
+                ('event_feed', 'event-feed', 'event-feed.ndjson', {'stream': False, 'strict': True}))
 
-        if self.config.exported_data.event_feed:
-            self.event_feed = self.request_json_and_save(
-                'event-feed', 'event-feed.ndjson', {'stream': False, 'strict': True})
+        return endpoints
+
+    def is_event_feed_streaming(self):
+        return self.config.exported_data.event_feed_streaming and self.config.base_file_path == ''
+
+    def dump_domjudge_api(self):
+        if self.config.async_fetch and self.config.base_file_path == '':
+            asyncio.run(self.async_dump_domjudge_api())
+        else:
+            for attr, endpoint, filename, params in self.get_domjudge_api_endpoints():
+                setattr(self, attr, self.request_json_and_save(
+                    endpoint, filename, params))
+
+        if self.config.exported_data.event_feed and self.is_event_feed_streaming():
+            self.dump_event_feed_stream()
+
+    def get_last_event(self, file_path: str):
+        # Walk backwards from the end of the file, drop a partially written
+        # trailing line left by an interrupted run, and return the last complete event
+        with open(file_path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            tail = b''
+            complete_end = None
+            last_line = None
+
+            while pos > 0:
+                step = min(1 << 16, pos)
+                pos -= step
+                f.seek(pos)
+                tail = f.read(step) + tail
+
+                if complete_end is None:
+                    index = tail.rfind(b'\n')
+                    if index != -1:
+                        complete_end = pos + index + 1
+                    elif pos == 0:
+                        complete_end = 0
+
+                if complete_end is None:
+                    continue
+
+                lines = tail[:complete_end - pos].split(b'\n')
+
+                # Unless we reached the beginning of the file,
+                # the first line may still be cut off
+                if pos > 0:
+                    lines = lines[1:]
+
+                lines = [line for line in lines if len(line.strip()) > 0]
+                if len(lines) > 0:
+                    last_line = lines[-1]
+                    break
+
+            f.truncate(0 if complete_end is None else complete_end)
+
+        if last_line is None:
+            return None
+
+        return json.loads(last_line)
+
+    def dump_event_feed_stream(self):
+        utils.ensure_dir(self.api_dir)
+
+        file_path = os.path.join(self.api_dir, 'event-feed.ndjson')
+        params = {'stream': False, 'strict': True}
+
+        if os.path.exists(file_path):
+            last_event = self.get_last_event(file_path)
+
+            if last_event is not None:
+                if last_event.get('token') is not None:
+                    params['since_token'] = last_event['token']
+                elif last_event.get('id') is not None:
+                    params['since_id'] = last_event['id']
+
+        url = self.get_api_url('event-feed')
+        self.logger.info('GET {} [params={}]'.format(url, params))
+
+        size = 0
+        with self.send_request(url, params, stream=True) as resp, open(file_path, 'ab') as f:
+            for chunk in resp.iter_content(chunk_size=1 << 16):
+                f.write(chunk)
+                size += len(chunk)
+
+        self.logger.info(
+            "event-feed appended. [size={}] [file_path={}]".format(size, file_path))
+
+    async def async_dump_domjudge_api(self):
+        semaphore = asyncio.Semaphore(self.config.async_fetch_parallels_nums)
+
+        async def fetch(session, attr, endpoint, filename, params):
+            async with semaphore:
+                setattr(self, attr, await self.async_request_json_and_save(
+                    session, endpoint, filename, params))
+
+        async with self.create_async_session() as session:
+            await asyncio.gather(*[fetch(session, *endpoint)
+                                   for endpoint in self.get_domjudge_api_endpoints()])
 
     def dump_runs(self):
         if not self.config.exported_data.runs:
@@ -259,64 +733,108 @@ class Dump:
             return
 
         if self.config.base_url != '':
-            runs = self.request_json_and_save(
-                'runs?limit=10000', 'runs.1.json')
+            if self.config.exported_data.domjudge_api:
+                utils.ensure_dir(self.api_dir)
+
+            # The last written page may still grow,
+            # so an incremental run starts again from that page instead of the first one
+            state = self.manifest.get('runs') if self.manifest is not None else {}
+            page = state.get('page', 1)
+            first_id = state.get('first_id')
 
-            i = 2
-            saved_filename = ''
+            # Writing a page overlaps with fetching the next one
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                pending = None
 
-            while len(runs) != 0:
-                endpoint = 'runs?limit=10000&first_id={}'.format(
-                    str(int(runs[-1]['id'])+1))
+                while True:
+                    endpoint = 'runs?limit={}'.format(self.kRunsPageSize)
+                    if first_id is not None:
+                        endpoint += '&first_id={}'.format(first_id)
 
-                saved_filename = 'runs.{}.json'.format(str(i))
+                    content = self.request_json(endpoint)
 
-                runs = self.request_json_and_save(endpoint, saved_filename)
-                i = i + 1
+                    if content.strip() == '[]':
+                        break
 
-            # Obviously, there will be an empty JSON file
-            os.remove(os.path.join(self.config.saved_dir,
-                                   self.sub_dir_path, self.api_path_name, saved_filename))
+                    if pending is not None:
+                        pending.result()
 
-    def download_source_code(self, submission_id_list):
-        # err_list = []
+                    filepath = self.get_api_saved_filepath(
+                        'runs.{}.json'.format(page))
 
-        # def exception_handler(request, exception):
-        #     self.logger.error('An error occurred during request GET {}, exception:{}'.format(
-        #         request.url, exception))
+                    if filepath is not None:
+                        pending = executor.submit(
+                            self.output_to_file, filepath, content)
 
-        #     err_list.append(request)
+                        if self.manifest is not None:
+                            self.manifest.update(
+                                'runs', page=page, first_id=first_id)
 
-        # reqs = []
+                    first_id = self.get_runs_last_id(content) + 1
+                    page += 1
 
-        # for submission_id in submission_id_list:
-        #     url_prefix = utils.url_join(self.api_url, str(self.config.cid),
-        #                                 'submissions', str(submission_id))
-        #     reqs.append(grequests.get(url=utils.url_join(
-        #         url_prefix, 'files'), headers=self.headers))
-        #     reqs.append(grequests.get(url=utils.url_join(
-        #         url_prefix, 'source-code'), headers=self.headers))
+                if pending is not None:
+                    pending.result()
 
-        # res_list = grequests.map(reqs, exception_handler=exception_handler)
+    def get_runs_last_id(self, content: str):
+        # Every run has exactly one `"id":` key (`"judgement_id":` does not match),
+        # so the last occurrence belongs to the last run of the page
+        # and there is no need to parse the whole page
+        index = content.rfind('"id":')
+        if index != -1:
+            match = re.match(r'"id":\s*"?(\d+)', content[index:index + 64])
+            if match is not None:
+                return int(match.group(1))
 
-        # if len(err_list) > 0:
-        #     return False
+        return int(json.loads(content)[-1]['id'])
 
-        # for i in range(0, len(res_list), 2):
-        #     submission_id = submission_id_list[i // 2]
+    async def async_download_source_code(self, submission_id_list):
+        queue = asyncio.Queue()
 
-        #     res_files = res_list[i]
-        #     res_source_code = res_list[i + 1]
+        for submission_id in submission_id_list:
+            queue.put_nowait(submission_id)
 
-        #     with open(os.path.join(self.submissions_dir, str(submission_id), 'files.zip'), 'wb') as f:
-        #         f.write(res_files.content)
+        total = len(submission_id_list)
+        finished = []
+        failed = []
 
-        #     with open(os.path.join(self.submissions_dir, str(submission_id), 'source-code.json'), 'w') as f:
-        #         f.write(res_source_code.content.decode('unicode-escape'))
+        async def worker(session):
+            while not queue.empty():
+                submission_id = queue.get_nowait()
 
-        self.logger.fatal("Not implemented")
+                url_prefix = self.get_api_url(
+                    utils.url_join('submissions', str(submission_id)))
+                dist_dir = os.path.join(self.submissions_dir, str(submission_id))
 
-        return True
+                try:
+                    await self.async_download_with_retry(
+                        session, utils.url_join(url_prefix, 'files'), os.path.join(dist_dir, 'files.zip'))
+                    await self.async_download_with_retry(
+                        session, utils.url_join(url_prefix, 'source-code'), os.path.join(dist_dir, 'source-code.json'))
+                except Exception as e:
+                    self.logger.error("download source code failed. [submission_id={}] [err={}]".format(
+                        submission_id, e))
+                    failed.append(submission_id)
+
+                finished.append(submission_id)
+                if len(finished) % 100 == 0 or len(finished) == total:
+                    self.logger.info(
+                        'Submissions {}/{}'.format(str(len(finished)), str(total)))
+
+        parallels_nums = self.config.grequests_parallels_nums
+
+        async with self.create_async_session(limit=parallels_nums) as session:
+            await asyncio.gather(*[worker(session) for _ in range(min(parallels_nums, max(total, 1)))])
+
+        return failed
+
+    def download_source_code(self, submission_id_list):
+        failed = asyncio.run(
+            self.async_download_source_code(submission_id_list))
+
+        if len(failed) > 0:
+            raise RuntimeError(
+                "download source code failed. [failed_submission_ids={}]".format(failed))
 
     def dump_source_code(self):
         if not self.config.exported_data.source_code:
@@ -331,59 +849,73 @@ class Dump:
             return
 
         if self.config.base_url != '':
-            total = len(self.submissions)
-            i = 0
-
-            utils.ensure_dir(self.submissions_dir)
-
             submission_id_list = []
 
             for submission in self.submissions:
                 submission_id = submission['id']
+
+                # Submitted source code never changes,
+                # so anything already downloaded by a previous run is kept
+                if self.manifest is not None and all(os.path.exists(os.path.join(
+                        self.submissions_dir, submission_id, filename)) for filename in ['files.zip', 'source-code.json']):
+                    continue
+
                 submission_id_list.append(submission_id)
 
                 utils.ensure_dir(os.path.join(
                     self.submissions_dir, submission_id))
 
-                i = i + 1
-                if i % 100 == 0 or i == total:
-                    while not self.download_source_code(submission_id_list):
-                        time.sleep(1)
-                        self.logger.info("retrying")
-
-                    submission_id_list.clear()
-
-                    self.logger.info(
-                        'Submissions {}/{}'.format(str(i), str(total)))
+            self.download_source_code(submission_id_list)
 
     def dump_images(self):
         if not self.config.exported_data.images:
             return
 
+        hrefs = []
+
         # contest
         if "banner" in self.contest.keys():
             for b in self.contest["banner"]:
-                href = b["href"]
-                self.image_download(utils.url_join(self.config.base_url, "api",
-                                                   self.config.api_version, href), os.path.join(self.images_dir, href))
+                hrefs.append(b["href"])
 
         # organization
         for o in self.organizations:
             if "logo" in o.keys():
                 for logo in o["logo"]:
-                    href = logo["href"]
-                    self.image_download(utils.url_join(self.config.base_url, "api",
-                                                       self.config.api_version, href), os.path.join(self.images_dir, href))
+                    hrefs.append(logo["href"])
 
         # team
         for t in self.teams:
             if "photo" in t.keys():
                 for photo in t["photo"]:
-                    href = photo["href"]
-                    self.image_download(utils.url_join(self.config.base_url, "api",
-                                                       self.config.api_version, href), os.path.join(self.images_dir, href))
+                    hrefs.append(photo["href"])
+
+        # Many organizations share the same logo,
+        # so every href is only downloaded once per run
+        hrefs = list(dict.fromkeys(hrefs))
+
+        asyncio.run(self.async_dump_images(hrefs))
+
+    def get_contest_model(self, contest, problems, teams, submissions):
+        if self.contest_model is not None and contest is self.contest and submissions is self.submissions:
+            return self.contest_model
+
+        return ContestModel(contest, problems, self.groups, teams, self.languages, submissions,
+                            self.judgements, self.config.score_in_seconds)
 
     def get_ghost_dat_data(self, contest, teams_dict, submissions, problems_dict):
+        self.write_ghost_dat_data(self.get_contest_model(
+            contest, problems_dict.values(), teams_dict.values(), submissions))
+
+    def get_resolver_data(self, contest, teams, submissions, problems_dict):
+        self.write_resolver_data(self.get_contest_model(
+            contest, problems_dict.values(), teams, submissions))
+
+    def get_excel_data(self, contest, scoreboard, problems_dict, teams_dict):
+        self.write_excel_data(self.get_contest_model(
+            contest, problems_dict.values(), teams_dict.values(), self.submissions), scoreboard)
+
+    def write_ghost_dat_data(self, contest_model: ContestModel):
         verdict_mapping = {
             'CE': 'CE',
             'MLE': 'ML',
@@ -397,130 +929,134 @@ class Dump:
             'PD': 'PD',
         }
 
-        team_nums = len(teams_dict)
+        contest = contest_model.contest
+        teams = contest_model.teams
+        problems = contest_model.problems
+
+        team_nums = len(teams)
         need_dummy_teams = team_nums
 
         if self.config.add_dummy_russian_team:
             team_nums += need_dummy_teams
 
-        dat_data = ''
+        with self.open_output_file('contest.dat') as f:
+            f.write('@contest "{}"\n'.format(contest['formal_name']))
+            f.write('@contlen {}\n'.format(
+                int(self.get_seconds(contest['duration']) // 60)))
+            f.write('@problems {}\n'.format(len(problems)))
+            f.write('@teams {}\n'.format(team_nums))
+            f.write('@submissions {}\n'.format(len(contest_model.submissions)))
 
-        dat_data += '@contest "{}"\n'.format(contest['formal_name'])
-        dat_data += '@contlen {}\n'.format(
-            int(self.get_seconds(contest['duration']) // 60))
-        dat_data += '@problems {}\n'.format(len(problems_dict))
-        dat_data += '@teams {}\n'.format(team_nums)
-        dat_data += '@submissions {}\n'.format(len(submissions))
+            for problem in problems.values():
+                f.write('@p {},{},20,0\n'.format(problem.label, problem.name))
 
-        for problem in problems_dict.values():
-            label = problem['label']
-            name = problem['name']
+            # Count from 1
+            for team in teams.values():
+                f.write('@t {},0,1,{} {}{}\n'.format(
+                    team.index + 1, team.affiliation, '*' if team.is_observer else '', team.name))
 
-            dat_data += '@p {},{},20,0\n'.format(label, name)
+            team_index = len(teams) + 1
 
-        team_index = 1
-        team_index_dict = {}
+            if self.config.add_dummy_russian_team:
+                for i in range(need_dummy_teams):
+                    f.write('@t {},0,1,Пополнить команду\n'.format(team_index))
+                    team_index += 1
 
-        for id, team in teams_dict.items():
-            affiliation = team['affiliation']
-            name = team['name']
+            teams_submit_index_dict = {}
+            for submission in contest_model.submissions:
+                team_id = teams[submission.team_id].index + 1
+                problem_label = problems[submission.problem_id].label
 
-            team_id = team_index
-            team_index += 1
-            team_index_dict[id] = team_id
+                if team_id in teams_submit_index_dict.keys():
+                    teams_submit_index_dict[team_id] += 1
+                else:
+                    teams_submit_index_dict[team_id] = 1
 
-            dat_data += '@t {},0,1,{} {}{}\n'.format(
-                team_id, affiliation, '*' if self.is_observers(team) else '', name)
+                team_submit_index = teams_submit_index_dict[team_id]
+                timestamp = submission.timestamp
 
-        if self.config.add_dummy_russian_team:
-            for i in range(need_dummy_teams):
-                dat_data += '@t {},0,1,Пополнить команду\n'.format(team_index)
-                team_index += 1
+                verdict = verdict_mapping[submission.verdict]
 
-        teams_submit_index_dict = {}
-        for submission in submissions:
-            team_id = team_index_dict[submission['team_id']]
-            problem_label = problems_dict[submission['problem_id']]['label']
+                f.write('@s {},{},{},{},{}\n'.format(
+                    team_id, problem_label, team_submit_index, timestamp, verdict))
 
-            if team_id in teams_submit_index_dict.keys():
-                teams_submit_index_dict[team_id] += 1
-            else:
-                teams_submit_index_dict[team_id] = 1
+    def write_resolver_data(self, contest_model: ContestModel):
+        contest = contest_model.contest
+        problems = contest_model.problems
+        teams = contest_model.teams
 
-            team_submit_index = teams_submit_index_dict[team_id]
-            timestamp = self.get_submission_timestamp(
-                submission['contest_time'])
+        contest_seconds = self.get_seconds(contest["duration"])
+        frozen_seconds = contest_seconds - \
+            self.get_seconds(contest["scoreboard_freeze_duration"])
 
-            verdict = verdict_mapping[submission['verdict']]
+        # Written piece by piece, but byte-identical to
+        # `utils.object_to_json_string` of the whole resolver data
+        with self.open_output_file('resolver.json') as f:
+            f.write('{"contest_name":')
+            f.write(utils.object_to_json_string(contest["formal_name"]))
+            f.write(',"problem_count":')
+            f.write(utils.object_to_json_string(len(problems)))
+            f.write(',"frozen_seconds":')
+            f.write(utils.object_to_json_string(frozen_seconds))
 
-            dat_data += '@s {},{},{},{},{}\n'.format(
-                team_id, problem_label, team_submit_index, timestamp, verdict)
+            f.write(',"solutions":{')
 
-        self.output_to_file('contest.dat', dat_data)
+            submission_index = 1
+            for submission in contest_model.submissions:
+                verdict = submission.verdict
 
-    def get_resolver_data(self, contest, teams, submissions, problems_dict):
-        resolver_data = {}
-        resolver_data["contest_name"] = contest["formal_name"]
-        resolver_data["problem_count"] = len(problems_dict)
-        resolver_data["frozen_seconds"] = self.get_seconds(
-            contest["duration"]) - self.get_seconds(contest["scoreboard_freeze_duration"])
-
-        users = {}
-        solutions = {}
+                if verdict != 'AC' and verdict != 'CE':
+                    verdict = 'WA'
 
-        for team in teams:
-            item = {}
+                if verdict == 'CE':
+                    continue
 
-            if team["display_name"] is not None and len(team["display_name"]) > 0:
-                item['name'] = team['display_name']
-            else:
-                item["name"] = team["name"]
+                # TOO LATE submission
+                if submission.timestamp > contest_seconds:
+                    continue
 
-            item['college'] = team['affiliation']
-            item['is_exclude'] = self.is_observers(team)
+                if submission.team_id not in teams:
+                    continue
 
-            users[team['id']] = item
+                item = {}
+                item['submitted_seconds'] = submission.timestamp
+                item['user_id'] = submission.team_id
 
-        submission_index = 1
-        for submission in submissions:
-            id = submission['id']  # noqa: F841
-            verdict = submission['verdict']
+                # Count from 1
+                item['problem_index'] = str(ord(
+                    problems[submission.problem_id].label) - ord('A') + 1)
 
-            if verdict != 'AC' and verdict != 'CE':
-                verdict = 'WA'
+                item['verdict'] = verdict
 
-            if verdict == 'CE':
-                continue
+                if submission_index > 1:
+                    f.write(',')
+                f.write('"{}":'.format(submission_index))
+                f.write(utils.object_to_json_string(item))
 
-            item = {}
-            item['submitted_seconds'] = self.get_submission_timestamp(
-                submission['contest_time'])
+                submission_index += 1
 
-            # TOO LATE submission
-            if item['submitted_seconds'] > self.get_seconds(contest["duration"]):
-                continue
+            f.write('},"users":{')
 
-            item['user_id'] = submission['team_id']
+            for index, team in enumerate(teams.values()):
+                item = {}
 
-            if item['user_id'] not in users.keys():
-                continue
-
-            # Count from 1
-            item['problem_index'] = str(ord(
-                problems_dict[submission['problem_id']]['label']) - ord('A') + 1)
-
-            item['verdict'] = verdict
+                if team.display_name is not None and len(team.display_name) > 0:
+                    item['name'] = team.display_name
+                else:
+                    item["name"] = team.name
 
-            solutions[submission_index] = item
-            submission_index += 1
+                item['college'] = team.affiliation
+                item['is_exclude'] = team.is_observer
 
-        resolver_data['solutions'] = solutions
-        resolver_data['users'] = users
+                if index > 0:
+                    f.write(',')
+                f.write(utils.object_to_json_string(str(team.id)))
+                f.write(':')
+                f.write(utils.object_to_json_string(item))
 
-        self.output_to_file(
-            'resolver.json', utils.object_to_json_string(resolver_data))
+            f.write('}}')
 
-    def get_excel_data(self, contest, scoreboard, problems_dict, teams_dict):
+    def write_excel_data(self, contest_model: ContestModel, scoreboard):
         import xlwt
 
         def get_title_style():
@@ -570,6 +1106,9 @@ class Dump:
 
             return style
 
+        contest = contest_model.contest
+        teams = contest_model.teams
+
         file_path = os.path.join(self.config.saved_dir,
                                  '{}.xls'.format(contest['formal_name'].replace(' ', '-')))
 
@@ -584,13 +1123,13 @@ class Dump:
 
         row = [['Rank', 'Affiliation', 'Name', 'Solved', 'Penalty']]
 
-        for p in self.problems:
-            row[0].append(p['label'])
+        for p in contest_model.problems.values():
+            row[0].append(p.label)
 
         for item in scoreboard['rows']:
-            team = teams_dict[item['team_id']]
+            team = teams[item['team_id']]
 
-            res = [item['rank'], team['affiliation'], team['name'],
+            res = [item['rank'], team.affiliation, team.name,
                    item['score']['num_solved'], item['score']['total_time']]
 
             for p in item['problems']:
@@ -641,6 +1180,10 @@ class Dump:
         for team in self.teams:
             self.teams_dict[team['id']] = team
 
+        self.contest_model = ContestModel(self.contest, self.problems, self.groups, self.teams,
+                                          self.languages, self.submissions, self.judgements,
+                                          self.config.score_in_seconds)
+
         self.add_more_fields_for_submission()
 
     def dump_3rd_data(self):
@@ -651,28 +1194,67 @@ class Dump:
         self.process_domjudge_raw_data()
 
         if self.config.exported_data.ghost_dat_data:
-            self.get_ghost_dat_data(
-                self.contest, self.teams_dict, self.submissions, self.problems_dict)
+            self.write_ghost_dat_data(self.contest_model)
 
         if self.config.exported_data.resolver_data:
-            self.get_resolver_data(self.contest, self.teams, self.submissions,
-                                   self.problems_dict)
+            self.write_resolver_data(self.contest_model)
 
         if self.config.exported_data.scoreboard_excel_data:
-            self.get_excel_data(self.contest, self.scoreboard,
-                                self.problems_dict, self.teams_dict)
+            self.write_excel_data(self.contest_model, self.scoreboard)
+
+    def get_resume_file_paths(self):
+        # Paths a later dump resumes from, whether `incremental` is enabled or not
+        file_paths = []
+
+        if self.config.exported_data.event_feed and self.is_event_feed_streaming():
+            file_paths.append(os.path.join(self.api_dir, 'event-feed.ndjson'))
+
+        # The images cache is kept as a whole, it may live under `saved_dir`
+        if self.config.exported_data.images:
+            file_paths.append(self.get_images_cache_dir())
+
+        return file_paths
+
+    def clear_saved_dir(self):
+        kept = [os.path.normpath(file_path)
+                for file_path in self.get_resume_file_paths()]
+
+        def is_kept(file_path):
+            file_path = os.path.normpath(file_path)
+            return any(file_path == k or file_path.startswith(k + os.sep) for k in kept)
+
+        for root, dirs, files in os.walk(self.config.saved_dir, topdown=False):
+            for filename in files:
+                file_path = os.path.join(root, filename)
+                if not is_kept(file_path):
+                    os.remove(file_path)
+
+            for dirname in dirs:
+                dir_path = os.path.join(root, dirname)
+                if os.path.islink(dir_path):
+                    os.remove(dir_path)
+                elif len(os.listdir(dir_path)) == 0:
+                    os.rmdir(dir_path)
 
     def dump(self):
-        if os.path.exists(self.config.saved_dir):
-            shutil.rmtree(self.config.saved_dir)
+        if not self.config.incremental and os.path.exists(self.config.saved_dir):
+            self.clear_saved_dir()
 
         utils.ensure_dir(self.config.saved_dir)
 
-        self.dump_domjudge_api()
-        self.dump_runs()
-        self.dump_source_code()
-        self.dump_images()
-        self.dump_3rd_data()
+        if self.config.incremental:
+            self.manifest = Manifest(os.path.join(
+                self.config.saved_dir, self.manifest_filename))
+
+        try:
+            self.dump_domjudge_api()
+            self.dump_runs()
+            self.dump_source_code()
+            self.dump_images()
+            self.dump_3rd_data()
+        finally:
+            if self.manifest is not None:
+                self.manifest.save()
 
     def load_domjudge_api(self):
         self.config.exported_data.domjudge_api = False
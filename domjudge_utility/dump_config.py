@@ -19,6 +19,18 @@ class DumpConfig:
             self.event_feed = DumpConfig.get_config_with_default_value(
                 exported_data_dict, 'event_feed', False)
 
+            # Read the event-feed line by line as it arrives and append it to disk,
+            # an existing `event-feed.ndjson` is resumed from its last event
+            # with `since_token` (or `since_id` on older DOMjudge)
+            # instead of being downloaded again,
+            # the file is kept in `saved_dir` even when `incremental` is disabled
+            # defaults to `false`
+            self.event_feed_streaming = DumpConfig.get_config_with_default_value(
+                exported_data_dict, 'event_feed_streaming', False)
+
+            # Runs are written to the `domjudge_api` directory page by page,
+            # only an `incremental` dump resumes from the last written page
+            # defaults to `false`
             self.runs = DumpConfig.get_config_with_default_value(
                 exported_data_dict, 'runs', False)
 
@@ -67,11 +79,76 @@ class DumpConfig:
             config_dict, 'add_dummy_russian_team', False)
 
         # Since there are too many requests to send when downloading source code,
-        # we use `grequests` to send in parallel,
-        # this configuration field can set the number of parallel sending
+        # we use `aiohttp` to send in parallel,
+        # this configuration field can set the number of requests in flight
+        # (the name is kept for compatibility with the former `grequests` implementation)
         # defaults to `100`
         self.grequests_parallels_nums = self.get_config_with_default_value(
             config_dict, 'grequests_parallels_nums', 100)
 
+        # How many times a single failed download is retried
+        # with exponential backoff before giving up
+        # defaults to `5`
+        self.download_retry_nums = self.get_config_with_default_value(
+            config_dict, 'download_retry_nums', 5)
+
+        # The number of images downloaded at the same time
+        # defaults to `16`
+        self.images_parallels_nums = self.get_config_with_default_value(
+            config_dict, 'images_parallels_nums', 16)
+
+        # Downloaded images are kept in this content-addressed cache across dumps,
+        # so images that have not changed are neither downloaded nor written again,
+        # empty means `.cache/images` under `saved_dir`,
+        # which is not removed by a dump without `incremental`
+        # defaults to ``
+        self.images_cache_dir = self.get_config_with_default_value(
+            config_dict, 'images_cache_dir', '')
+
+        # Keep `saved_dir` between runs instead of removing it,
+        # a manifest records what was fetched, so the next run sends conditional requests
+        # (ETag / If-Modified-Since) and does not rewrite files whose content is unchanged
+        # defaults to `false`
+        self.incremental = self.get_config_with_default_value(
+            config_dict, 'incremental', False)
+
+        # All requests sent by `Dump` share one pooled HTTP session,
+        # the pool size is the maximum number of kept-alive connections
+        # defaults to `16`
+        self.http_pool_size = self.get_config_with_default_value(
+            config_dict, 'http_pool_size', 16)
+
+        # Reuse connections between requests instead of
+        # paying a new TCP and TLS handshake every time
+        # defaults to `true`
+        self.http_keep_alive = self.get_config_with_default_value(
+            config_dict, 'http_keep_alive', True)
+
+        # Read timeout in seconds for a single request,
+        # large endpoints such as `judgements` may take a while on big contests
+        # defaults to `60`
+        self.http_timeout = self.get_config_with_default_value(
+            config_dict, 'http_timeout', 60)
+
+        # Write the raw response of every `.json` endpoint to disk while
+        # parsing array elements incrementally, instead of holding the body
+        # as bytes, as a string and as parsed records at the same time
+        # defaults to `false`
+        self.json_streaming = self.get_config_with_default_value(
+            config_dict, 'json_streaming', False)
+
+        # Fetch the DOMjudge API endpoints concurrently with `aiohttp`
+        # instead of one after another,
+        # each endpoint is saved as soon as it arrives
+        # defaults to `false`
+        self.async_fetch = self.get_config_with_default_value(
+            config_dict, 'async_fetch', False)
+
+        # The maximum number of endpoints requested at the same time
+        # when `async_fetch` is enabled
+        # defaults to `8`
+        self.async_fetch_parallels_nums = self.get_config_with_default_value(
+            config_dict, 'async_fetch_parallels_nums', 8)
+
         self.exported_data = DumpConfig.ExportedData(
             config_dict['exported_data'] if 'exported_data' in config_dict.keys() else {})
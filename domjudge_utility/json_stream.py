@@ -0,0 +1,152 @@
+import codecs
+import hashlib
+import json
+import os
+import re
+from typing import Optional
+
+kWhitespaceAndComma = re.compile(r'[ \t\n\r]*(,[ \t\n\r]*)?')
+
+
+class JsonStreamParser:
+    def __init__(self, encoding: str = 'utf-8'):
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+
+        # `json.loads` shares equal keys within one document,
+        # but every `raw_decode` call starts afresh,
+        # so share them across elements ourselves
+        self.keys = {}
+        self.json_decoder = json.JSONDecoder(
+            object_pairs_hook=self.share_keys)
+
+        self.buffer = ''
+        self.pos = 0
+
+        # `None` until the first non-whitespace character arrives
+        self.is_array = None
+        self.is_closed = False
+
+        self.records = []
+        self.parts = []
+
+    def share_keys(self, pairs):
+        keys = self.keys
+        return {keys.setdefault(k, k): v for k, v in pairs}
+
+    def feed(self, data: bytes, final=False):
+        text = self.decoder.decode(data, final)
+
+        # Anything but a top-level array is decoded once all data has arrived
+        if self.is_array is False:
+            self.parts.append(text)
+            return
+
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+
+        if self.is_array is None:
+            stripped = self.buffer.lstrip()
+            if len(stripped) == 0:
+                return
+
+            self.buffer = stripped
+            self.is_array = stripped[0] == '['
+
+            if not self.is_array:
+                self.parts.append(self.buffer)
+                self.buffer = ''
+                return
+
+            self.pos = 1
+
+        if self.is_closed:
+            return
+
+        while True:
+            self.pos = kWhitespaceAndComma.match(self.buffer, self.pos).end()
+
+            if self.pos >= len(self.buffer):
+                return
+
+            if self.buffer[self.pos] == ']':
+                self.is_closed = True
+                self.pos += 1
+                return
+
+            try:
+                record, end = self.json_decoder.raw_decode(
+                    self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+
+                # The element is not complete yet
+                return
+
+            # A number may continue in the next chunk (`-45` + `00.0`),
+            # so only accept an element once its delimiter has arrived
+            if not final and (end == len(self.buffer) or self.buffer[end] not in ',] \t\n\r'):
+                return
+
+            self.records.append(record)
+            self.pos = end
+
+    def close(self):
+        self.feed(b'', final=True)
+
+        if not self.is_array:
+            return json.loads(''.join(self.parts))
+
+        if not self.is_closed or len(self.buffer[self.pos:].strip()) > 0:
+            raise ValueError("unterminated JSON array")
+
+        return self.records
+
+
+class JsonStreamWriter:
+    def __init__(self, dist: Optional[str], encoding: str = 'utf-8'):
+        self.parser = JsonStreamParser(encoding)
+        self.sha256 = hashlib.sha256()
+
+        self.dist = dist
+        self.tmp_dist = None
+        self.file = None
+
+        if dist is not None:
+            self.tmp_dist = dist + ".tmp"
+            self.file = open(self.tmp_dist, 'wb')
+
+    def write(self, chunk: bytes):
+        if self.file is not None:
+            self.file.write(chunk)
+
+        self.sha256.update(chunk)
+        self.parser.feed(chunk)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # A stream interrupted before it is committed never leaves its temporary file behind
+        if exc_type is not None:
+            self.discard()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+        try:
+            return self.parser.close()
+        except Exception:
+            self.discard()
+            raise
+
+    def discard(self):
+        if self.file is not None:
+            self.file.close()
+
+        if self.tmp_dist is not None and os.path.exists(self.tmp_dist):
+            os.remove(self.tmp_dist)
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
@@ -0,0 +1,30 @@
+import json
+import os
+
+
+class Manifest:
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                # A broken manifest only costs a full re-fetch
+                self.entries = {}
+
+    def get(self, key: str) -> dict:
+        return self.entries.get(key, {})
+
+    def update(self, key: str, **kwargs):
+        self.entries.setdefault(key, {}).update(kwargs)
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,860 @@
+import asyncio
+import base64
+import bisect
+import collections
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+import zipfile
+from typing import Optional
+
+from aiohttp import web
+
+from .dump_config import DumpConfig
+from .scoreboard import Scoreboard
+
+kEndpoints = [
+    'awards',
+    'scoreboard',
+    'groups',
+    'judgements',
+    'judgement-types',
+    'languages',
+    'organizations',
+    'problems',
+    'teams',
+    'submissions',
+    'clarifications',
+]
+
+# A 1x1 PNG, served for every image without a file in the fixture
+kPlaceholderImage = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==')
+
+
+class MockServerConfig:
+    def __init__(self, config_dict={}):
+        get = DumpConfig.get_config_with_default_value
+
+        # The directory laid out like the output of `Dump`,
+        # with the API in `domjudge/api/*.json`
+        self.fixture_dir = get(config_dict, 'fixture_dir', '')
+
+        self.host = get(config_dict, 'host', '127.0.0.1')
+
+        # `0` picks a free port
+        # defaults to `8080`
+        self.port = get(config_dict, 'port', 8080)
+
+        # Everything is served under this prefix,
+        # such as `/domjudge/api/v4/contests/5` and `/domjudge/public`
+        # defaults to `/`
+        self.url_prefix = get(config_dict, 'url_prefix', '/')
+
+        # Requests without these basic auth credentials get `401`,
+        # an empty value accepts everyone
+        # defaults to ``
+        self.userpwd = get(config_dict, 'userpwd', '')
+
+        # Seconds added before every response, plus a uniform jitter
+        # defaults to `0`
+        self.latency = get(config_dict, 'latency', 0)
+        self.latency_jitter = get(config_dict, 'latency_jitter', 0)
+
+        # Bytes per second of every response body, `0` means unlimited
+        # defaults to `0`
+        self.bandwidth = get(config_dict, 'bandwidth', 0)
+
+        # The fraction of requests that fail with `error_status`
+        # defaults to `0`
+        self.error_rate = get(config_dict, 'error_rate', 0)
+        self.error_status = get(config_dict, 'error_status', 500)
+
+        # Requests per second over all clients, the rest get `429`,
+        # `0` means unlimited
+        # defaults to `0`
+        self.rate_limit = get(config_dict, 'rate_limit', 0)
+
+        # Synthesized `runs` of every judgement without a `runs.json` in the fixture
+        # defaults to `3`
+        self.runs_per_judgement = get(config_dict, 'runs_per_judgement', 3)
+
+        # Seconds a posted submission waits in the queue, and is being judged
+        # defaults to `0.5` and `1`
+        self.judge_delay = get(config_dict, 'judge_delay', 0.5)
+        self.judge_time = get(config_dict, 'judge_time', 1)
+
+        # The team of posted submissions without a `team_id`,
+        # `None` means the first team
+        # defaults to `None`
+        self.submit_team_id = get(config_dict, 'submit_team_id', None)
+
+        # Seconds between the keep-alive newlines of a streaming event feed
+        # defaults to `10`
+        self.keep_alive_interval = get(config_dict, 'keep_alive_interval', 10)
+
+        # Seeds the injected errors and the verdicts of posted submissions
+        # defaults to `0`
+        self.seed = get(config_dict, 'seed', 0)
+
+
+def get_contest_time_string(seconds: float):
+    ms = int(round(seconds * 1000))
+    return "{}:{:02d}:{:02d}.{:03d}".format(ms // 3600000, ms // 60000 % 60, ms // 1000 % 60, ms % 1000)
+
+
+def get_time_string():
+    return datetime.datetime.now().astimezone().isoformat(timespec='milliseconds')
+
+
+class Body:
+    __slots__ = ('data', 'etag', 'gz_data')
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.etag = '"{}"'.format(hashlib.sha256(data).hexdigest())
+        self.gz_data = None
+
+
+class MockServer:
+    def __init__(self, config: MockServerConfig):
+        self.config = config
+
+        self.api_dir = os.path.join(config.fixture_dir, "domjudge", "api")
+        self.images_dir = os.path.join(config.fixture_dir, "domjudge", "images")
+        self.submissions_dir = os.path.join(
+            config.fixture_dir, "domjudge", "submissions")
+
+        self.prefix = "/" + config.url_prefix.strip("/")
+        if self.prefix == "/":
+            self.prefix = ""
+
+        # endpoint -> parsed content
+        self.data = {}
+
+        # endpoint -> Body, dropped whenever the content changes
+        self.bodies = {}
+
+        with open(os.path.join(self.api_dir, "contest.json"), 'rb') as f:
+            content = f.read()
+            self.contest = json.loads(content)
+            self.bodies[''] = Body(content)
+
+        self.cid = str(self.contest['id'])
+
+        for endpoint in kEndpoints:
+            file_path = os.path.join(self.api_dir, endpoint + ".json")
+
+            if os.path.exists(file_path):
+                with open(file_path, 'rb') as f:
+                    content = f.read()
+
+                # Served byte for byte until something changes
+                self.bodies[endpoint] = Body(content)
+                self.data[endpoint] = json.loads(content)
+            elif endpoint == 'scoreboard':
+                self.data[endpoint] = {}
+            else:
+                self.data[endpoint] = []
+
+        self.rng = random.Random(config.seed)
+
+        verdicts = collections.Counter(j['judgement_type_id'] for j in self.data['judgements']
+                                       if j['judgement_type_id'] is not None)
+        self.verdicts = list(verdicts.keys()) or ['AC']
+        self.verdict_weights = [verdicts[v] for v in self.verdicts] or [1]
+
+        self.runs = []
+        self.run_ids = []
+        self.load_runs()
+
+        # submission id -> (filename, source)
+        self.sources = {}
+        self.posted_nums = 0
+        self.live_scoreboard = None
+
+        self.started = time.monotonic()
+        self.event_cond = None
+        self.tasks = set()
+
+        self.events = []
+        self.event_index = {}
+        self.load_events()
+
+        self.tokens = config.rate_limit
+        self.tokens_updated = time.monotonic()
+
+        self.stats = collections.Counter()
+
+        self.runner = None
+        self.port = None
+        self.loop = None
+        self.thread = None
+
+    def load_runs(self):
+        file_path = os.path.join(self.api_dir, "runs.json")
+
+        if os.path.exists(file_path):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                for run in json.load(f):
+                    self.add_run(run)
+
+            return
+
+        for judgement in self.data['judgements']:
+            self.add_judgement_runs(judgement)
+
+    def add_run(self, run):
+        self.runs.append(run)
+        self.run_ids.append(int(run['id']))
+
+    def add_judgement_runs(self, judgement):
+        if judgement['judgement_type_id'] is None:
+            return
+
+        for ordinal in range(1, self.config.runs_per_judgement + 1):
+            last = ordinal == self.config.runs_per_judgement
+
+            self.add_run({
+                "id": str(len(self.runs) + 1),
+                "judgement_id": judgement['id'],
+                "ordinal": ordinal,
+                "judgement_type_id": judgement['judgement_type_id'] if last else 'AC',
+                "time": judgement['end_time'],
+                "contest_time": judgement['end_contest_time'],
+                "run_time": judgement.get('max_run_time') or 0,
+            })
+
+    def load_events(self):
+        file_path = os.path.join(self.api_dir, "event-feed.ndjson")
+
+        if os.path.exists(file_path):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if len(line.strip()) > 0:
+                        self.append_event(json.loads(line))
+
+            return
+
+        self.add_event('contests', self.cid, self.contest)
+
+        for endpoint in ['judgement-types', 'languages', 'problems', 'groups', 'organizations', 'teams']:
+            for item in self.data[endpoint]:
+                self.add_event(endpoint, item['id'], item)
+
+        # Submissions and judgements in the order they happened
+        items = [(s['time'] or '', 'submissions', s) for s in self.data['submissions']]
+        items += [(j['end_time'] or j['start_time'] or '', 'judgements', j)
+                  for j in self.data['judgements']]
+        items.sort(key=lambda item: item[0])
+
+        for _, endpoint, item in items:
+            self.add_event(endpoint, item['id'], item)
+
+        state = self.data['scoreboard'].get('state')
+        if state is not None:
+            self.add_event('state', None, state)
+
+    def add_event(self, type, id, data, op='create'):
+        self.append_event({
+            "token": str(len(self.events) + 1),
+            "id": id,
+            "type": type,
+            "op": op,
+            "data": data,
+        })
+
+    def append_event(self, event):
+        token = event.get('token') or event.get('id')
+        self.event_index[str(token)] = len(self.events)
+        self.events.append(json.dumps(event, ensure_ascii=False).encode('utf-8') + b'\n')
+
+        if self.event_cond is not None:
+            asyncio.ensure_future(self.notify_events())
+
+    async def notify_events(self):
+        async with self.event_cond:
+            self.event_cond.notify_all()
+
+    def get_contest_seconds(self):
+        return time.monotonic() - self.started
+
+    def get_body(self, endpoint):
+        if endpoint not in self.bodies:
+            data = self.data[endpoint]
+
+            if endpoint == 'scoreboard' and self.posted_nums > 0:
+                data = self.get_live_scoreboard()
+
+            self.bodies[endpoint] = Body(json.dumps(
+                data, ensure_ascii=False).encode('utf-8'))
+
+        return self.bodies[endpoint]
+
+    def get_live_scoreboard(self):
+        scoreboard = Scoreboard(self.contest, self.data['problems'], self.data['groups'],
+                                self.data['teams'], self.data['judgement-types'])
+
+        for submission in self.data['submissions']:
+            scoreboard.add_submission(submission)
+
+        for judgement in self.data['judgements']:
+            scoreboard.add_judgement(judgement)
+
+        return {
+            **self.data['scoreboard'],
+            "time": get_time_string(),
+            "contest_time": get_contest_time_string(self.get_contest_seconds()),
+            "rows": scoreboard.get_rows(),
+        }
+
+    def invalidate(self, *endpoints):
+        for endpoint in endpoints:
+            self.bodies.pop(endpoint, None)
+
+    def json_response_body(self, obj):
+        return Body(json.dumps(obj, ensure_ascii=False).encode('utf-8'))
+
+    def error_response(self, status, message):
+        return web.json_response({"code": status, "message": message}, status=status)
+
+    async def send(self, request: web.Request, body: Body, content_type="application/json"):
+        headers = {"ETag": body.etag}
+
+        if request.headers.get("If-None-Match") == body.etag:
+            return web.Response(status=304, headers=headers)
+
+        data = body.data
+        if "gzip" in request.headers.get("Accept-Encoding", "") and len(data) > 1024:
+            if body.gz_data is None:
+                body.gz_data = gzip.compress(data, 1)
+
+            data = body.gz_data
+            headers["Content-Encoding"] = "gzip"
+
+        if self.config.bandwidth <= 0:
+            return web.Response(body=data, headers=headers, content_type=content_type)
+
+        resp = web.StreamResponse(headers=headers)
+        resp.content_type = content_type
+        resp.content_length = len(data)
+        await resp.prepare(request)
+
+        # Every 50ms gets its share of the bandwidth
+        chunk_size = max(1, int(self.config.bandwidth / 20))
+        for i in range(0, len(data), chunk_size):
+            start = time.monotonic()
+            await resp.write(data[i:i + chunk_size])
+            await asyncio.sleep(max(0, 0.05 - (time.monotonic() - start)))
+
+        await resp.write_eof()
+        return resp
+
+    def take_token(self):
+        now = time.monotonic()
+        self.tokens = min(self.config.rate_limit, self.tokens +
+                          (now - self.tokens_updated) * self.config.rate_limit)
+        self.tokens_updated = now
+
+        if self.tokens < 1:
+            return False
+
+        self.tokens -= 1
+        return True
+
+    @web.middleware
+    async def inject(self, request: web.Request, handler):
+        self.stats['requests'] += 1
+
+        resp = await self.handle_injected(request, handler)
+
+        self.stats[resp.status] += 1
+        return resp
+
+    async def handle_injected(self, request: web.Request, handler):
+        if self.config.rate_limit > 0 and not self.take_token():
+            resp = self.error_response(429, "rate limited")
+            resp.headers["Retry-After"] = "1"
+            return resp
+
+        if self.config.latency > 0 or self.config.latency_jitter > 0:
+            await asyncio.sleep(self.config.latency +
+                                self.rng.uniform(0, self.config.latency_jitter))
+
+        if self.config.error_rate > 0 and self.rng.random() < self.config.error_rate:
+            return self.error_response(self.config.error_status, "injected error")
+
+        if len(self.config.userpwd) > 0:
+            expected = "Basic " + \
+                base64.b64encode(self.config.userpwd.encode('utf-8')).decode('utf-8')
+
+            if request.headers.get("Authorization", "").strip() != expected:
+                return self.error_response(401, "unauthorized")
+
+        try:
+            return await handler(request)
+        except web.HTTPException as e:
+            return self.error_response(e.status, e.reason)
+
+    def check_cid(self, request: web.Request):
+        if request.match_info['cid'] != self.cid:
+            raise web.HTTPNotFound()
+
+    async def handle_contests(self, request: web.Request):
+        return await self.send(request, self.json_response_body([self.contest]))
+
+    async def handle_contest(self, request: web.Request):
+        self.check_cid(request)
+        return await self.send(request, self.get_body(''))
+
+    async def handle_endpoint(self, request: web.Request):
+        self.check_cid(request)
+
+        endpoint = request.match_info['endpoint']
+        if endpoint not in self.data:
+            raise web.HTTPNotFound()
+
+        return await self.send(request, self.get_body(endpoint))
+
+    async def handle_item(self, request: web.Request):
+        self.check_cid(request)
+
+        endpoint = request.match_info['endpoint']
+        if endpoint not in self.data or not isinstance(self.data[endpoint], list):
+            raise web.HTTPNotFound()
+
+        for item in self.data[endpoint]:
+            if str(item.get('id')) == request.match_info['id']:
+                return await self.send(request, self.json_response_body(item))
+
+        raise web.HTTPNotFound()
+
+    async def handle_runs(self, request: web.Request):
+        self.check_cid(request)
+
+        start = 0
+        if 'first_id' in request.query:
+            start = bisect.bisect_left(
+                self.run_ids, int(request.query['first_id']))
+
+        end = len(self.runs)
+        if 'limit' in request.query:
+            end = min(end, start + int(request.query['limit']))
+
+        return await self.send(request, self.json_response_body(self.runs[start:end]))
+
+    def get_source(self, submission_id: str):
+        if submission_id in self.sources:
+            return self.sources[submission_id]
+
+        for submission in self.data['submissions']:
+            if submission['id'] == submission_id:
+                extension = submission['language_id']
+                for language in self.data['languages']:
+                    if language['id'] == submission['language_id'] and len(language['extensions']) > 0:
+                        extension = language['extensions'][0]
+
+                return "main.{}".format(extension), "// submission {}\n".format(submission_id).encode('utf-8')
+
+        raise web.HTTPNotFound()
+
+    async def handle_submission_files(self, request: web.Request):
+        self.check_cid(request)
+
+        submission_id = request.match_info['id']
+
+        file_path = os.path.join(self.submissions_dir, submission_id, "files.zip")
+        if os.path.exists(file_path):
+            with open(file_path, 'rb') as f:
+                return await self.send(request, Body(f.read()), "application/zip")
+
+        filename, source = self.get_source(submission_id)
+
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w') as z:
+            z.writestr(filename, source)
+
+        return await self.send(request, Body(buf.getvalue()), "application/zip")
+
+    async def handle_submission_source_code(self, request: web.Request):
+        self.check_cid(request)
+
+        submission_id = request.match_info['id']
+
+        file_path = os.path.join(
+            self.submissions_dir, submission_id, "source-code.json")
+        if os.path.exists(file_path):
+            with open(file_path, 'rb') as f:
+                return await self.send(request, Body(f.read()))
+
+        filename, source = self.get_source(submission_id)
+
+        return await self.send(request, self.json_response_body([{
+            "id": submission_id,
+            "submission_id": submission_id,
+            "filename": filename,
+            "source": base64.b64encode(source).decode('utf-8'),
+        }]))
+
+    async def handle_image(self, request: web.Request):
+        self.check_cid(request)
+
+        # The same layout as `Dump.dump_images`
+        file_path = os.path.join(self.images_dir, request.path[len(
+            self.prefix + "/api/v4/"):])
+
+        if os.path.isfile(file_path):
+            with open(file_path, 'rb') as f:
+                return await self.send(request, Body(f.read()), "image/png")
+
+        return await self.send(request, Body(kPlaceholderImage), "image/png")
+
+    async def handle_event_feed(self, request: web.Request):
+        self.check_cid(request)
+
+        start = 0
+        since = request.query.get('since_token') or request.query.get('since_id')
+        if since is not None:
+            if since not in self.event_index:
+                raise web.HTTPBadRequest(reason="unknown since_token")
+
+            start = self.event_index[since] + 1
+
+        if request.query.get('stream', 'true').lower() in ['false', '0']:
+            return await self.send(request, Body(b''.join(self.events[start:])), "application/x-ndjson")
+
+        resp = web.StreamResponse()
+        resp.content_type = "application/x-ndjson"
+        await resp.prepare(request)
+
+        try:
+            while True:
+                while start < len(self.events):
+                    await resp.write(self.events[start])
+                    start += 1
+
+                async with self.event_cond:
+                    try:
+                        await asyncio.wait_for(self.event_cond.wait(), self.config.keep_alive_interval)
+                    except asyncio.TimeoutError:
+                        await resp.write(b'\n')
+        except ConnectionResetError:
+            # The client went away
+            return resp
+
+    def find_by_keys(self, endpoint, value, keys):
+        for item in self.data[endpoint]:
+            for key in keys:
+                value_of_item = item.get(key)
+
+                if isinstance(value_of_item, list):
+                    if value in value_of_item:
+                        return item
+                elif value_of_item is not None and str(value_of_item) == value:
+                    return item
+
+        return None
+
+    async def read_submission(self, request: web.Request):
+        if request.content_type == "application/json":
+            body = await request.json()
+
+            files = []
+            for f in body.get('files', []):
+                with zipfile.ZipFile(io.BytesIO(base64.b64decode(f['data']))) as z:
+                    for name in z.namelist():
+                        files.append((name, z.read(name)))
+
+            return (body.get('problem_id') or body.get('problem'),
+                    body.get('language_id') or body.get('language'),
+                    body.get('team_id'), files)
+
+        form = await request.post()
+
+        files = []
+        for key in ['code[]', 'code']:
+            for f in form.getall(key, []):
+                if isinstance(f, web.FileField):
+                    files.append((f.filename, f.file.read()))
+
+        return (form.get('problem_id') or form.get('problem'),
+                form.get('language_id') or form.get('language'),
+                form.get('team_id'), files)
+
+    async def handle_post_submission(self, request: web.Request):
+        self.check_cid(request)
+
+        problem_id, language_id, team_id, files = await self.read_submission(request)
+
+        problem = self.find_by_keys('problems', str(problem_id), [
+                                    'id', 'label', 'short_name', 'externalid'])
+        if problem is None:
+            return self.error_response(400, "problem not found: {}".format(problem_id))
+
+        language = self.find_by_keys('languages', str(language_id), [
+                                     'id', 'extensions'])
+        if language is None:
+            return self.error_response(400, "language not found: {}".format(language_id))
+
+        if team_id is None:
+            team_id = self.config.submit_team_id or self.data['teams'][0]['id']
+
+        if len(files) == 0:
+            return self.error_response(400, "no files")
+
+        submission_id = str(max([int(s['id']) for s in self.data['submissions']
+                                 if str(s['id']).isdigit()], default=0) + 1)
+
+        submission = {
+            "language_id": language['id'],
+            "time": get_time_string(),
+            "contest_time": get_contest_time_string(self.get_contest_seconds()),
+            "team_id": str(team_id),
+            "problem_id": problem['id'],
+            "id": submission_id,
+            "external_id": None,
+            "entry_point": None,
+            "files": [{"href": "contests/{}/submissions/{}/files".format(self.cid, submission_id),
+                       "mime": "application/zip"}],
+        }
+
+        self.sources[submission_id] = files[0]
+        self.data['submissions'].append(submission)
+        self.posted_nums += 1
+        self.invalidate('submissions', 'scoreboard')
+        self.add_event('submissions', submission_id, submission)
+
+        task = asyncio.ensure_future(self.judge(submission))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+        return web.json_response(submission)
+
+    async def judge(self, submission):
+        await asyncio.sleep(self.config.judge_delay)
+
+        judgement_id = str(max([int(j['id']) for j in self.data['judgements']
+                                if str(j['id']).isdigit()], default=0) + 1)
+
+        judgement = {
+            "max_run_time": None,
+            "start_time": get_time_string(),
+            "start_contest_time": get_contest_time_string(self.get_contest_seconds()),
+            "end_time": None,
+            "end_contest_time": None,
+            "submission_id": submission['id'],
+            "id": judgement_id,
+            "valid": True,
+            "judgement_type_id": None,
+        }
+
+        self.data['judgements'].append(judgement)
+        self.invalidate('judgements', 'scoreboard')
+        self.add_event('judgements', judgement_id, dict(judgement))
+
+        await asyncio.sleep(self.config.judge_time)
+
+        judgement.update({
+            "max_run_time": round(self.rng.uniform(0, 1), 3),
+            "end_time": get_time_string(),
+            "end_contest_time": get_contest_time_string(self.get_contest_seconds()),
+            "judgement_type_id": self.rng.choices(self.verdicts, self.verdict_weights)[0],
+        })
+
+        self.add_judgement_runs(judgement)
+        self.invalidate('judgements', 'scoreboard')
+        self.add_event('judgements', judgement_id, dict(judgement), op='update')
+
+    async def handle_public(self, request: web.Request):
+        return await self.send(request, Body(self.render_public_scoreboard().encode('utf-8')),
+                               "text/html")
+
+    def render_public_scoreboard(self):
+        # Shaped like the DOMjudge public scoreboard, enough for `board-cache`
+        prefix = self.prefix + "/"
+
+        teams = {t['id']: t for t in self.data['teams']}
+        problems = self.data['problems']
+
+        html = ['''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <title>{name}</title>
+    <link rel="stylesheet" href="{prefix}style_domjudge.css">
+</head>
+<body>
+<nav class="navbar navbar-expand-md navbar-dark bg-dark fixed-top">
+    <a class="navbar-brand hidden-sm-down" href="{prefix}public">DOMjudge</a>
+    <div class="collapse navbar-collapse" id="menuDefault">
+        <ul class="navbar-nav mr-auto">
+            <li class="nav-item active"><a class="nav-link" href="{prefix}public">Scoreboard</a></li>
+        </ul>
+        <div class="dropdown">
+            <a class="btn btn-sm dropdown-toggle" href="#">{name}</a>
+        </div>
+        <a class="btn btn-info btn-sm" href="{prefix}login">Login</a>
+    </div>
+</nav>
+<table class="scoreboard center">
+    <thead>
+    <tr class="scoreheader">
+        <th>rank</th>
+        <th>team</th>
+        <th colspan="2">score</th>
+'''.format(name=self.contest['name'], prefix=prefix)]
+
+        for p in problems:
+            html.append('        <th title="problem {name}">{label}</th>\n'.format(
+                name=p['name'], label=p['label']))
+
+        html.append('''    </tr>
+    </thead>
+    <tbody>
+''')
+
+        for row in self.get_live_scoreboard()['rows'] if self.posted_nums > 0 else self.data['scoreboard'].get('rows', []):
+            team = teams.get(row['team_id'], {})
+
+            html.append('''    <tr id="team:{id}">
+        <td class="scorepl">{rank}</td>
+        <td class="scoretn">{name}</td>
+        <td class="scorenc">{solved}</td>
+        <td class="scorett">{total_time}</td>
+'''.format(id=row['team_id'], rank=row['rank'], name=team.get('display_name') or team.get('name', ''),
+                solved=row['score']['num_solved'], total_time=row['score']['total_time']))
+
+            for cell in row['problems']:
+                if cell['solved']:
+                    cls = "score_first" if cell['first_to_solve'] else "score_correct"
+                    text = "{}<span>{} tries</span>".format(
+                        cell['time'], cell['num_judged'])
+                elif cell['num_pending'] > 0:
+                    cls, text = "score_pending", "&nbsp;<span>{} tries</span>".format(
+                        cell['num_judged'] + cell['num_pending'])
+                elif cell['num_judged'] > 0:
+                    cls, text = "score_incorrect", "&nbsp;<span>{} tries</span>".format(
+                        cell['num_judged'])
+                else:
+                    cls, text = "score_cell", ""
+
+                html.append(
+                    '        <td class="score_cell"><div class="{}">{}</div></td>\n'.format(cls, text))
+
+            html.append('    </tr>\n')
+
+        html.append('''    </tbody>
+</table>
+<script>
+    var refreshUrl = '{prefix}public';
+</script>
+</body>
+</html>
+'''.format(prefix=prefix))
+
+        return ''.join(html)
+
+    def create_app(self):
+        app = web.Application(middlewares=[self.inject])
+
+        api = self.prefix + "/api/v4/contests"
+        contest = api + "/{cid}"
+
+        app.router.add_get(api, self.handle_contests)
+        app.router.add_get(contest, self.handle_contest)
+        app.router.add_get(contest + "/event-feed", self.handle_event_feed)
+        app.router.add_get(contest + "/runs", self.handle_runs)
+        app.router.add_get(contest + "/banner", self.handle_image)
+        app.router.add_post(contest + "/submissions",
+                            self.handle_post_submission)
+        app.router.add_get(contest + "/submissions/{id}/files",
+                           self.handle_submission_files)
+        app.router.add_get(contest + "/submissions/{id}/source-code",
+                           self.handle_submission_source_code)
+        app.router.add_get(
+            contest + "/{kind:organizations|teams}/{id}/{image:logo|photo}", self.handle_image)
+        app.router.add_get(contest + "/{endpoint}", self.handle_endpoint)
+        app.router.add_get(contest + "/{endpoint}/{id}", self.handle_item)
+        app.router.add_get(self.prefix + "/public", self.handle_public)
+
+        return app
+
+    async def start(self):
+        self.event_cond = asyncio.Condition()
+
+        # Streaming event feeds never end on their own
+        self.runner = web.AppRunner(
+            self.create_app(), access_log=None, shutdown_timeout=1)
+        await self.runner.setup()
+
+        site = web.TCPSite(self.runner, self.config.host, self.config.port)
+        await site.start()
+
+        self.port = self.runner.addresses[0][1]
+
+    async def close(self):
+        for task in list(self.tasks):
+            task.cancel()
+
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def get_base_url(self):
+        return "http://{}:{}{}/".format(self.config.host, self.port, self.prefix)
+
+    def start_in_thread(self):
+        # For tests and benchmarks living outside of an event loop
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        errors = []
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+
+            try:
+                self.loop.run_until_complete(self.start())
+            except Exception as e:
+                errors.append(e)
+                started.set()
+                return
+
+            started.set()
+            self.loop.run_forever()
+            self.loop.run_until_complete(self.close())
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        started.wait()
+
+        if len(errors) > 0:
+            raise errors[0]
+
+        return self
+
+    def stop(self):
+        if self.thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.thread = None
+
+
+def serve_mock_server(config: MockServerConfig, server: Optional[MockServer] = None):
+    server = server or MockServer(config)
+
+    async def serve():
+        await server.start()
+
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+
+    asyncio.run(serve())
@@ -0,0 +1,240 @@
+import bisect
+import math
+
+from . import utils
+
+
+def get_contest_seconds(t: str):
+    # Unlike `utils.get_seconds`, keep the sign for submissions before the start
+    sign = -1 if t.strip().startswith('-') else 1
+    h, m, s = t.strip().lstrip('-').split(":")
+    return sign * (int(h) * 3600 + int(m) * 60 + float(s))
+
+
+class ScoreboardCell:
+    __slots__ = ('submissions', 'num_judged', 'num_pending',
+                 'solved', 'time', 'solved_seconds')
+
+    def __init__(self):
+        # [(contest seconds, submission id)], ordered by submission time
+        self.submissions = []
+
+        self.num_judged = 0
+        self.num_pending = 0
+        self.solved = False
+        self.time = None
+        self.solved_seconds = None
+
+
+class ScoreboardRow:
+    __slots__ = ('team_id', 'name', 'sortorder', 'cells',
+                 'num_solved', 'total_time', 'sort_key')
+
+    def __init__(self, team_id, name, sortorder, problem_nums):
+        self.team_id = team_id
+        self.name = name
+        self.sortorder = sortorder
+        self.cells = [ScoreboardCell() for _ in range(problem_nums)]
+
+        self.num_solved = 0
+        self.total_time = 0
+        self.sort_key = None
+
+
+class Scoreboard:
+    def __init__(self, contest, problems, groups, teams, judgement_types,
+                 frozen=False, is_observers=None):
+        self.penalty_time = contest.get('penalty_time', 20)
+        self.duration = utils.get_seconds(contest['duration'])
+        self.freeze_seconds = self.duration - \
+            utils.get_seconds(contest['scoreboard_freeze_duration'])
+
+        # The public scoreboard shows everything submitted
+        # after the freeze as pending
+        self.frozen = frozen
+
+        self.problems = list(problems)
+        self.problem_index = {p['id']: i for i, p in enumerate(self.problems)}
+
+        self.judgement_types = {j['id']: j for j in judgement_types}
+
+        groups_dict = {g['id']: g for g in groups}
+
+        self.rows = {}
+        for team in teams:
+            team_groups = [groups_dict[g]
+                           for g in team['group_ids'] if g in groups_dict]
+
+            if any(g['hidden'] for g in team_groups):
+                continue
+
+            if is_observers is not None:
+                if is_observers(team):
+                    continue
+            elif any(g['name'] == 'Observers' for g in team_groups):
+                continue
+
+            name = team.get('display_name') or team['name']
+            sortorder = min([g['sortorder']
+                            for g in team_groups], default=0)
+
+            self.rows[team['id']] = ScoreboardRow(
+                team['id'], name, sortorder, len(self.problems))
+
+        # submission id -> (team id, problem index, contest seconds)
+        self.submissions = {}
+
+        # submission id -> judgement type id, `None` while judging
+        self.verdicts = {}
+
+        # Rows ordered by their sort key, only the changed row is moved on updates
+        self.sorted_keys = []
+        for row in self.rows.values():
+            self.update_sort_key(row)
+
+    def add_submission(self, submission):
+        team_id = submission['team_id']
+        if team_id not in self.rows or submission['problem_id'] not in self.problem_index:
+            return
+
+        seconds = get_contest_seconds(submission['contest_time'])
+
+        # Submissions before the start and after the end do not count
+        if seconds < 0 or seconds >= self.duration:
+            return
+
+        problem_index = self.problem_index[submission['problem_id']]
+        self.submissions[submission['id']] = (
+            team_id, problem_index, seconds)
+
+        cell = self.rows[team_id].cells[problem_index]
+        bisect.insort(cell.submissions, (seconds, submission['id']))
+
+        self.update_cell(team_id, problem_index)
+
+    def add_judgement(self, judgement):
+        if not judgement.get('valid', True):
+            return
+
+        submission_id = judgement['submission_id']
+        self.verdicts[submission_id] = judgement['judgement_type_id']
+
+        if submission_id in self.submissions:
+            team_id, problem_index, _ = self.submissions[submission_id]
+            self.update_cell(team_id, problem_index)
+
+    def update_cell(self, team_id, problem_index):
+        row = self.rows[team_id]
+        cell = row.cells[problem_index]
+
+        cell.num_judged = 0
+        cell.num_pending = 0
+        cell.solved = False
+        cell.time = None
+        cell.solved_seconds = None
+
+        for seconds, submission_id in cell.submissions:
+            verdict = self.verdicts.get(submission_id)
+
+            if verdict is None or (self.frozen and seconds >= self.freeze_seconds):
+                cell.num_pending += 1
+                continue
+
+            judgement_type = self.judgement_types.get(verdict, {})
+
+            if judgement_type.get('solved', False):
+                cell.num_judged += 1
+                cell.solved = True
+                cell.time = math.floor(seconds) // 60
+                cell.solved_seconds = seconds
+                break
+
+            # Such as compiler errors, which cost no penalty
+            if not judgement_type.get('penalty', True):
+                continue
+
+            cell.num_judged += 1
+
+        row.num_solved = 0
+        row.total_time = 0
+        for c in row.cells:
+            if c.solved:
+                row.num_solved += 1
+                row.total_time += c.time + \
+                    self.penalty_time * (c.num_judged - 1)
+
+        self.update_sort_key(row)
+
+    def get_rank_key(self, row):
+        solve_times = sorted(
+            [c.time for c in row.cells if c.solved], reverse=True)
+        return (row.sortorder, -row.num_solved, row.total_time, solve_times)
+
+    def update_sort_key(self, row):
+        if row.sort_key is not None:
+            index = bisect.bisect_left(self.sorted_keys, row.sort_key)
+            del self.sorted_keys[index]
+
+        row.sort_key = (self.get_rank_key(row), row.name, row.team_id)
+        bisect.insort(self.sorted_keys, row.sort_key)
+
+    def get_first_to_solve(self):
+        first_to_solve = [(None, set()) for _ in self.problems]
+
+        for row in self.rows.values():
+            for i, c in enumerate(row.cells):
+                if not c.solved:
+                    continue
+
+                seconds, team_ids = first_to_solve[i]
+                if seconds is None or c.solved_seconds < seconds:
+                    first_to_solve[i] = (c.solved_seconds, {row.team_id})
+                elif c.solved_seconds == seconds:
+                    team_ids.add(row.team_id)
+
+        return [team_ids for _, team_ids in first_to_solve]
+
+    def get_rows(self):
+        first_to_solve = self.get_first_to_solve()
+
+        rows = []
+        rank = 0
+        prev_rank_key = None
+
+        for i, (rank_key, _, team_id) in enumerate(self.sorted_keys):
+            if rank_key != prev_rank_key:
+                rank = i + 1
+                prev_rank_key = rank_key
+
+            row = self.rows[team_id]
+
+            problems = []
+            for j, (p, c) in enumerate(zip(self.problems, row.cells)):
+                item = {
+                    "label": p['label'],
+                    "problem_id": p['id'],
+                    "num_judged": c.num_judged,
+                    "num_pending": c.num_pending,
+                    "solved": c.solved,
+                    "first_to_solve": team_id in first_to_solve[j],
+                }
+
+                if c.solved:
+                    item["time"] = c.time
+
+                problems.append(item)
+
+            rows.append({
+                "rank": rank,
+                "team_id": team_id,
+                "score": {
+                    "num_solved": row.num_solved,
+                    "total_time": row.total_time,
+                },
+                "problems": problems,
+            })
+
+        return rows
+
+    def get_scoreboard(self):
+        return {"rows": self.get_rows()}
@@ -1,4 +1,6 @@
+import hashlib
 import json
+import math
 import os
 
 
@@ -6,6 +8,16 @@ def object_to_json_string(obj):
     return json.dumps(obj, sort_keys=False, separators=(',', ':'), ensure_ascii=False)
 
 
+def file_sha256(path: str):
+    sha256 = hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
 def ensure_dir(_path: str):
     if not os.path.exists(_path):
         os.makedirs(_path)
@@ -19,3 +31,18 @@ def url_join(url: str, *args):
         url = "{}/{}".format(url, arg)
 
     return url
+
+
+def get_seconds(t: str):
+    h, m, s = t.strip().split(":")
+    return math.floor(int(h) * 3600 + int(m) * 60 + math.floor(float(s)))
+
+
+def get_submission_timestamp(t: str, score_in_seconds=False):
+    h, m, s = t.strip().split(":")
+    timestamp = int(h) * 3600 + int(m) * 60
+
+    if score_in_seconds:
+        timestamp += math.floor(float(s))
+
+    return timestamp
@@ -0,0 +1,64 @@
+import os
+
+from requests_toolbelt import MultipartEncoder
+
+
+class CorpusItem:
+    # Built once and only read afterwards, so every worker and every round shares it
+    __slots__ = ('pid', 'filepath', 'language', 'body', 'content_type', 'headers')
+
+    def __init__(self, pid, filepath, language, body: bytes, content_type, headers=None):
+        self.pid = pid
+        self.filepath = filepath
+        self.language = language
+        self.body = body
+        self.content_type = content_type
+
+        # Sent on top of the common headers, such as the credentials of a team
+        self.headers = headers
+
+
+def buildCorpusItem(pid, filepath, language, content: bytes, files=None, entry_point=None, headers=None):
+    # `files` lists (filename, content) of a submission with more than one file
+    if files is None:
+        files = [(filepath, content)]
+
+    fields = [('problem', str(pid)), ('language', language)]
+
+    if entry_point is not None:
+        fields.append(('entry_point', entry_point))
+
+    for filename, data in files:
+        fields.append(('code[]', (filename, data, 'application/octet-stream')))
+
+    m = MultipartEncoder(fields=fields)
+
+    # The whole body as bytes, it can be sent any number of times
+    return CorpusItem(pid, filepath, language, m.to_string(), m.content_type, headers)
+
+
+def loadCorpus(test_data_path, exclude_pid, getLanguage, logger):
+    items = []
+    size = 0
+
+    for dir in sorted(os.listdir(test_data_path)):
+        if dir in exclude_pid:
+            continue
+
+        for file in sorted(os.listdir(os.path.join(test_data_path, dir))):
+            filepath = os.path.join(test_data_path, dir, file)
+
+            language = getLanguage(filepath)
+            if language == 'unknown':
+                logger.error("unknown language. [filepath={}]".format(filepath))
+                continue
+
+            with open(filepath, 'rb') as f:
+                item = buildCorpusItem(dir, filepath, language, f.read())
+
+            items.append(item)
+            size += len(item.body)
+
+    logger.info("corpus loaded. [files={}] [size={}]".format(len(items), size))
+
+    return items
@@ -0,0 +1,302 @@
+import asyncio
+import collections
+import json
+import math
+import random
+import time
+
+import aiohttp
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank, `sorted_values` must be sorted
+    if len(sorted_values) == 0:
+        return None
+
+    k = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+class SubmitResult:
+    __slots__ = ('item', 'scheduled', 'dispatched', 'started',
+                 'finished', 'status', 'attempts', 'errors', 'response')
+
+    def __init__(self, item, scheduled):
+        self.item = item
+        self.scheduled = scheduled
+        self.dispatched = None
+        self.started = None
+        self.finished = None
+        self.status = None
+        self.attempts = 0
+        self.errors = []
+        self.response = None
+
+    def ok(self):
+        return self.status == '200'
+
+    def latency(self):
+        # From the moment it was due, so a saturated client does not hide the backlog
+        return self.finished - self.scheduled
+
+    def queueing(self):
+        return self.started - self.scheduled
+
+    def drift(self):
+        # How late the scheduler itself was
+        return self.dispatched - self.scheduled
+
+
+class LoadGenerator:
+    def __init__(self, config, logger, url, headers, tracker=None):
+        self.config = config
+        self.logger = logger
+        self.url = url
+
+        # Follows the accepted submissions until they have a verdict
+        self.tracker = tracker
+
+        # `Content-Type` comes with every corpus item, connections are pooled
+        self.headers = {k: v for k, v in headers.items()
+                        if k.lower() not in ['content-type', 'connection']}
+
+        self.results = []
+        self.series = []
+
+        self.in_flight_nums = 0
+        self.finished_nums = 0
+        self.ok_nums = 0
+
+    def getArrivalOffsets(self, nums):
+        rate = self.config.rate
+        offsets = []
+
+        if self.config.arrival == 'poisson':
+            rnd = random.Random(0)
+            t = 0
+            for _ in range(nums):
+                offsets.append(t)
+                t += rnd.expovariate(rate)
+        else:
+            offsets = [i / rate for i in range(nums)]
+
+        return offsets
+
+    async def submit(self, session, result: SubmitResult):
+        item = result.item
+        headers = {**self.headers, 'Content-Type': item.content_type,
+                   **(item.headers or {})}
+
+        for _ in range(self.config.retry_nums):
+            result.attempts += 1
+
+            try:
+                # The prebuilt body is plain bytes, every attempt sends it again as is
+                async with session.post(self.url, headers=headers, data=item.body) as resp:
+                    result.status = str(resp.status)
+                    result.response = await resp.read()
+
+                    if resp.status < 500 and resp.status != 429:
+                        break
+            except asyncio.TimeoutError:
+                result.status = 'timeout'
+            except aiohttp.ClientError as e:
+                result.status = type(e).__name__
+
+            if not result.ok():
+                result.errors.append(result.status)
+
+        if not result.ok():
+            self.logger.error("submit failed. [filepath={}] [status={}] [attempts={}]".format(
+                item.filepath, result.status, result.attempts))
+
+    async def worker(self, session, queue: asyncio.Queue):
+        while True:
+            result = await queue.get()
+            if result is None:
+                return
+
+            result.started = time.monotonic()
+            self.in_flight_nums += 1
+
+            await self.submit(session, result)
+
+            result.finished = time.monotonic()
+            self.in_flight_nums -= 1
+            self.finished_nums += 1
+            if result.ok():
+                self.ok_nums += 1
+
+                if self.tracker is not None:
+                    self.tracker.track(result)
+
+    async def reportProgress(self, start, queue: asyncio.Queue):
+        last_finished = 0
+
+        while True:
+            await asyncio.sleep(self.config.report_interval)
+
+            elapsed = time.monotonic() - start
+
+            point = {
+                "elapsed": round(elapsed, 3),
+                "scheduled": len(self.results),
+                "finished": self.finished_nums,
+                "ok": self.ok_nums,
+                "failed": self.finished_nums - self.ok_nums,
+                "in_flight": self.in_flight_nums,
+                "waiting": queue.qsize(),
+                "throughput": (self.finished_nums - last_finished) / self.config.report_interval,
+            }
+
+            if self.tracker is not None:
+                point["judged"] = len(self.tracker.tracked) - \
+                    len(self.tracker.pending)
+
+            last_finished = self.finished_nums
+            self.series.append(point)
+
+            self.logger.info("progress. [elapsed={:.1f}s] [finished={}] [ok={}] [failed={}] [in_flight={}] [waiting={}] [throughput={:.1f}/s]{}".format(
+                elapsed, point["finished"], point["ok"], point["failed"], point["in_flight"], point["waiting"], point["throughput"],
+                " [judged={}]".format(point["judged"]) if "judged" in point else ""))
+
+    async def run(self, items, offsets=None):
+        # Open-loop, submissions are queued on schedule no matter how slow the server answers,
+        # `concurrency` workers take them off the queue and the wait counts as latency
+        connector = aiohttp.TCPConnector(limit=self.config.pool_size)
+        timeout = aiohttp.ClientTimeout(total=self.config.timeout)
+        queue = asyncio.Queue()
+
+        # Seconds since the start of every item, sorted
+        if offsets is None:
+            offsets = self.getArrivalOffsets(len(items))
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            workers = [asyncio.ensure_future(self.worker(session, queue))
+                       for _ in range(self.config.concurrency)]
+
+            if self.tracker is not None:
+                self.tracker.startTracking(session)
+
+            start = time.monotonic()
+            reporter = asyncio.ensure_future(self.reportProgress(start, queue))
+
+            try:
+                for item, offset in zip(items, offsets):
+                    delay = start + offset - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                    result = SubmitResult(item, start + offset)
+                    result.dispatched = time.monotonic()
+                    self.results.append(result)
+                    queue.put_nowait(result)
+
+                for _ in workers:
+                    queue.put_nowait(None)
+
+                await asyncio.gather(*workers)
+                elapsed = time.monotonic() - start
+
+                if self.tracker is not None:
+                    await self.tracker.wait()
+            finally:
+                reporter.cancel()
+
+                for w in workers:
+                    w.cancel()
+
+        report = self.getReport(elapsed)
+
+        if self.tracker is not None:
+            report["judging"] = self.tracker.getReport()
+
+        return report
+
+    def getReport(self, elapsed):
+        ok_results = [r for r in self.results if r.ok()]
+        latencies = sorted(r.latency() for r in ok_results)
+        queueing = sorted(r.queueing() for r in self.results)
+        drift = sorted(r.drift() for r in self.results)
+
+        errors = collections.Counter(
+            r.status for r in self.results if not r.ok())
+
+        # Including the ones a retry got over
+        attempt_errors = collections.Counter(
+            e for r in self.results for e in r.errors)
+
+        return {
+            "target_rate": self.config.rate,
+            "arrival": self.config.arrival,
+            "concurrency": self.config.concurrency,
+            "pool_size": self.config.pool_size,
+            "total": len(self.results),
+            "ok": len(ok_results),
+            "failed": len(self.results) - len(ok_results),
+            "retries": sum(r.attempts - 1 for r in self.results),
+            "elapsed": elapsed,
+            "achieved_rate": len(ok_results) / elapsed if elapsed > 0 else 0,
+            "latency": {
+                "p50": percentile(latencies, 50),
+                "p90": percentile(latencies, 90),
+                "p99": percentile(latencies, 99),
+                "max": latencies[-1] if len(latencies) > 0 else None,
+            },
+            "queueing": {
+                "p50": percentile(queueing, 50),
+                "p99": percentile(queueing, 99),
+            },
+            "drift": {
+                "p50": percentile(drift, 50),
+                "p99": percentile(drift, 99),
+                "max": drift[-1] if len(drift) > 0 else None,
+            },
+            "errors": dict(errors),
+            "attempt_errors": dict(attempt_errors),
+            "series": self.series,
+        }
+
+
+def formatSeconds(seconds):
+    if seconds is None:
+        return "-"
+
+    return "{:.0f}ms".format(seconds * 1000)
+
+
+def logReport(logger, report):
+    logger.info("stress test done. [total={}] [ok={}] [failed={}] [retries={}] [elapsed={:.1f}s] [target_rate={}/s] [achieved_rate={:.1f}/s]".format(
+        report["total"], report["ok"], report["failed"], report["retries"], report["elapsed"],
+        report["target_rate"], report["achieved_rate"]))
+
+    logger.info("submit latency. [p50={}] [p90={}] [p99={}] [max={}] [queueing_p50={}] [queueing_p99={}]".format(
+        *[formatSeconds(report["latency"][k]) for k in ["p50", "p90", "p99", "max"]],
+        *[formatSeconds(report["queueing"][k]) for k in ["p50", "p99"]]))
+
+    logger.info("scheduler drift. [p50={}] [p99={}] [max={}]".format(
+        *[formatSeconds(report["drift"][k]) for k in ["p50", "p99", "max"]]))
+
+    judging = report.get("judging")
+    if judging is not None:
+        logger.info("judging. [tracked={}] [judged={}] [pending={}] [untracked={}]".format(
+            judging["tracked"], judging["judged"], judging["pending"], judging["untracked"]))
+
+        for key in ["queue_wait", "judge_time", "end_to_end"]:
+            logger.info("{}. [p50={}] [p90={}] [p99={}] [max={}]".format(
+                key, *[formatSeconds(judging[key][k]) for k in ["p50", "p90", "p99", "max"]]))
+
+        for point in judging["verdicts_per_minute"]:
+            logger.info("verdicts per minute. [minute={}] [total={}] {}".format(
+                point["minute"], point["total"], " ".join("[{}={}]".format(k, v)
+                                                          for k, v in sorted(point["verdicts"].items()))))
+
+    for key in ["errors", "attempt_errors"]:
+        if len(report[key]) > 0:
+            logger.info("{}. {}".format(key, " ".join("[{}={}]".format(k, v)
+                        for k, v in sorted(report[key].items()))))
+
+
+def saveReport(path, report):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
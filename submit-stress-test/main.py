@@ -1,13 +1,22 @@
 #! /usr/bin/env python3
 
+import asyncio
 import base64
 import yaml
 import logging
 import os
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
-from requests_toolbelt import MultipartEncoder
+
+import loadgen
+import replay
+from corpus import loadCorpus
+from tracker import JudgeTracker
+
+thread_local = threading.local()
 
 
 def urlJoin(url, *args):
@@ -53,6 +62,75 @@ class Config:
         self.exclude_pid = self.getConfigWithDefaultCalue(
             config_dict, 'exclude_pid', [])
 
+        # `sync` submits one file after another,
+        # `async` submits at `rate` per second no matter how fast the server answers
+        self.mode = self.getConfigWithDefaultCalue(config_dict, 'mode', 'sync')
+
+        self.rate = self.getConfigWithDefaultCalue(config_dict, 'rate', 10)
+
+        # `uniform` or `poisson` arrivals
+        self.arrival = self.getConfigWithDefaultCalue(
+            config_dict, 'arrival', 'uniform')
+
+        self.concurrency = self.getConfigWithDefaultCalue(
+            config_dict, 'concurrency', 64)
+
+        self.pool_size = self.getConfigWithDefaultCalue(
+            config_dict, 'pool_size', self.concurrency)
+
+        self.timeout = self.getConfigWithDefaultCalue(config_dict, 'timeout', 30)
+
+        self.retry_nums = self.getConfigWithDefaultCalue(
+            config_dict, 'retry_nums', 3)
+
+        # `poll` fetches the new judgement events every `poll_interval` seconds,
+        # `event-feed` follows the event feed, until every accepted submission has a verdict,
+        # only in `async` mode, empty means no tracking
+        self.track_judgements = self.getConfigWithDefaultCalue(
+            config_dict, 'track_judgements', '')
+
+        self.poll_interval = self.getConfigWithDefaultCalue(
+            config_dict, 'poll_interval', 1)
+
+        # Seconds to wait for the last verdicts after the last submission
+        self.track_timeout = self.getConfigWithDefaultCalue(
+            config_dict, 'track_timeout', 300)
+
+        # `replay` mode re-submits the submissions of a directory saved by `cmd/dump`
+        # on their original `contest_time`, `speedup` times faster
+        self.replay_dir = self.getConfigWithDefaultCalue(
+            config_dict, 'replay_dir', '')
+
+        self.speedup = self.getConfigWithDefaultCalue(config_dict, 'speedup', 10)
+
+        # Contest seconds of the replayed window, `None` means until the end
+        self.replay_start = self.getConfigWithDefaultCalue(
+            config_dict, 'replay_start', 0)
+
+        self.replay_end = self.getConfigWithDefaultCalue(
+            config_dict, 'replay_end', None)
+
+        # The problem field sent for a replayed submission: `id`, `label` or `externalid`
+        self.replay_problem_key = self.getConfigWithDefaultCalue(
+            config_dict, 'replay_problem_key', 'id')
+
+        # `user:password` of the teams submitting the replay,
+        # every original team is mapped to one of them, empty means `userpwd`
+        self.team_credentials = self.getConfigWithDefaultCalue(
+            config_dict, 'team_credentials', [])
+
+        self.team_credentials_path = self.getConfigWithDefaultCalue(
+            config_dict, 'team_credentials_path', '')
+
+        # Threads submitting in `sync` mode
+        self.workers = self.getConfigWithDefaultCalue(config_dict, 'workers', 1)
+
+        self.report_interval = self.getConfigWithDefaultCalue(
+            config_dict, 'report_interval', 1)
+
+        self.report_path = self.getConfigWithDefaultCalue(
+            config_dict, 'report_path', '')
+
 
 def loadConfig():
     global default_config
@@ -95,53 +173,97 @@ def getLanguageByFileExtension(filepath):
     return 'unknown'
 
 
-def submit(pid, filepath):
+def getSession():
+    # One pooled session per worker thread
+    if not hasattr(thread_local, 'session'):
+        thread_local.session = requests.Session()
+
+    return thread_local.session
+
+
+def submit(item):
     url = urlJoin(base_url, str(default_config.cid), 'submissions')
 
-    language = getLanguageByFileExtension(filepath)
+    item_headers = {**headers, 'Content-Type': item.content_type}
+
+    res = None
+    for i in range(default_config.retry_nums):
+        try:
+            # The prebuilt body is plain bytes, every attempt sends it again as is
+            res = getSession().post(
+                url=url, headers=item_headers, data=item.body, timeout=default_config.timeout)
+            if res.status_code < 500:
+                break
+        except Exception as e:
+            logger.error(e)
+
+    if res is None or res.status_code != 200:
+        logger.error("submit failed. [filepath={}] [status_code={}]".format(
+            item.filepath, None if res is None else res.status_code))
+    else:
+        logger.info("submit success. [filepath={}]".format(item.filepath))
+
+
+def stress(items):
+    if default_config.workers <= 1:
+        for item in items:
+            submit(item)
 
-    if language == 'unknown':
-        logger.error("unknown language. [filepath={}]".format(filepath))
         return
 
-    with open(filepath, 'rb') as f:
-        payload = {
-            'problem': str(pid),
-            'language': getLanguageByFileExtension(filepath),
-            'code[]': (filepath, f.read(), 'application/octet-stream'),
-        }
+    with ThreadPoolExecutor(max_workers=default_config.workers) as executor:
+        list(executor.map(submit, items))
 
-        m = MultipartEncoder(fields=payload)
 
-        headers['Content-Type'] = m.content_type
+def runLoadGenerator(items, offsets=None):
+    tracker = None
+    if len(default_config.track_judgements) > 0:
+        tracker = JudgeTracker(default_config, logger, urlJoin(
+            base_url, str(default_config.cid)), headers)
 
-        for i in range(3):
-            try:
-                res = requests.post(
-                    url=url, headers=headers, data=m, timeout=5)
-                if res.status_code < 500:
-                    break
-            except Exception as e:
-                logger.error(e)
+    generator = loadgen.LoadGenerator(default_config, logger, urlJoin(
+        base_url, str(default_config.cid), 'submissions'), headers, tracker)
 
-        try:
-            if res.status_code != 200:
-                logger.error("submit failed. [filepath={}] [status_code={}]".format(
-                    filepath, res.status_code))
-            else:
-                logger.info("submit success. [filepath={}]".format(filepath))
-        except Exception as e:
-            logger.error(e)
+    report = asyncio.run(generator.run(items, offsets))
+
+    if offsets is not None:
+        report["target_rate"] = len(items) / max(offsets[-1], 1)
+        report["replay"] = replay.getReplaySeries(generator.results, offsets)
+
+    loadgen.logReport(logger, report)
+
+    for point in report.get("replay", []):
+        logger.info("replay per minute. [minute={}] [target={}] [sent={}]".format(
+            point["minute"], point["target"], point["sent"]))
+
+    if len(default_config.report_path) > 0:
+        loadgen.saveReport(default_config.report_path, report)
+        logger.info("report saved. [report_path={}]".format(
+            default_config.report_path))
 
 
-def stress():
-    for dir in os.listdir(default_config.test_data_path):
-        if dir in default_config.exclude_pid:
-            continue
+def asyncStress(corpus):
+    # Every round refers to the same prebuilt bodies
+    items = corpus * default_config.total
 
-        for file in os.listdir(os.path.join(default_config.test_data_path, dir)):
-            submit(dir, os.path.join(
-                default_config.test_data_path, dir, file))
+    logger.info("start an async stress test. [total={}] [rate={}/s] [concurrency={}]".format(
+        len(items), default_config.rate, default_config.concurrency))
+
+    runLoadGenerator(items)
+
+
+def replayStress():
+    items, offsets = replay.loadReplay(default_config, logger)
+
+    if len(items) == 0:
+        logger.error("nothing to replay. [replay_dir={}]".format(
+            default_config.replay_dir))
+        return
+
+    logger.info("start a replay. [total={}] [speedup={}x] [concurrency={}]".format(
+        len(items), default_config.speedup, default_config.concurrency))
+
+    runLoadGenerator(items, offsets)
 
 
 def main():
@@ -154,7 +276,6 @@ def main():
         'Authorization': 'Basic ' +
         base64.encodebytes(default_config.userpwd.encode(
             'utf-8')).decode('utf-8').strip(),
-        'Connection': 'close',
         'accept': 'application/json',
         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36',
     }
@@ -162,11 +283,23 @@ def main():
     base_url = urlJoin(default_config.base_url, 'api',
                        default_config.api_version, 'contests')
 
+    if default_config.mode == 'replay':
+        replayStress()
+        return
+
+    # Read, resolved and encoded once for all rounds
+    corpus = loadCorpus(default_config.test_data_path, default_config.exclude_pid,
+                        getLanguageByFileExtension, logger)
+
+    if default_config.mode == 'async':
+        asyncStress(corpus)
+        return
+
     for i in range(default_config.total):
         logger.info(
             "start a new round of stress test. [round number={}]".format(i))
 
-        stress()
+        stress(corpus)
 
 
 if __name__ == '__main__':
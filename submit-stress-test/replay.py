@@ -0,0 +1,135 @@
+import base64
+import collections
+import json
+import os
+import zipfile
+
+from corpus import buildCorpusItem
+
+
+def parseContestTime(t):
+    # `h:mm:ss.sss`, negative before the contest starts
+    sign = -1 if t.startswith('-') else 1
+    h, m, s = t.lstrip('-').split(':')
+    return sign * (int(h) * 3600 + int(m) * 60 + float(s))
+
+
+def loadJson(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def loadSourceFiles(submission_dir):
+    # The layout of `Dump.dump_source_code`
+    source_code_path = os.path.join(submission_dir, 'source-code.json')
+    if os.path.exists(source_code_path):
+        return [(s['filename'], base64.b64decode(s['source'])) for s in loadJson(source_code_path)]
+
+    files_path = os.path.join(submission_dir, 'files.zip')
+    if os.path.exists(files_path):
+        with zipfile.ZipFile(files_path) as z:
+            return [(name, z.read(name)) for name in z.namelist()]
+
+    return None
+
+
+def loadTeamCredentials(config):
+    credentials = list(config.team_credentials)
+
+    if len(config.team_credentials_path) > 0:
+        if not os.path.isfile(config.team_credentials_path):
+            raise RuntimeError("team credentials file not found. [team_credentials_path={}]".format(
+                config.team_credentials_path))
+
+        with open(config.team_credentials_path, 'r', encoding='utf-8') as f:
+            credentials.extend(line.strip()
+                               for line in f if len(line.strip()) > 0)
+
+    return credentials
+
+
+def getAuthorization(userpwd):
+    return 'Basic ' + base64.b64encode(userpwd.encode('utf-8')).decode('utf-8')
+
+
+def loadReplay(config, logger):
+    api_dir = os.path.join(config.replay_dir, 'domjudge', 'api')
+    submissions_dir = os.path.join(config.replay_dir, 'domjudge', 'submissions')
+
+    problems = {p['id']: p for p in loadJson(os.path.join(api_dir, 'problems.json'))}
+    submissions = loadJson(os.path.join(api_dir, 'submissions.json'))
+
+    credentials = loadTeamCredentials(config)
+
+    # Every original team keeps submitting with the same credentials
+    team_headers = {}
+
+    items = []
+    offsets = []
+    missing_nums = 0
+
+    replayed = []
+    for submission in submissions:
+        contest_seconds = parseContestTime(submission['contest_time'])
+
+        if contest_seconds < config.replay_start:
+            continue
+
+        if config.replay_end is not None and contest_seconds >= config.replay_end:
+            continue
+
+        replayed.append((contest_seconds, submission))
+
+    replayed.sort(key=lambda item: item[0])
+
+    for contest_seconds, submission in replayed:
+        files = loadSourceFiles(os.path.join(
+            submissions_dir, str(submission['id'])))
+
+        if files is None or len(files) == 0:
+            missing_nums += 1
+            continue
+
+        team_id = submission['team_id']
+        if team_id not in team_headers:
+            team_headers[team_id] = None
+
+            if len(credentials) > 0:
+                team_headers[team_id] = {'Authorization': getAuthorization(
+                    credentials[(len(team_headers) - 1) % len(credentials)])}
+
+        problem = problems.get(submission['problem_id'], {})
+        pid = problem.get(config.replay_problem_key) or submission['problem_id']
+
+        items.append(buildCorpusItem(pid, "submissions/{}".format(submission['id']), submission['language_id'], None,
+                                     files=files, entry_point=submission.get('entry_point'),
+                                     headers=team_headers[team_id]))
+        offsets.append((contest_seconds - config.replay_start) / config.speedup)
+
+    if missing_nums > 0:
+        logger.error("replayed submissions without source code are skipped. [missing={}]".format(
+            missing_nums))
+
+    logger.info("replay loaded. [submissions={}] [teams={}] [credentials={}] [speedup={}x] [duration={:.1f}s]".format(
+        len(items), len(team_headers), len(credentials), config.speedup, offsets[-1] if len(offsets) > 0 else 0))
+
+    return items, offsets
+
+
+def getReplaySeries(results, offsets):
+    # Submissions per minute, as scheduled and as actually sent
+    target = collections.Counter(int(offset // 60) for offset in offsets)
+
+    start = results[0].scheduled - offsets[0] if len(results) > 0 else 0
+    sent = collections.Counter(int((r.started - start) // 60)
+                               for r in results if r.started is not None)
+
+    series = []
+    for minute in range(max(list(target.keys()) + list(sent.keys()), default=-1) + 1):
+        series.append({
+            "minute": minute,
+            "target": target[minute],
+            "sent": sent[minute],
+        })
+
+    return series
@@ -0,0 +1,256 @@
+import asyncio
+import collections
+import datetime
+import json
+import re
+import time
+
+import aiohttp
+
+from loadgen import percentile
+
+kTokenPattern = re.compile(rb'"token":\s*"([^"]*)"')
+
+
+def parseTime(t):
+    if t is None:
+        return None
+
+    return datetime.datetime.fromisoformat(t).timestamp()
+
+
+def getDistribution(values):
+    values = sorted(values)
+
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": values[-1] if len(values) > 0 else None,
+    }
+
+
+class TrackedSubmission:
+    __slots__ = ('submission_id', 'time', 'sent',
+                 'start_time', 'end_time', 'verdict', 'observed')
+
+    def __init__(self, submission_id, time, sent):
+        self.submission_id = submission_id
+
+        # The server clock
+        self.time = time
+        self.start_time = None
+        self.end_time = None
+
+        # The client clock
+        self.sent = sent
+        self.observed = None
+
+        self.verdict = None
+
+    def queueWait(self):
+        return self.start_time - self.time
+
+    def judgeTime(self):
+        return self.end_time - self.start_time
+
+    def endToEnd(self):
+        return self.observed - self.sent
+
+
+class JudgeTracker:
+    # Follows the submissions posted by `LoadGenerator` until they have a verdict
+    def __init__(self, config, logger, contest_url, headers):
+        self.config = config
+        self.logger = logger
+        self.contest_url = contest_url
+        self.headers = {k: v for k, v in headers.items()
+                        if k.lower() not in ['content-type', 'connection']}
+
+        # submission id -> TrackedSubmission
+        self.tracked = {}
+        self.pending = set()
+
+        # submission id -> the first judgement with a verdict, or the first one seen,
+        # a judgement may show up before the POST that created its submission returns
+        self.judgements = {}
+
+        self.untracked_nums = 0
+        # Where the next request resumes, `since_token` or `since_id`
+        # for servers without tokens
+        self.last_token = None
+        self.last_id = None
+        self.start = None
+        self.task = None
+
+    def track(self, result):
+        try:
+            submission = json.loads(result.response)
+            submission_id = str(submission['id'])
+        except Exception:
+            self.untracked_nums += 1
+            return
+
+        tracked = TrackedSubmission(submission_id, parseTime(
+            submission.get('time')) or time.time(), result.started)
+
+        self.tracked[submission_id] = tracked
+        self.pending.add(submission_id)
+
+        if submission_id in self.judgements:
+            self.update(tracked, self.judgements[submission_id])
+
+    def onJudgement(self, judgement):
+        submission_id = str(judgement['submission_id'])
+
+        known = self.judgements.get(submission_id)
+        if known is not None and known.get('judgement_type_id') is not None:
+            return
+
+        self.judgements[submission_id] = judgement
+
+        if submission_id in self.tracked:
+            self.update(self.tracked[submission_id], judgement)
+
+    def update(self, tracked: TrackedSubmission, judgement):
+        if tracked.start_time is None:
+            tracked.start_time = parseTime(judgement.get('start_time'))
+
+        if judgement.get('judgement_type_id') is not None and tracked.verdict is None:
+            tracked.verdict = judgement['judgement_type_id']
+            tracked.end_time = parseTime(judgement.get('end_time'))
+            tracked.observed = time.monotonic()
+
+            self.pending.discard(tracked.submission_id)
+
+    def onEventLine(self, line):
+        # Keep-alive newlines
+        if len(line.strip()) == 0:
+            return
+
+        # The events we do not care about are not parsed, unless they have no token
+        if b'"judgements"' not in line:
+            match = kTokenPattern.search(line)
+            if match is not None:
+                self.last_token = match.group(1).decode('utf-8')
+                return
+
+        event = json.loads(line)
+
+        if event.get('token') is not None:
+            self.last_token = event['token']
+        elif event.get('id') is not None:
+            self.last_id = event['id']
+
+        if event.get('type') == 'judgements' and event.get('data') is not None:
+            self.onJudgement(event['data'])
+
+    def getEventFeedParams(self, stream):
+        params = {'stream': 'true' if stream else 'false', 'types': 'judgements'}
+        if self.last_token is not None:
+            params['since_token'] = self.last_token
+        elif self.last_id is not None:
+            params['since_id'] = self.last_id
+
+        return params
+
+    async def poll(self, session):
+        # `judgements` has no `since_id`, the event feed without streaming
+        # answers only the events after the last one we have seen
+        url = self.contest_url + '/event-feed'
+
+        while True:
+            try:
+                async with session.get(url, headers=self.headers, params=self.getEventFeedParams(False)) as resp:
+                    if resp.status != 200:
+                        raise RuntimeError(
+                            "fetch failed. [url={}] [status_code={}]".format(url, resp.status))
+
+                    for line in (await resp.read()).split(b'\n'):
+                        self.onEventLine(line)
+            except Exception as e:
+                self.logger.error(
+                    "poll judgements failed. [err={}]".format(repr(e)))
+
+            await asyncio.sleep(self.config.poll_interval)
+
+    async def followEventFeed(self, session):
+        url = self.contest_url + '/event-feed'
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=None)
+        retry = 0
+
+        while True:
+            try:
+                async with session.get(url, headers=self.headers, params=self.getEventFeedParams(True),
+                                       timeout=timeout) as resp:
+                    if resp.status != 200:
+                        raise RuntimeError(
+                            "fetch failed. [url={}] [status_code={}]".format(url, resp.status))
+
+                    retry = 0
+
+                    async for line in resp.content:
+                        self.onEventLine(line)
+            except Exception as e:
+                self.logger.error(
+                    "follow event-feed failed. [err={}]".format(repr(e)))
+
+            backoff = min(2 ** retry, 30)
+            retry += 1
+            await asyncio.sleep(backoff)
+
+    def startTracking(self, session):
+        self.start = time.monotonic()
+
+        if self.config.track_judgements == 'event-feed':
+            self.task = asyncio.ensure_future(self.followEventFeed(session))
+        else:
+            self.task = asyncio.ensure_future(self.poll(session))
+
+    async def wait(self):
+        deadline = time.monotonic() + self.config.track_timeout
+
+        while len(self.pending) > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+        self.task.cancel()
+
+        if len(self.pending) > 0:
+            self.logger.error("some submissions got no verdict. [pending={}] [track_timeout={}s]".format(
+                len(self.pending), self.config.track_timeout))
+
+    def getVerdictSeries(self):
+        # Verdicts per minute since the test started
+        minutes = collections.defaultdict(collections.Counter)
+
+        for tracked in self.tracked.values():
+            if tracked.observed is not None:
+                minutes[int((tracked.observed - self.start) // 60)
+                        ][tracked.verdict] += 1
+
+        series = []
+        for minute in range(max(minutes.keys(), default=-1) + 1):
+            series.append({
+                "minute": minute,
+                "total": sum(minutes[minute].values()),
+                "verdicts": dict(minutes[minute]),
+            })
+
+        return series
+
+    def getReport(self):
+        judged = [t for t in self.tracked.values() if t.verdict is not None]
+
+        return {
+            "tracked": len(self.tracked),
+            "judged": len(judged),
+            "pending": len(self.pending),
+            "untracked": self.untracked_nums,
+            "queue_wait": getDistribution([t.queueWait() for t in judged if t.start_time is not None]),
+            "judge_time": getDistribution([t.judgeTime() for t in judged
+                                           if t.start_time is not None and t.end_time is not None]),
+            "end_to_end": getDistribution([t.endToEnd() for t in judged]),
+            "verdicts": dict(collections.Counter(t.verdict for t in judged)),
+            "verdicts_per_minute": self.getVerdictSeries(),
+        }
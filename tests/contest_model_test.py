@@ -0,0 +1,38 @@
+import os
+
+from domjudge_utility import Dump, DumpConfig
+
+current_file_path = os.path.abspath(__file__)
+current_dir_path = os.path.dirname(current_file_path)
+
+
+def test_contest_model_9th_ccpc_guilin():
+    test_prefix = "9th_ccpc_guilin"
+
+    fetch_uri = os.path.join(current_dir_path, "test_data", test_prefix)
+
+    c = DumpConfig()
+    c.base_file_path = fetch_uri
+
+    d = Dump(c)
+    d.load_domjudge_api()
+
+    m = d.contest_model
+
+    assert len(m.submissions) == len(d.submissions)
+    assert len(m.problems) == len(d.problems)
+    assert len(m.teams) == len(d.teams)
+
+    for index in [m.submissions_by_team, m.submissions_by_problem,
+                  m.submissions_by_language, m.submissions_by_verdict]:
+        assert sorted(i for indexes in index.values() for i in indexes) == list(
+            range(len(m.submissions)))
+
+    for submission in m.get_team_submissions('175'):
+        assert submission.team_id == '175'
+
+    for submission in m.get_verdict_submissions('AC'):
+        assert d.submissions[submission.index]['verdict'] == 'AC'
+
+    observers = [t['id'] for t in d.teams if d.is_observers(t)]
+    assert observers == [t.id for t in m.teams.values() if t.is_observer]
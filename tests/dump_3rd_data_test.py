@@ -0,0 +1,77 @@
+import os
+
+from domjudge_utility import Dump, DumpConfig
+
+current_file_path = os.path.abspath(__file__)
+current_dir_path = os.path.dirname(current_file_path)
+
+
+def test_dump_3rd_data_9th_ccpc_guilin(snapshot, tmp_path):
+    test_prefix = "9th_ccpc_guilin"
+
+    fetch_uri = os.path.join(current_dir_path, "test_data", test_prefix)
+
+    c = DumpConfig({
+        "saved_dir": str(tmp_path),
+        "exported_data": {
+            "domjudge_api": False,
+            "ghost_dat_data": True,
+            "resolver_data": True,
+            "scoreboard_excel_data": True,
+        },
+    })
+    c.base_file_path = fetch_uri
+
+    d = Dump(c)
+    d.init_logging()
+    d.dump()
+
+    with open(os.path.join(tmp_path, "contest.dat"), 'rb') as f:
+        snapshot.assert_match(f.read(), "contest.dat")
+
+    with open(os.path.join(tmp_path, "resolver.json"), 'rb') as f:
+        snapshot.assert_match(f.read(), "resolver.json")
+
+    with open(os.path.join(tmp_path, "The-9th-CCPC-Guilin-Onsite.xls"), 'rb') as f:
+        snapshot.assert_match(f.read(), "scoreboard.xls")
+
+
+def test_dump_3rd_data_with_former_signatures(tmp_path):
+    test_prefix = "9th_ccpc_guilin"
+
+    fetch_uri = os.path.join(current_dir_path, "test_data", test_prefix)
+
+    def new_dump(saved_dir):
+        c = DumpConfig({
+            "saved_dir": str(saved_dir),
+            "exported_data": {
+                "domjudge_api": False,
+                "ghost_dat_data": True,
+                "resolver_data": True,
+                "scoreboard_excel_data": True,
+            },
+        })
+        c.base_file_path = fetch_uri
+
+        d = Dump(c)
+        d.init_logging()
+        return d
+
+    new_dump(tmp_path / "model").dump()
+
+    (tmp_path / "former").mkdir()
+    d = new_dump(tmp_path / "former")
+    d.load_domjudge_api()
+    d.process_domjudge_raw_data()
+
+    # Fresh copies bypass the cached model
+    submissions = [dict(s) for s in d.submissions]
+    teams_dict = dict(d.teams_dict)
+    d.get_ghost_dat_data(dict(d.contest), teams_dict, submissions, d.problems_dict)
+    d.get_resolver_data(dict(d.contest), list(teams_dict.values()), submissions, d.problems_dict)
+    d.get_excel_data(dict(d.contest), d.scoreboard, d.problems_dict, teams_dict)
+
+    for filename in ["contest.dat", "resolver.json", "The-9th-CCPC-Guilin-Onsite.xls"]:
+        with open(os.path.join(tmp_path, "model", filename), 'rb') as f, \
+                open(os.path.join(tmp_path, "former", filename), 'rb') as g:
+            assert f.read() == g.read()
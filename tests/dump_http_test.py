@@ -0,0 +1,437 @@
+import os
+import json
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from domjudge_utility import Dump, DumpConfig
+
+current_file_path = os.path.abspath(__file__)
+current_dir_path = os.path.dirname(current_file_path)
+
+
+def serve_api_dir(api_dir: str, cid: str, flaky_paths=()):
+    prefix = "/api/v4/contests/{}".format(cid)
+
+    # Every path in `flaky_paths` fails once before being served
+    flaky_paths = set(flaky_paths)
+
+    class Handler(SimpleHTTPRequestHandler):
+        def translate_path(self, path):
+            path = path.split('?')[0][len(prefix):].strip('/')
+            return os.path.join(api_dir, (path or "contest") + ".json")
+
+        def do_GET(self):
+            path = self.path.split('?')[0][len(prefix):].strip('/')
+            if path in flaky_paths:
+                flaky_paths.remove(path)
+                self.send_error(500)
+                return
+
+            super().do_GET()
+
+        def log_request(self, code='-', size='-'):
+            server.status_codes.append(int(code))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.status_codes = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+@pytest.mark.parametrize("json_streaming", [False, True])
+def test_async_dump_9th_ccpc_guilin(tmp_path, json_streaming):
+    test_prefix = "9th_ccpc_guilin"
+
+    fetch_uri = os.path.join(current_dir_path, "test_data", test_prefix)
+    api_dir = os.path.join(fetch_uri, "domjudge", "api")
+
+    server = serve_api_dir(api_dir, "5")
+
+    try:
+        c = DumpConfig({
+            "base_url": "http://127.0.0.1:{}/".format(server.server_port),
+            "cid": 5,
+            "saved_dir": str(tmp_path),
+            "async_fetch": True,
+            "async_fetch_parallels_nums": 4,
+            "json_streaming": json_streaming,
+        })
+
+        d = Dump(c)
+        d.init_logging()
+        d.dump_domjudge_api()
+    finally:
+        server.shutdown()
+
+    for attr, _, filename, _ in d.get_domjudge_api_endpoints():
+        with open(os.path.join(api_dir, filename), 'r') as f:
+            assert getattr(d, attr) == json.load(f)
+
+        with open(os.path.join(api_dir, filename), 'rb') as src, open(os.path.join(d.api_dir, filename), 'rb') as dist:
+            assert src.read() == dist.read()
+
+
+def test_download_source_code(tmp_path):
+    api_dir = tmp_path / "api"
+    submission_id_list = [str(i) for i in range(1, 31)]
+
+    for submission_id in submission_id_list:
+        submission_dir = api_dir / "submissions" / submission_id
+        submission_dir.mkdir(parents=True)
+        (submission_dir / "files.json").write_bytes(
+            b"PK" + submission_id.encode())
+        (submission_dir / "source-code.json").write_text(
+            json.dumps([{"submission_id": submission_id, "source": ""}]))
+
+    server = serve_api_dir(str(api_dir), "5", flaky_paths=[
+        "submissions/3/files", "submissions/7/source-code"])
+
+    try:
+        c = DumpConfig({
+            "base_url": "http://127.0.0.1:{}/".format(server.server_port),
+            "cid": 5,
+            "saved_dir": str(tmp_path / "output"),
+            "grequests_parallels_nums": 8,
+            "download_retry_nums": 1,
+        })
+
+        d = Dump(c)
+        d.init_logging()
+
+        for submission_id in submission_id_list:
+            os.makedirs(os.path.join(d.submissions_dir, submission_id))
+
+        d.download_source_code(submission_id_list)
+    finally:
+        server.shutdown()
+
+    for submission_id in submission_id_list:
+        submission_dir = os.path.join(d.submissions_dir, submission_id)
+
+        with open(os.path.join(submission_dir, "files.zip"), 'rb') as f:
+            assert f.read() == b"PK" + submission_id.encode()
+
+        with open(os.path.join(submission_dir, "source-code.json"), 'r') as f:
+            assert json.load(f)[0]["submission_id"] == submission_id
+
+
+def test_download_source_code_fails_fast_on_4xx(tmp_path):
+    api_dir = tmp_path / "api"
+    (api_dir / "submissions").mkdir(parents=True)
+
+    server = serve_api_dir(str(api_dir), "5")
+
+    try:
+        c = DumpConfig({
+            "base_url": "http://127.0.0.1:{}/".format(server.server_port),
+            "cid": 5,
+            "saved_dir": str(tmp_path / "output"),
+            "download_retry_nums": 5,
+        })
+
+        with Dump(c) as d:
+            d.init_logging()
+            os.makedirs(os.path.join(d.submissions_dir, "1"))
+
+            with pytest.raises(RuntimeError):
+                d.download_source_code(["1"])
+    finally:
+        server.shutdown()
+
+    # A missing submission is not retried
+    assert server.status_codes == [404]
+
+
+def test_incremental_dump(tmp_path):
+    test_prefix = "9th_ccpc_guilin"
+
+    fetch_uri = os.path.join(current_dir_path, "test_data", test_prefix)
+    api_dir = os.path.join(fetch_uri, "domjudge", "api")
+
+    server = serve_api_dir(api_dir, "5")
+
+    def dump():
+        c = DumpConfig({
+            "base_url": "http://127.0.0.1:{}/".format(server.server_port),
+            "cid": 5,
+            "saved_dir": str(tmp_path),
+            "incremental": True,
+        })
+
+        with Dump(c) as d:
+            d.init_logging()
+            d.dump()
+
+        return d
+
+    try:
+        d = dump()
+        mtime_dict = {}
+        for _, _, filename, _ in d.get_domjudge_api_endpoints():
+            mtime_dict[filename] = os.stat(
+                os.path.join(d.api_dir, filename)).st_mtime_ns
+
+        server.status_codes.clear()
+        d = dump()
+    finally:
+        server.shutdown()
+
+    # Everything is answered with `304 Not Modified` the second time
+    assert server.status_codes == [304] * len(mtime_dict)
+
+    for attr, _, filename, _ in d.get_domjudge_api_endpoints():
+        assert os.stat(os.path.join(d.api_dir, filename)
+                       ).st_mtime_ns == mtime_dict[filename]
+
+        with open(os.path.join(api_dir, filename), 'r') as f:
+            assert getattr(d, attr) == json.load(f)
+
+
+def test_event_feed_streaming_resume(tmp_path):
+    events = [json.dumps({"token": str(i), "type": "teams", "data": {"id": str(i)}})
+              for i in range(1, 101)]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            since_token = int(query.get("since_token", ["0"])[0])
+            server.since_tokens.append(since_token)
+
+            body = "".join(e + "\n" for e in events[since_token:]).encode()
+
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.since_tokens = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    c = DumpConfig({
+        "base_url": "http://127.0.0.1:{}/".format(server.server_port),
+        "cid": 5,
+        "saved_dir": str(tmp_path),
+        "exported_data": {"event_feed": True, "event_feed_streaming": True},
+    })
+
+    d = Dump(c)
+    d.init_logging()
+
+    file_path = os.path.join(d.api_dir, "event-feed.ndjson")
+    os.makedirs(d.api_dir)
+
+    # An interrupted previous run left a half written line behind
+    with open(file_path, 'w') as f:
+        f.write("\n".join(events[:42]) + "\n" + events[42][:10])
+
+    # A dump without `incremental` still resumes the event-feed
+    d.get_domjudge_api_endpoints = lambda: []
+
+    try:
+        with d:
+            d.dump_event_feed_stream()
+            d.dump_event_feed_stream()
+            d.dump()
+    finally:
+        server.shutdown()
+
+    assert server.since_tokens == [42, 100, 100]
+
+    with open(file_path, 'r') as f:
+        assert f.read().splitlines() == events
+
+
+def test_runs_resume(tmp_path):
+    runs = [{"id": str(i), "judgement_id": str(i * 7), "ordinal": 1}
+            for i in range(1, 26)]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            limit = int(query["limit"][0])
+            first_id = int(query.get("first_id", ["0"])[0])
+            server.first_ids.append(first_id)
+
+            page = [r for r in runs if int(r["id"]) >= first_id][:limit]
+            body = json.dumps(page).encode()
+
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.first_ids = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def dump():
+        c = DumpConfig({
+            "base_url": "http://127.0.0.1:{}/".format(server.server_port),
+            "cid": 5,
+            "saved_dir": str(tmp_path),
+            "incremental": True,
+            "exported_data": {"runs": True},
+        })
+
+        with Dump(c) as d:
+            d.kRunsPageSize = 10
+            d.init_logging()
+            d.dump_domjudge_api = lambda: None
+            d.dump()
+
+        return d
+
+    try:
+        d = dump()
+        assert server.first_ids == [0, 11, 21, 26]
+
+        runs.extend({"id": str(i), "judgement_id": str(i * 7), "ordinal": 1}
+                    for i in range(26, 33))
+
+        server.first_ids.clear()
+        d = dump()
+        assert server.first_ids == [21, 31, 33]
+    finally:
+        server.shutdown()
+
+    assert sorted(os.listdir(d.api_dir)) == [
+        "runs.1.json", "runs.2.json", "runs.3.json", "runs.4.json"]
+
+    saved_runs = []
+    for i in range(1, 5):
+        with open(os.path.join(d.api_dir, "runs.{}.json".format(i)), 'r') as f:
+            saved_runs.extend(json.load(f))
+
+    assert saved_runs == runs
+
+
+def test_dump_images_with_cache(tmp_path):
+    api_dir = tmp_path / "api"
+
+    # Two organizations share one logo href
+    organizations = [
+        {"id": "1", "logo": [{"href": "contests/5/organizations/1/logo"}]},
+        {"id": "2", "logo": [{"href": "contests/5/organizations/1/logo"}]},
+        {"id": "3", "logo": [{"href": "contests/5/organizations/3/logo"}]},
+    ]
+    teams = [{"id": "1", "photo": [{"href": "contests/5/teams/1/photo"}]}]
+
+    for href, body in [("organizations/1/logo", b"logo-1"), ("organizations/3/logo", b"logo-3"),
+                       ("teams/1/photo", b"logo-1")]:
+        (api_dir / href).parent.mkdir(parents=True, exist_ok=True)
+        (api_dir / (href + ".json")).write_bytes(body)
+
+    server = serve_api_dir(str(api_dir), "5")
+
+    def dump_images():
+        c = DumpConfig({
+            "base_url": "http://127.0.0.1:{}/".format(server.server_port),
+            "cid": 5,
+            "saved_dir": str(tmp_path / "output"),
+            "images_cache_dir": str(tmp_path / "cache"),
+            "exported_data": {"images": True},
+        })
+
+        d = Dump(c)
+        d.init_logging()
+        d.contest = {}
+        d.organizations = organizations
+        d.teams = teams
+
+        server.status_codes.clear()
+        d.dump_images()
+
+        return d
+
+    def read_images(d):
+        images = {}
+        for href in ["contests/5/organizations/1/logo", "contests/5/organizations/3/logo", "contests/5/teams/1/photo"]:
+            path = os.path.join(d.images_dir, href)
+            with open(path, 'rb') as f:
+                images[href] = (f.read(), os.stat(path).st_mtime_ns)
+
+        return images
+
+    try:
+        d = dump_images()
+        assert server.status_codes == [200] * 3
+        images = read_images(d)
+
+        d = dump_images()
+        assert server.status_codes == [304] * 3
+        assert read_images(d) == images
+
+        # Restored from the cache without downloading
+        shutil.rmtree(d.images_dir)
+        d = dump_images()
+        assert server.status_codes == [304] * 3
+        assert {k: v[0] for k, v in read_images(d).items()} == {
+            k: v[0] for k, v in images.items()}
+    finally:
+        server.shutdown()
+
+    assert len(os.listdir(tmp_path / "cache" / "blobs")) == 2
+
+
+def test_dump_images_cache_survives_dump(tmp_path):
+    api_dir = tmp_path / "api"
+
+    organizations = [
+        {"id": "1", "logo": [{"href": "contests/5/organizations/1/logo"}]},
+        {"id": "2", "logo": [{"href": "contests/5/organizations/2/logo"}]},
+    ]
+
+    for href, body in [("organizations/1/logo", b"logo-1"), ("organizations/2/logo", b"logo-2")]:
+        (api_dir / href).parent.mkdir(parents=True, exist_ok=True)
+        (api_dir / (href + ".json")).write_bytes(body)
+
+    server = serve_api_dir(str(api_dir), "5")
+
+    def dump():
+        # Neither `incremental` nor `images_cache_dir`
+        c = DumpConfig({
+            "base_url": "http://127.0.0.1:{}/".format(server.server_port),
+            "cid": 5,
+            "saved_dir": str(tmp_path / "output"),
+            "exported_data": {"images": True},
+        })
+
+        with Dump(c) as d:
+            d.init_logging()
+            d.contest = {}
+            d.organizations = organizations
+            d.teams = []
+            d.dump_domjudge_api = lambda: None
+
+            server.status_codes.clear()
+            d.dump()
+
+        return d
+
+    try:
+        dump()
+        assert server.status_codes == [200] * 2
+
+        d = dump()
+        assert server.status_codes == [304] * 2
+    finally:
+        server.shutdown()
+
+    for i in ["1", "2"]:
+        with open(os.path.join(d.images_dir, "contests/5/organizations", i, "logo"), 'rb') as f:
+            assert f.read() == "logo-{}".format(i).encode()
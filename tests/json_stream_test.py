@@ -0,0 +1,70 @@
+import os
+import json
+
+import pytest
+
+from domjudge_utility import Dump, DumpConfig
+from domjudge_utility.json_stream import JsonStreamParser, JsonStreamWriter
+
+current_file_path = os.path.abspath(__file__)
+current_dir_path = os.path.dirname(current_file_path)
+
+
+def parse_in_chunks(data: bytes, chunk_size: int):
+    parser = JsonStreamParser()
+
+    for i in range(0, len(data), chunk_size):
+        parser.feed(data[i:i + chunk_size])
+
+    return parser.close()
+
+
+@pytest.mark.parametrize("document", [
+    [],
+    [1, 22, 333, -4.5e3],
+    [{"id": "1", "name": "队伍 \\u00e9"}, {"id": "2", "nested": [1, {"a": None}]}, "x", True],
+    {"formal_name": "The 9th CCPC Guilin Onsite", "rows": [1, 2]},
+    "42",
+])
+def test_parse_at_every_chunk_boundary(document):
+    data = json.dumps(document, indent=1, ensure_ascii=False).encode('utf-8')
+
+    for chunk_size in range(1, len(data) + 1):
+        assert parse_in_chunks(data, chunk_size) == document
+
+
+def test_parse_unterminated_array():
+    with pytest.raises(ValueError):
+        parse_in_chunks(b'[{"id": "1"}, {"id": "2"}', 4)
+
+
+def test_interrupted_writer_removes_tmp_file(tmp_path):
+    dist = str(tmp_path / "judgements.json")
+
+    with pytest.raises(ConnectionResetError):
+        with JsonStreamWriter(dist) as writer:
+            writer.write(b'[{"id": "1"}, ')
+            raise ConnectionResetError()
+
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_json_streaming_load_9th_ccpc_guilin():
+    fetch_uri = os.path.join(current_dir_path, "test_data", "9th_ccpc_guilin")
+
+    c = DumpConfig({"json_streaming": True})
+    c.base_file_path = fetch_uri
+
+    d = Dump(c)
+    d.load_domjudge_api()
+
+    for attr, _, filename, _ in d.get_domjudge_api_endpoints():
+        with open(os.path.join(fetch_uri, "domjudge", "api", filename), 'r') as f:
+            expected = json.load(f)
+
+        if attr == 'submissions':
+            for submission in getattr(d, attr):
+                for key in ['language_name', 'verdict', 'max_run_time']:
+                    submission.pop(key)
+
+        assert getattr(d, attr) == expected
@@ -0,0 +1,138 @@
+import os
+import json
+import time
+
+import requests
+
+from domjudge_utility import Dump, DumpConfig
+from domjudge_utility.mock_server import MockServer, MockServerConfig
+
+current_file_path = os.path.abspath(__file__)
+current_dir_path = os.path.dirname(current_file_path)
+
+fixture_dir = os.path.join(current_dir_path, "test_data", "9th_ccpc_guilin")
+api_dir = os.path.join(fixture_dir, "domjudge", "api")
+
+
+def start_mock_server(**kwargs):
+    return MockServer(MockServerConfig({
+        "fixture_dir": fixture_dir,
+        "port": 0,
+        **kwargs,
+    })).start_in_thread()
+
+
+def test_dump_from_mock_server(tmp_path):
+    server = start_mock_server(url_prefix="/domjudge", runs_per_judgement=2)
+
+    try:
+        c = DumpConfig({
+            "base_url": server.get_base_url(),
+            "cid": 5,
+            "saved_dir": str(tmp_path / "output"),
+            "images_cache_dir": str(tmp_path / "cache"),
+            "async_fetch": True,
+            "exported_data": {"runs": True, "event_feed": True, "images": True},
+        })
+
+        with Dump(c) as d:
+            d.kRunsPageSize = 1000
+            d.init_logging()
+            d.dump_domjudge_api()
+            d.dump_runs()
+            d.dump_images()
+    finally:
+        server.stop()
+
+    for attr, _, filename, _ in d.get_domjudge_api_endpoints():
+        if attr == 'event_feed':
+            continue
+
+        with open(os.path.join(api_dir, filename), 'rb') as src, open(os.path.join(d.api_dir, filename), 'rb') as dist:
+            assert src.read() == dist.read()
+
+    judged_nums = len([j for j in d.judgements if j['judgement_type_id'] is not None])
+
+    runs = []
+    for filename in sorted(os.listdir(d.api_dir)):
+        if filename.startswith("runs."):
+            with open(os.path.join(d.api_dir, filename), 'r') as f:
+                runs.extend(json.load(f))
+
+    assert [int(r['id']) for r in runs] == list(range(1, judged_nums * 2 + 1))
+
+    with open(os.path.join(d.api_dir, "event-feed.ndjson"), 'r') as f:
+        events = [json.loads(line) for line in f]
+
+    assert [e['token'] for e in events] == [str(i) for i in range(1, len(events) + 1)]
+    assert len([e for e in events if e['type'] == 'submissions']) == len(d.submissions)
+
+    for o in d.organizations:
+        for logo in o.get('logo', []):
+            assert os.path.exists(os.path.join(d.images_dir, logo['href']))
+
+
+def test_post_submission():
+    server = start_mock_server(judge_delay=0, judge_time=0, seed=1)
+    base_url = server.get_base_url() + "api/v4/contests/5"
+
+    try:
+        resp = requests.get(base_url + "/event-feed", params={"stream": "false"})
+        last_token = resp.text.splitlines()[-1]
+        last_token = json.loads(last_token)['token']
+
+        resp = requests.post(base_url + "/submissions",
+                             data={"problem": "A", "language": "py3"},
+                             files={"code[]": ("a.py", b"print(1)\n")})
+        assert resp.status_code == 200
+
+        submission = resp.json()
+        assert submission['language_id'] == 'python3'
+        assert submission['problem_id'] == '4'
+
+        resp = requests.post(base_url + "/submissions", data={"problem": "Z", "language": "py3"},
+                             files={"code[]": ("a.py", b"")})
+        assert resp.status_code == 400
+
+        for _ in range(100):
+            resp = requests.get(base_url + "/judgements/" + str(int(server.data['judgements'][-1]['id'])))
+            if resp.json()['submission_id'] == submission['id'] and resp.json()['judgement_type_id'] is not None:
+                break
+
+            time.sleep(0.02)
+
+        judgement = resp.json()
+        assert judgement['submission_id'] == submission['id']
+        assert judgement['judgement_type_id'] is not None
+
+        resp = requests.get(base_url + "/event-feed",
+                            params={"stream": "false", "since_token": last_token})
+        events = [json.loads(line) for line in resp.text.splitlines()]
+        assert [(e['type'], e['op']) for e in events] == [
+            ('submissions', 'create'), ('judgements', 'create'), ('judgements', 'update')]
+
+        resp = requests.get(
+            base_url + "/submissions/{}/source-code".format(submission['id']))
+        assert resp.json()[0]['filename'] == "a.py"
+
+        resp = requests.get(base_url + "/scoreboard")
+        team_row = [r for r in resp.json()['rows'] if r['team_id'] == submission['team_id']][0]
+        assert team_row['problems'][0]['num_judged'] >= 1
+    finally:
+        server.stop()
+
+
+def test_injection():
+    server = start_mock_server(error_rate=0.5, rate_limit=20, seed=1)
+    url = server.get_base_url() + "api/v4/contests/5/problems"
+
+    try:
+        with requests.Session() as session:
+            status_codes = [session.get(url).status_code for _ in range(40)]
+    finally:
+        server.stop()
+
+    assert set(status_codes) == {200, 429, 500}
+    assert status_codes.count(429) >= 10
+    assert server.stats['requests'] == 40
+    assert server.stats[200] == status_codes.count(200)
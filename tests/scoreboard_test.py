@@ -0,0 +1,65 @@
+import os
+
+from domjudge_utility import Dump, DumpConfig, Scoreboard
+
+current_file_path = os.path.abspath(__file__)
+current_dir_path = os.path.dirname(current_file_path)
+
+
+def load_9th_ccpc_guilin():
+    test_prefix = "9th_ccpc_guilin"
+
+    fetch_uri = os.path.join(current_dir_path, "test_data", test_prefix)
+
+    c = DumpConfig()
+    c.base_file_path = fetch_uri
+
+    d = Dump(c)
+    d.load_domjudge_api()
+
+    return d
+
+
+def test_scoreboard_9th_ccpc_guilin():
+    d = load_9th_ccpc_guilin()
+
+    scoreboard = d.get_local_scoreboard()
+
+    assert scoreboard.get_rows() == d.scoreboard['rows']
+
+
+def test_scoreboard_incremental_9th_ccpc_guilin():
+    d = load_9th_ccpc_guilin()
+
+    scoreboard = Scoreboard(d.contest, d.problems, d.groups, d.teams,
+                            d.judgement_types, is_observers=d.is_observers)
+
+    # Judgements arrive one by one while the contest is running
+    for submission in d.submissions:
+        scoreboard.add_submission(submission)
+
+    pending = sum(p['num_pending']
+                  for row in scoreboard.get_rows() for p in row['problems'])
+    assert pending > 0
+
+    for judgement in d.judgements:
+        scoreboard.add_judgement(judgement)
+
+    assert scoreboard.get_rows() == d.scoreboard['rows']
+
+
+def test_scoreboard_frozen_9th_ccpc_guilin():
+    d = load_9th_ccpc_guilin()
+
+    unfrozen_rows = d.get_local_scoreboard().get_rows()
+    frozen_rows = d.get_local_scoreboard(frozen=True).get_rows()
+
+    assert len(frozen_rows) == len(unfrozen_rows)
+
+    unfrozen_solved = sum(row['score']['num_solved'] for row in unfrozen_rows)
+    frozen_solved = sum(row['score']['num_solved'] for row in frozen_rows)
+    assert frozen_solved < unfrozen_solved
+
+    frozen_pending = sum(p['num_pending']
+                         for row in frozen_rows for p in row['problems'])
+    assert frozen_pending > 0